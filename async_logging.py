@@ -0,0 +1,87 @@
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Logging that never blocks the frame loop on terminal or file I/O.
+#
+# The loop's logger only puts records on a queue (QueueHandler). A listener
+# thread formats and writes them, and flushes the stream only once the queue
+# runs empty, so a burst of records costs one write to the terminal instead
+# of one per record.
+#
+# The queue holds at most MAX_QUEUED records. If the writer falls that far
+# behind (a stalled terminal or a slow disk), each new record drops the oldest
+# one instead of blocking the loop or growing memory, and stop_logging()
+# reports how many were lost.
+
+FORMAT = "%(asctime)s %(levelname)s %(message)s"
+MAX_QUEUED = 10000  # Records waiting for the writer before the oldest are dropped
+
+class DroppingQueue(queue.Queue):
+    # Bounded queue whose put_nowait() (used by QueueHandler) makes room by
+    # dropping the oldest record
+
+    def __init__(self, maxsize=MAX_QUEUED):
+        super().__init__(maxsize)
+        self.dropped = 0
+
+    def put_nowait(self, item):
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize():
+                self._get()
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+class BufferedStreamHandler(logging.StreamHandler):
+    # StreamHandler that leaves flushing to BatchingListener
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+class BatchingListener(QueueListener):
+    # Flushes the handlers whenever it is about to wait for more records
+
+    def dequeue(self, block):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
+
+    def enqueue_sentinel(self):
+        # Wait for room rather than drop a record to stop
+        self.queue.put(self._sentinel)
+
+def start_logging(name, level=logging.INFO, path=None, fmt=FORMAT, max_queued=MAX_QUEUED):
+    # Logger whose records are written by a background thread to path, or to
+    # stdout. Returns (logger, listener); pass the listener to stop_logging().
+    records = DroppingQueue(max_queued)
+    stream = open(path, "a") if path else sys.stdout
+    handler = BufferedStreamHandler(stream)
+    handler.setFormatter(logging.Formatter(fmt))
+    listener = BatchingListener(records, handler)
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.handlers = [QueueHandler(records)]
+    logger.propagate = False
+    listener.start()
+    return logger, listener
+
+def stop_logging(listener):
+    # Write out everything still queued, then release the output
+    listener.stop()
+    for handler in listener.handlers:
+        if listener.queue.dropped:
+            handler.handle(logging.makeLogRecord({
+                "msg": "%d log records dropped while the writer fell behind",
+                "args": (listener.queue.dropped,), "levelno": logging.WARNING, "levelname": "WARNING"}))
+        handler.flush()
+        if handler.stream is not sys.stdout:
+            handler.stream.close()
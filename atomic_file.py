@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+# Atomic file writes.
+#
+# The content goes to a temporary file in the target's directory, which is then
+# renamed over the target. A rename within one file system is atomic, so
+# readers, including other processes sharing a cache directory, see either
+# the old file or the complete new one, never half a file, and an interrupted
+# write leaves the old file in place.
+
+def write_atomic(path, write, mode="w"):
+    # Write a file through write(f), with f opened in mode ("w" or "wb")
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"newline": ""})) as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
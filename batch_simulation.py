@@ -0,0 +1,193 @@
+import random
+
+import numpy as np
+
+import raycast
+import simulation
+from sensor_array import SensorArray, DEFAULT_SPREAD
+
+# Batched headless simulation of many vehicles in the same maze.
+# Vehicle state is stored as parallel arrays (structure of arrays) so one
+# step() call advances every vehicle through sensing, the cross-wired
+# turn/speed law, integration and the collision response with NumPy
+# operations. Vehicle k behaves like simulation.Simulation with the same
+# parameters and seed.
+
+def point_segment_distances(x, y, walls):
+    # Distance from each point (x[k], y[k]) to each wall. Returns a (K, N) array.
+    # Same arithmetic as geometry.point_to_line_distance().
+    px = np.asarray(x, dtype=np.float64)[:, None]
+    py = np.asarray(y, dtype=np.float64)[:, None]
+    x1, y1, x2, y2 = walls[:, 0], walls[:, 1], walls[:, 2], walls[:, 3]
+
+    A = px - x1
+    B = py - y1
+    C = x2 - x1
+    D = y2 - y1
+    dot = A * C + B * D
+    len_sq = C * C + D * D
+
+    # Projection parameter clamped to the segment; point segments use param 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        param = np.where(len_sq == 0, 0.0, dot / len_sq)
+    param = np.clip(param, 0.0, 1.0)
+    xx = x1 + param * C
+    yy = y1 + param * D
+    return np.sqrt((px - xx) ** 2 + (py - yy) ** 2)
+
+
+class BatchSimulation:
+    # K vehicles in one maze. Every per-vehicle parameter accepts a scalar
+    # (shared by all vehicles) or a sequence of K values; the sensor array
+    # layout is shared.
+
+    def __init__(self, count, walls=simulation.WALLS, start=simulation.START,
+                 finish=simulation.FINISH, max_speed=5, turn_rate=2, sensor_range=150,
+                 sensitivity=0.6, acceleration=simulation.ACCELERATION,
+                 deceleration=simulation.DECELERATION, slow_down=simulation.SLOW_DOWN,
+                 robot_size=simulation.ROBOT_SIZE, time_step=simulation.TICK, seeds=None,
+                 rays_per_side=1, sensor_spread=DEFAULT_SPREAD, ray_weights=None):
+        self.count = count
+        self.walls = raycast.wall_array(walls)
+        self.start = start
+        self.finish = finish
+        self.robot_size = robot_size
+        self.time_step = time_step
+        self.sensors = SensorArray(rays_per_side, sensor_spread, ray_weights)
+        self.offset_cos = np.array(self.sensors.cos)[:, None]
+        self.offset_sin = np.array(self.sensors.sin)[:, None]
+
+        self.max_speed = self._per_vehicle(max_speed)
+        self.turn_rate = self._per_vehicle(turn_rate)
+        self.sensor_range = self._per_vehicle(sensor_range)
+        self.sensitivity = self._per_vehicle(sensitivity)
+        self.acceleration = self._per_vehicle(acceleration)
+        self.deceleration = self._per_vehicle(deceleration)
+        self.slow_down = self._per_vehicle(slow_down)
+
+        # One RNG per vehicle so each one draws the same collision kicks as a
+        # single-vehicle Simulation with that seed
+        self.seeds = list(seeds) if seeds is not None else [None] * count
+        if len(self.seeds) != count:
+            raise ValueError(f"Expected {count} seeds, got {len(self.seeds)}")
+        self.reset()
+
+    def _per_vehicle(self, value):
+        values = np.broadcast_to(np.asarray(value, dtype=np.float64), (self.count,))
+        return values.copy()
+
+    def reset(self):
+        self.rngs = [random.Random(seed) for seed in self.seeds]
+        self.robot_x = np.full(self.count, float(self.start[0]))
+        self.robot_y = np.full(self.count, float(self.start[1]))
+        self.heading_angle = np.full(self.count, float(simulation.START_HEADING))
+        self.speed = np.zeros(self.count)
+        self.left_reading = np.zeros(self.count)
+        self.right_reading = np.zeros(self.count)
+        self.collision_count = np.zeros(self.count, dtype=np.int64)
+        self.completed = np.zeros(self.count, dtype=bool)
+        self.finish_step = np.zeros(self.count, dtype=np.int64)
+        self.steps = 0
+
+    def sensor_rays(self):
+        # (R*K, 4) array for R rays per vehicle: ray r of every vehicle, then ray r+1.
+        # Ray directions are the heading rotated by the array's offset table.
+        heading_rad = np.radians(self.heading_angle)
+        cos_h, sin_h = np.cos(heading_rad), np.sin(heading_rad)
+        cos = cos_h * self.offset_cos - sin_h * self.offset_sin
+        sin = sin_h * self.offset_cos + cos_h * self.offset_sin
+
+        sensor_x = self.robot_x + cos * (self.robot_size/2)
+        sensor_y = self.robot_y - sin * (self.robot_size/2)
+        return np.stack([sensor_x, sensor_y,
+                         sensor_x + cos * self.sensor_range,
+                         sensor_y - sin * self.sensor_range], axis=2).reshape(-1, 4)
+
+    def sense(self):
+        rays = len(self.sensors)
+        sensor_range = np.tile(self.sensor_range, rays)
+        distances = raycast.cast_rays(self.sensor_rays(), self.walls, sensor_range)
+
+        # Convert distances to readings (closer = higher reading), one row per ray
+        readings = np.where(distances < sensor_range,
+                            np.maximum(0, 1 - distances / sensor_range), 0.0).reshape(rays, self.count)
+        readings *= self.sensitivity
+        self.obstacle_reading = readings.max(axis=0)
+        n = self.sensors.rays_per_side
+        self.left_reading = np.zeros(self.count)
+        self.right_reading = np.zeros(self.count)
+        for weight, left_reading, right_reading in zip(self.sensors.weights, readings[:n], readings[n:]):
+            self.left_reading += weight * left_reading
+            self.right_reading += weight * right_reading
+        return self.left_reading, self.right_reading
+
+    def step(self):
+        # Advance every unfinished vehicle one timestep; returns the completed mask
+        ticks = self.time_step / simulation.TICK
+        active = ~self.completed
+        left_reading, right_reading = self.sense()
+
+        # Braitenberg vehicle behavior (cross-wired)
+        turn_amount = (right_reading - left_reading) * self.turn_rate
+        heading_angle = self.heading_angle + turn_amount * ticks
+
+        obstacle_factor = self.obstacle_reading
+        target_speed = self.max_speed * (1 - obstacle_factor * self.slow_down)
+        speed = np.where(
+            self.speed < target_speed,
+            np.minimum(target_speed, self.speed + self.acceleration * ticks),
+            np.maximum(target_speed, self.speed - self.deceleration * ticks),
+        )
+
+        # Move robots
+        angle_rad = np.radians(heading_angle)
+        robot_x = self.robot_x + speed * ticks * np.cos(angle_rad)
+        robot_y = self.robot_y - speed * ticks * np.sin(angle_rad)
+
+        # Collision response - back up and turn randomly
+        if len(self.walls):
+            distances = point_segment_distances(robot_x, robot_y, self.walls)
+            collided = active & (distances.min(axis=1) < self.robot_size / 2)
+        else:
+            collided = np.zeros(self.count, dtype=bool)
+        robot_x = np.where(collided, self.robot_x, robot_x)
+        robot_y = np.where(collided, self.robot_y, robot_y)
+        speed = np.where(collided, -speed * 0.5, speed)
+        for k in np.flatnonzero(collided):
+            heading_angle[k] += self.rngs[k].uniform(-45, 45)
+        self.collision_count += collided
+
+        # Finished vehicles stay where they are
+        self.robot_x = np.where(active, robot_x, self.robot_x)
+        self.robot_y = np.where(active, robot_y, self.robot_y)
+        self.heading_angle = np.where(active, heading_angle, self.heading_angle)
+        self.speed = np.where(active, speed, self.speed)
+
+        self.steps += 1
+        distance_to_finish = np.sqrt((self.robot_x - self.finish[0])**2 + (self.robot_y - self.finish[1])**2)
+        finished = active & (distance_to_finish < simulation.FINISH_RADIUS)
+        self.finish_step[finished] = self.steps
+        self.completed |= finished
+        return self.completed
+
+    def run(self, timeout=simulation.TIMEOUT):
+        # Step until every vehicle has finished or the simulated timeout expires.
+        # Returns one result dict per vehicle, as Simulation.run() does.
+        max_steps = int(round(timeout / self.time_step))
+        while self.steps < max_steps and not self.step().all():
+            pass
+        results = []
+        for k in range(self.count):
+            completed = bool(self.completed[k])
+            elapsed_time = int(self.finish_step[k]) * self.time_step if completed else float(timeout)
+            collisions = int(self.collision_count[k])
+            results.append({
+                "sensitivity": float(self.sensitivity[k]),
+                "time": elapsed_time,
+                "collisions": collisions,
+                "score": simulation.performance_score(elapsed_time, collisions),
+                "completed": completed,
+                "steps": int(self.finish_step[k]) if completed else self.steps,
+                "pruned": False,
+            })
+        return results
@@ -0,0 +1,235 @@
+import argparse
+import functools
+import itertools
+import json
+import math
+import platform
+import sys
+import time
+
+import simulation
+from geometry import point_to_line_distance, line_intersection
+from maze import generate_maze
+from trace_store import TraceStore
+
+# Micro- and macro-benchmarks for the simulation hot paths.
+#
+# Each benchmark is timed as operations per second (calls, steps or frames).
+# Benchmarks are listed as (name, setup) pairs, and setup() builds the
+# operation only when the benchmark runs, so a --filter run skips the setup of
+# everything it leaves out.
+# Results can be saved as a baseline JSON file and later runs compared against
+# it; a benchmark that got slower than the threshold is flagged as a
+# regression and the script exits with status 1.
+#
+#   python benchmarks.py --save-baseline benchmarks_baseline.json
+#   python benchmarks.py --compare benchmarks_baseline.json --threshold 0.2
+
+MAZE_SIZES = (5, 20, 50)  # Cells per side of the generated mazes
+VEHICLE_COUNTS = (1, 16, 256)
+RAYS_PER_SIDE = (1, 16)  # Sensor array sizes of the sensing benchmarks
+MIN_TIME = 0.2  # Seconds each benchmark runs for
+REPEATS = 3
+
+def time_operation(operation, min_time=MIN_TIME, repeats=REPEATS):
+    # Best operations per second over several runs of at least min_time each
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        number *= 10
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+    best = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        best = max(best, number / (time.perf_counter() - start))
+    return best
+
+def stepper(sim):
+    # One Simulation step, restarting the trial once it finishes
+    def step():
+        if sim.step():
+            sim.reset()
+    return step
+
+@functools.lru_cache(maxsize=None)
+def benchmark_maze(cells):
+    return generate_maze(cells, cells, seed=0, loop_fraction=0.1)
+
+def trace_appender():
+    # Trace points along a slow Lissajous curve, so the store keeps simplifying and compacting
+    store = TraceStore()
+    steps = itertools.count()
+
+    def trace_append():
+        i = next(steps)
+        store.append((int(500 + 400 * math.cos(i / 500)), int(500 + 400 * math.sin(i / 300))))
+    return trace_append
+
+def micro_benchmarks():
+    return [
+        ("point_to_line_distance", lambda: lambda: point_to_line_distance(120.0, 130.0, 50, 50, 950, 50)),
+        ("line_intersection", lambda: lambda: line_intersection(100.0, 100.0, 200.0, 250.0, 50, 200, 950, 200)),
+        ("TraceStore.append", trace_appender),
+    ]
+
+def maze_benchmarks(cells):
+    # Collision, sensing and full control steps in a generated maze
+    maze = benchmark_maze(cells)
+    params = maze.simulation_params()
+    walls = params["walls"]
+    x, y = maze.start
+    n = len(walls)
+    benchmarks = [
+        (f"check_collision[{n} walls]", lambda: lambda: simulation.check_collision(x, y, walls)),
+        (f"get_sensor_readings[{n} walls]",
+         lambda: lambda: simulation.get_sensor_readings(x, y, 315, walls, 150, 0.6)),
+    ]
+    for label, options in (("scalar", {}), ("vectorized", {"vectorized": True}),
+                           ("spatial_index", {"spatial_index": True}),
+                           ("neighbor_list", {"neighbor_list": True, "spatial_index": True}),
+                           ("distance_field", {"distance_field": True})):
+        benchmarks.append((f"step[{label}, {n} walls]",
+                           functools.partial(step_setup, options, params)))
+    # Sensing cost of dense sensor arrays, per call at the start position
+    for label, options in (("default", {}), ("spatial_index", {"spatial_index": True}),
+                           ("neighbor_list", {"neighbor_list": True, "spatial_index": True}),
+                           ("distance_field", {"distance_field": True}),
+                           ("vectorized", {"neighbor_list": True, "spatial_index": True, "vectorized": True})):
+        for rays_per_side in RAYS_PER_SIDE:
+            benchmarks.append((f"sense[{label}, {2 * rays_per_side} rays, {n} walls]",
+                               functools.partial(sense_setup, dict(options, rays_per_side=rays_per_side), params)))
+    return benchmarks
+
+def step_setup(options, params):
+    return stepper(simulation.Simulation(seed=0, **options, **params))
+
+def sense_setup(options, params):
+    return simulation.Simulation(seed=0, **options, **params).sense
+
+def batch_setup(count, params):
+    from batch_simulation import BatchSimulation
+
+    return BatchSimulation(count, seeds=range(count), **params).step
+
+def batch_benchmarks(vehicle_counts, cells):
+    # One BatchSimulation step; reported per batch step, not per vehicle
+    params = benchmark_maze(cells).simulation_params()
+    return [(f"batch_step[{count} vehicles, {len(params['walls'])} walls]", functools.partial(batch_setup, count, params))
+            for count in vehicle_counts]
+
+def frame_setup(cells):
+    # A full rendered frame to an offscreen surface
+    import pygame
+    from renderer import Renderer
+
+    pygame.init()
+    maze = benchmark_maze(cells)
+    width = int(maze.bounds[2] + 50)
+    height = int(maze.bounds[3] + 50)
+    renderer = Renderer(pygame.Surface((width, height)), maze.wall_list(), maze.start, maze.finish)
+    # The spatial index keeps the simulation share of the frame small
+    sim = simulation.Simulation(seed=0, spatial_index=True, **maze.simulation_params())
+
+    def frame():
+        if sim.step():
+            sim.reset()
+            renderer.reset_trace()
+        renderer.draw_background()
+        renderer.add_trace_point((int(sim.robot_x), int(sim.robot_y)))
+        renderer.draw_robot(sim.robot_x, sim.robot_y, sim.heading_angle)
+        renderer.draw_sensor_rays(
+            simulation.sensor_rays(sim.robot_x, sim.robot_y, sim.heading_angle, sim.sensor_range),
+            (sim.left_reading, sim.right_reading)
+        )
+        renderer.draw_info([f"Speed: {sim.speed:.2f}", f"Time: {sim.elapsed_time:.2f}s",
+                            f"Collisions: {sim.collision_count}"])
+    return frame
+
+def render_benchmarks(cells):
+    return [(f"frame[{benchmark_maze(cells).wall_count} walls]", functools.partial(frame_setup, cells))]
+
+def collect_benchmarks(maze_sizes=MAZE_SIZES, vehicle_counts=VEHICLE_COUNTS, render=True):
+    benchmarks = micro_benchmarks()
+    for cells in maze_sizes:
+        benchmarks += maze_benchmarks(cells)
+    benchmarks += batch_benchmarks(vehicle_counts, maze_sizes[len(maze_sizes) // 2])
+    if render:
+        for cells in maze_sizes:
+            benchmarks += render_benchmarks(cells)
+    return benchmarks
+
+def run_benchmarks(benchmarks, min_time=MIN_TIME, pattern=None):
+    results = {}
+    for name, setup in benchmarks:
+        if pattern and pattern not in name:
+            continue
+        results[name] = time_operation(setup(), min_time)
+        print(f"{name:<48} {results[name]:>12.1f} ops/s", flush=True)
+    return results
+
+def compare(results, baseline, threshold):
+    # Benchmarks slower than baseline by more than threshold (a fraction)
+    regressions = []
+    print(f"\n{'Benchmark':<48} {'ops/s':>12} {'baseline':>12} {'change':>8}")
+    print("-" * 84)
+    for name, ops in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<48} {ops:>12.1f} {'-':>12} {'new':>8}")
+            continue
+        change = ops / base - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<48} {ops:>12.1f} {base:>12.1f} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation hot paths.")
+    parser.add_argument("--maze-sizes", type=int, nargs="+", default=list(MAZE_SIZES),
+                        help="cells per side of the generated mazes")
+    parser.add_argument("--vehicles", type=int, nargs="+", default=list(VEHICLE_COUNTS),
+                        help="vehicle counts for the batch benchmarks")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="seconds per benchmark run")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--no-render", action="store_true", help="skip the rendered frame benchmarks")
+    parser.add_argument("--save-baseline", help="write the results to this baseline file")
+    parser.add_argument("--compare", help="baseline file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown fraction flagged as a regression (default 0.2)")
+    args = parser.parse_args()
+
+    benchmarks = collect_benchmarks(args.maze_sizes, args.vehicles, render=not args.no_render)
+    results = run_benchmarks(benchmarks, args.min_time, args.filter)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Baseline saved to '{args.save_baseline}'")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
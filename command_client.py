@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import json
+import time
+
+from command_server import DEFAULT_HOST, DEFAULT_PORT, STREAM_RATE
+
+# Scripted client for the teleoperation command server (command_server.py).
+#
+# Plays a list of timed drive commands and prints the robot state streamed
+# back. A script is a JSON list of {"turn": .., "throttle": .., "duration": s}
+# steps; --burst sends every command many times at once to exercise the
+# server's coalescing.
+#
+#   python my_teleoperation.py --listen 8765
+#   python command_client.py --port 8765 --burst 100
+
+DEMO_SCRIPT = [
+    {"throttle": 1, "duration": 1.0},
+    {"throttle": 1, "turn": 1, "duration": 0.5},
+    {"throttle": 0, "duration": 1.0},
+    {"throttle": -1, "turn": -0.5, "duration": 0.5},
+    {"throttle": 0, "duration": 0.5},
+]
+
+async def drive(script, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, rate=STREAM_RATE, burst=1,
+                on_state=None):
+    # Run the script against a server; returns the states received
+    if path:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write(json.dumps({"rate": rate}).encode() + b"\n")
+    states = []
+
+    async def receive():
+        async for line in reader:
+            state = json.loads(line)
+            state["received"] = time.perf_counter()
+            states.append(state)
+            if on_state is not None:
+                on_state(state)
+
+    receiver = asyncio.create_task(receive())
+    try:
+        for step in script:
+            if receiver.done():
+                break  # The server hung up
+            command = {"turn": step.get("turn", 0), "throttle": step.get("throttle", 0)}
+            writer.write((json.dumps(command) + "\n").encode() * burst)
+            await writer.drain()
+            await asyncio.sleep(step.get("duration", 0))
+        writer.close()
+        await writer.wait_closed()
+    except ConnectionError:
+        print("Server closed the connection")
+    receiver.cancel()
+    return states
+
+def print_state(state):
+    print(f"#{state['seq']:<6} t={state['time']:7.2f}  x={state['x']:7.1f}  y={state['y']:7.1f}  "
+          f"heading={state['heading'] % 360:6.1f}  speed={state['speed']:5.2f}  "
+          f"sensors=({state['left']:.2f}, {state['right']:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the teleoperated robot from a script.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="Unix socket path of the server (instead of TCP)")
+    parser.add_argument("--script", help="JSON list of timed commands (default: a short demo)")
+    parser.add_argument("--rate", type=float, default=STREAM_RATE, help="state messages per second")
+    parser.add_argument("--burst", type=int, default=1, help="send every command this many times")
+    parser.add_argument("--quiet", action="store_true", help="only print a summary")
+    args = parser.parse_args()
+
+    script = DEMO_SCRIPT
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    states = asyncio.run(drive(script, args.host, args.port, args.unix, args.rate, args.burst,
+                               None if args.quiet else print_state))
+    if len(states) > 1:
+        span = states[-1]["received"] - states[0]["received"]
+        print(f"{len(states)} states in {span:.2f}s ({(len(states) - 1) / span:.1f}/s), "
+              f"{states[-1]['seq'] - states[0]['seq'] + 1} frames published")
+
+
+if __name__ == "__main__":
+    main()
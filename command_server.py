@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+
+# Local command endpoint for remote teleoperation.
+#
+# An asyncio server runs in a background thread and speaks newline-delimited
+# JSON over TCP (localhost) or a Unix socket. Clients send drive commands
+#   {"turn": -1..1, "throttle": -1..1}
+# where turn scales the turning speed (positive turns left) and the sign of
+# throttle accelerates forward or backward like the UP and DOWN keys (0
+# coasts), and optionally {"rate": hz} to change how often they receive state.
+# The server streams the latest published robot state back to every client,
+#   {"seq": n, "time": s, "x": .., "y": .., "heading": .., "speed": .., "left": .., "right": ..}
+#
+# The render loop never waits on the network. Incoming data is read in
+# chunks and only the last command of each chunk is kept, so a burst of
+# commands costs one update; the loop reads the newest command once per frame
+# with command(). State goes out at most `rate` times per second, and a frame
+# is skipped for a client whose socket buffer is still full, so a slow client
+# loses updates instead of growing a queue. A client that disconnects leaves
+# the robot coasting.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+STREAM_RATE = 30  # State messages per second per client
+MAX_STREAM_RATE = 240
+HIGH_WATER = 64 * 1024  # Bytes buffered for a client before state frames are skipped
+READ_SIZE = 64 * 1024
+MAX_LINE = 4096
+
+IDLE = (0.0, 0.0)  # (turn, throttle)
+
+def clamp(value):
+    return max(-1.0, min(1.0, float(value)))
+
+class CommandServer:
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, stream_rate=STREAM_RATE, logger=None):
+        self.host = host
+        self.port = port
+        self.path = path  # Unix socket path; used instead of TCP when given
+        self.stream_rate = stream_rate
+        self.logger = logger or logging.getLogger("command_server")
+        self.latest_command = IDLE
+        self.commander = None  # Client that sent latest_command
+        self.latest_state = (0, None)  # (seq, state)
+        self.commands_received = 0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.address = None
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.stopping = None
+        self.connections = {}  # Handler task -> writer of every connected client
+
+    def start(self):
+        # Start serving in a background thread; returns once the socket is bound
+        self.thread = threading.Thread(target=asyncio.run, args=(self.serve(),), daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.address is None:
+            raise OSError(f"command server could not listen on {self.path or (self.host, self.port)}")
+        self.logger.info("Command server listening on %s", self.address)
+
+    def stop(self):
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.stopping.set)
+            self.thread.join()
+
+    def command(self):
+        # Newest (turn, throttle); safe to call from the render loop
+        return self.latest_command
+
+    def publish(self, state):
+        # Make state the next one streamed to clients; safe to call from the render loop
+        seq = self.latest_state[0] + 1
+        self.latest_state = (seq, dict(state, seq=seq))
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        try:
+            if self.path:
+                server = await asyncio.start_unix_server(self.handle, self.path, limit=MAX_LINE)
+                self.address = self.path
+            else:
+                server = await asyncio.start_server(self.handle, self.host, self.port, limit=MAX_LINE)
+                self.address = "%s:%d" % server.sockets[0].getsockname()[:2]
+        except OSError as error:
+            self.logger.error("Command server failed to start: %s", error)
+            self.ready.set()
+            return
+        self.ready.set()
+        async with server:
+            await self.stopping.wait()
+            # Hang up on the clients and let their handlers finish
+            for writer in self.connections.values():
+                writer.close()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+        if self.path:
+            os.remove(self.path)
+
+    async def handle(self, reader, writer):
+        client = {"rate": self.stream_rate, "peer": writer.get_extra_info("peername") or self.path}
+        self.logger.info("Client connected: %s", client["peer"])
+        streamer = asyncio.create_task(self.stream(writer, client))
+        self.connections[asyncio.current_task()] = writer
+        pending = b""
+        try:
+            while True:
+                chunk = await reader.read(READ_SIZE)
+                if not chunk:
+                    break
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                if len(pending) > MAX_LINE:
+                    self.logger.warning("Dropping oversized message from %s", client["peer"])
+                    pending = b""
+                # Coalesce: only the last command in the batch takes effect
+                command = None
+                for line in lines:
+                    message = self.parse(line, client)
+                    if message is not None:
+                        command = message
+                if command is not None:
+                    self.latest_command = command
+                    self.commander = client
+        except ConnectionError:
+            pass
+        finally:
+            streamer.cancel()
+            if self.commander is client:
+                self.latest_command = IDLE
+                self.commander = None
+            writer.close()
+            del self.connections[asyncio.current_task()]
+            self.logger.info("Client disconnected: %s", client["peer"])
+
+    def parse(self, line, client):
+        # (turn, throttle) for a drive command, None for anything else
+        if not line.strip():
+            return None
+        try:
+            message = json.loads(line)
+            if "rate" in message:
+                client["rate"] = min(MAX_STREAM_RATE, max(1.0, float(message["rate"])))
+            if "turn" not in message and "throttle" not in message:
+                return None
+            self.commands_received += 1
+            return (clamp(message.get("turn", 0)), clamp(message.get("throttle", 0)))
+        except (ValueError, TypeError, AttributeError):
+            self.logger.warning("Ignoring malformed command from %s: %r", client["peer"], line[:80])
+            return None
+
+    async def stream(self, writer, client):
+        last_seq = 0
+        while True:
+            await asyncio.sleep(1 / client["rate"])
+            seq, state = self.latest_state
+            if seq == last_seq or state is None:
+                continue
+            if writer.transport.is_closing():
+                return
+            if writer.transport.get_write_buffer_size() > HIGH_WATER:
+                self.frames_skipped += 1
+                continue
+            writer.write(json.dumps(state).encode() + b"\n")
+            self.frames_sent += 1
+            last_seq = seq
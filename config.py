@@ -0,0 +1,60 @@
+import json
+
+# Command line parsing with an optional JSON config file.
+#
+# The config file holds an object whose keys are the long option names, with
+# either dashes or underscores ({"max-speed": 8, "maze": "mazes/default.json"}).
+# Its values replace the parser defaults, and flags given on the command line
+# override both. Each value is converted with its option's type and checked
+# against its choices, so a bad value in the file is reported like a bad flag.
+
+def load_config(path):
+    with open(path) as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path} must hold a JSON object of option values")
+    return {key.replace("-", "_"): value for key, value in config.items()}
+
+def convert(action, value):
+    # value as parsing it from the command line would give it; null leaves
+    # an option unset
+    if value is None:
+        return None
+    if action.nargs == 0:  # Flags such as --verbose
+        if not isinstance(value, bool):
+            raise ValueError("expected true or false")
+        return value
+    many = action.nargs not in (None, "?")
+    if not many and isinstance(value, list):
+        raise ValueError("expected a single value")
+    values = value if isinstance(value, list) else [value]
+    if isinstance(action.nargs, int) and len(values) != action.nargs:
+        raise ValueError(f"expected {action.nargs} values")
+    if action.type is not None:
+        values = [action.type(v) for v in values]
+    if action.choices is not None and any(v not in action.choices for v in values):
+        raise ValueError(f"expected one of {', '.join(map(str, action.choices))}")
+    return values if many else values[0]
+
+def parse_args(parser, argv=None):
+    # parser.parse_args() with a --config FILE option added
+    parser.add_argument("--config", help="JSON file of option values (flags override it)")
+    args, _ = parser.parse_known_args(argv)
+    if args.config:
+        try:
+            config = load_config(args.config)
+        except (OSError, ValueError) as error:
+            parser.error(f"cannot read config file: {error}")
+        known = {action.dest for action in parser._actions}
+        unknown = sorted(set(config) - known)
+        if unknown:
+            parser.error(f"unknown option(s) in {args.config}: {', '.join(unknown)}")
+        for action in parser._actions:
+            if action.dest in config:
+                try:
+                    config[action.dest] = convert(action, config[action.dest])
+                except (TypeError, ValueError) as error:
+                    parser.error(f"bad value for {action.dest} in {args.config}: "
+                                 f"{config[action.dest]!r} ({error})")
+        parser.set_defaults(**config)
+    return parser.parse_args(argv)
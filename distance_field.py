@@ -0,0 +1,246 @@
+import argparse
+import hashlib
+import math
+import os
+import random
+import time
+
+import numpy as np
+
+import simulation
+from atomic_file import write_atomic
+from maze import load_maze, default_maze
+from spatial_index import SpatialGrid
+
+# Precomputed distance field of the maze walls.
+#
+# The maze is rasterized once into a grid holding, at every node, the distance
+# to the nearest wall, truncated at `truncation` pixels. Walls are segments
+# with no inside, so the field is unsigned. Queries interpolate bilinearly
+# between the four surrounding nodes, so in open space a collision check is
+# one lookup and a sensor ray is a short sphere trace through the field,
+# whatever the number of walls. Points outside the grid are further than the
+# truncation distance from every wall.
+#
+# Interpolation is off from the true distance by at most `slack` (half a cell
+# diagonal), so the trace steps by the field value minus the slack and never
+# jumps over a wall. Near walls, at wall ends and in thin gaps the field cannot
+# tell a hit from a near miss, so there the answer comes from the exact tests
+# against the few walls in the surrounding cells of a spatial grid: once the
+# field along a ray drops below near_distance, the next EXACT_STRETCH cells of
+# the ray are cast exactly, and a collision check whose field value is within
+# slack of the robot radius is checked exactly. Readings and collisions are
+# therefore the same as the exact engine's; the field only skips open space.
+# A finer resolution traces closer to the walls before casting exactly, but is
+# slower to build and larger on disk. cross_check() compares the field
+# against the exact line_intersection path.
+#
+# The trace follows one ray at a time. Sensor arrays with several rays per
+# side are therefore cast exactly in one NumPy call instead (see
+# Simulation.ray_distances()): a NumPy sphere trace of all rays together was
+# measured slower than that, since most rays in a maze end near a wall and
+# need the exact cast anyway.
+#
+# Built fields are cached in DEFAULT_DIRECTORY, keyed by a hash of the walls,
+# the resolution and the truncation.
+
+DEFAULT_RESOLUTION = 2.0  # Pixels between grid nodes
+DEFAULT_TRUNCATION = 64.0  # Largest stored distance, and so the longest trace step
+DEFAULT_DIRECTORY = ".distance_field_cache"
+FIELD_VERSION = 1
+NEAR_CELLS = 2  # Field value, in cells beyond the slack, below which rays are cast exactly
+EXACT_STRETCH = 8  # Cells of a ray cast exactly at a time near walls
+
+def field_key(walls, resolution, truncation):
+    digest = hashlib.sha256()
+    digest.update(np.asarray(walls, dtype="<f8").reshape(-1, 4).tobytes())
+    digest.update(np.array([resolution, truncation, FIELD_VERSION], dtype="<f8").tobytes())
+    return digest.hexdigest()
+
+def rasterize(walls, resolution=DEFAULT_RESOLUTION, truncation=DEFAULT_TRUNCATION):
+    # Returns (origin_x, origin_y, field) with field[row, col] the truncated
+    # distance from (origin_x + col * resolution, origin_y + row * resolution)
+    # to the nearest wall. Each wall only updates the nodes within truncation
+    # of it, so the cost grows with the total wall length, not the grid size.
+    walls = np.asarray(walls, dtype=np.float64).reshape(-1, 4)
+    if len(walls) == 0:
+        return 0.0, 0.0, np.full((1, 1), float(truncation))
+    min_x = min(walls[:, 0].min(), walls[:, 2].min()) - truncation
+    min_y = min(walls[:, 1].min(), walls[:, 3].min()) - truncation
+    max_x = max(walls[:, 0].max(), walls[:, 2].max()) + truncation
+    max_y = max(walls[:, 1].max(), walls[:, 3].max()) + truncation
+    cols = int(math.ceil((max_x - min_x) / resolution)) + 1
+    rows = int(math.ceil((max_y - min_y) / resolution)) + 1
+    field = np.full((rows, cols), truncation)
+
+    for x1, y1, x2, y2 in walls:
+        c0 = max(0, int((min(x1, x2) - truncation - min_x) / resolution))
+        c1 = min(cols, int(math.ceil((max(x1, x2) + truncation - min_x) / resolution)) + 1)
+        r0 = max(0, int((min(y1, y2) - truncation - min_y) / resolution))
+        r1 = min(rows, int(math.ceil((max(y1, y2) + truncation - min_y) / resolution)) + 1)
+        xs = min_x + np.arange(c0, c1) * resolution
+        ys = min_y + np.arange(r0, r1)[:, None] * resolution
+        # Point to segment distance, as geometry.point_to_line_distance()
+        C, D = x2 - x1, y2 - y1
+        len_sq = C * C + D * D
+        if len_sq == 0:
+            param = 0.0
+        else:
+            param = np.clip(((xs - x1) * C + (ys - y1) * D) / len_sq, 0, 1)
+        distance = np.sqrt((xs - (x1 + param * C)) ** 2 + (ys - (y1 + param * D)) ** 2)
+        np.minimum(field[r0:r1, c0:c1], distance, out=field[r0:r1, c0:c1])
+    return float(min_x), float(min_y), field
+
+class DistanceField:
+
+    def __init__(self, origin_x, origin_y, field, walls=(), resolution=DEFAULT_RESOLUTION,
+                 truncation=DEFAULT_TRUNCATION):
+        self.origin_x = float(origin_x)
+        self.origin_y = float(origin_y)
+        self.field = field
+        self.resolution = resolution
+        self.truncation = truncation
+        self.rows, self.cols = field.shape
+        self.slack = resolution * math.sqrt(2) / 2
+        self.near_distance = self.slack + NEAR_CELLS * resolution
+        self.exact_stretch = EXACT_STRETCH * resolution
+        # Walls by cell, for the exact tests near walls
+        self.grid = SpatialGrid(walls)
+        # Indexing a flat list is much faster than NumPy scalar access
+        self.values = field.ravel().tolist()
+
+    def distance(self, x, y):
+        # Interpolated distance from (x, y) to the nearest wall
+        gx = (x - self.origin_x) / self.resolution
+        gy = (y - self.origin_y) / self.resolution
+        col = math.floor(gx)
+        row = math.floor(gy)
+        if col < 0 or row < 0 or col >= self.cols - 1 or row >= self.rows - 1:
+            return self.truncation
+        fx = gx - col
+        fy = gy - row
+        i = row * self.cols + col
+        v = self.values
+        top = v[i] + (v[i + 1] - v[i]) * fx
+        bottom = v[i + self.cols] + (v[i + self.cols + 1] - v[i + self.cols]) * fx
+        return top + (bottom - top) * fy
+
+    def check_collision(self, x, y, robot_size=simulation.ROBOT_SIZE):
+        radius = robot_size / 2
+        d = self.distance(x, y)
+        if abs(d - radius) > self.slack:
+            return d < radius
+        return simulation.check_collision(x, y, self.grid.walls_near_point(x, y, radius), robot_size)
+
+    def ray_distance(self, sensor_x, sensor_y, ray_end_x, ray_end_y, sensor_range):
+        # Sphere trace along the ray, casting exactly near walls; sensor_range
+        # if no wall is reached
+        length = math.sqrt((ray_end_x - sensor_x) ** 2 + (ray_end_y - sensor_y) ** 2)
+        if length == 0:
+            return sensor_range
+        ux = (ray_end_x - sensor_x) / length
+        uy = (ray_end_y - sensor_y) / length
+        t = 0.0
+        while t < length:
+            x = sensor_x + ux * t
+            y = sensor_y + uy * t
+            d = self.distance(x, y)
+            if d >= self.near_distance:
+                t += d - self.slack
+                continue
+            # The ray is clear up to t, so a hit on the walls along the next
+            # stretch within it is the first hit of the whole ray. It is
+            # measured over the whole ray, exactly as ray_distance() does.
+            end = min(t + self.exact_stretch, length)
+            walls = self.grid.walls_along_segment(x, y, sensor_x + ux * end, sensor_y + uy * end)
+            distance = simulation.ray_distance(sensor_x, sensor_y, ray_end_x, ray_end_y, walls, sensor_range)
+            if distance <= end:
+                return distance
+            t = end
+        return sensor_range
+
+    def get_sensor_readings(self, x, y, heading_angle, sensor_range, sensitivity,
+                            robot_size=simulation.ROBOT_SIZE):
+        # Same as simulation.get_sensor_readings(), traced through the field
+        readings = []
+        for ray in simulation.sensor_rays(x, y, heading_angle, sensor_range, robot_size):
+            distance = self.ray_distance(*ray, sensor_range)
+            readings.append(simulation.distance_to_reading(distance, sensor_range, sensitivity))
+        return tuple(readings)
+
+
+def build_field(walls, resolution=DEFAULT_RESOLUTION, truncation=DEFAULT_TRUNCATION,
+                directory=DEFAULT_DIRECTORY):
+    # DistanceField for walls, loaded from the disk cache when it was built
+    # before. Pass directory=None to skip the cache.
+    path = None
+    if directory is not None:
+        path = os.path.join(directory, field_key(walls, resolution, truncation) + ".npz")
+        try:
+            with np.load(path) as data:
+                origin_x, origin_y = data["origin"].tolist()
+                return DistanceField(origin_x, origin_y, data["field"], walls, resolution, truncation)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    origin_x, origin_y, field = rasterize(walls, resolution, truncation)
+    if path is not None:
+        # Write atomically so parallel workers never load half a file
+        os.makedirs(directory, exist_ok=True)
+        write_atomic(path, lambda f: np.savez(f, origin=np.array([origin_x, origin_y]), field=field), "wb")
+    return DistanceField(origin_x, origin_y, field, walls, resolution, truncation)
+
+def cross_check(field, walls, samples=2000, sensor_range=150, robot_size=simulation.ROBOT_SIZE, seed=0):
+    # Compare the field against the exact point-to-segment and line_intersection
+    # paths at random robot poses inside the walls' bounding box. Returns the
+    # share of collision results that disagree and the ray distance errors,
+    # measured from the poses that are clear of the walls; all should be zero.
+    rng = random.Random(seed)
+    walls = list(walls)
+    xs = [v for wall in walls for v in (wall[0], wall[2])]
+    ys = [v for wall in walls for v in (wall[1], wall[3])]
+    errors = []
+    mismatches = 0
+    for _ in range(samples):
+        x = rng.uniform(min(xs), max(xs))
+        y = rng.uniform(min(ys), max(ys))
+        heading = rng.uniform(0, 360)
+        collided = simulation.check_collision(x, y, walls, robot_size)
+        if field.check_collision(x, y, robot_size) != collided:
+            mismatches += 1
+        if collided:
+            continue
+        for ray in simulation.sensor_rays(x, y, heading, sensor_range, robot_size):
+            exact = simulation.ray_distance(*ray, walls, sensor_range)
+            errors.append(abs(field.ray_distance(*ray, sensor_range) - exact))
+    errors.sort()
+    return {
+        "max_error": errors[-1] if errors else 0.0,
+        "p99_error": errors[int(0.99 * (len(errors) - 1))] if errors else 0.0,
+        "mean_error": sum(errors) / len(errors) if errors else 0.0,
+        "collision_mismatch": mismatches / samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a maze distance field and check it against the exact geometry.")
+    parser.add_argument("--maze", help="maze file (default: the built-in maze)")
+    parser.add_argument("--resolution", type=float, default=DEFAULT_RESOLUTION, help="pixels between grid nodes")
+    parser.add_argument("--truncation", type=float, default=DEFAULT_TRUNCATION, help="largest stored distance")
+    parser.add_argument("--samples", type=int, default=2000, help="random poses for the cross-check")
+    parser.add_argument("--no-cache", action="store_true", help="always rebuild the field")
+    args = parser.parse_args()
+
+    maze = load_maze(args.maze) if args.maze else default_maze()
+    walls = maze.wall_list()
+    start = time.perf_counter()
+    field = build_field(walls, args.resolution, args.truncation, None if args.no_cache else DEFAULT_DIRECTORY)
+    print(f"Field: {field.cols}x{field.rows} nodes for {len(walls)} walls in {time.perf_counter() - start:.3f}s")
+    check = cross_check(field, walls, args.samples)
+    print(f"Ray distance error: mean {check['mean_error']:.3f} px, p99 {check['p99_error']:.2f} px, "
+          f"max {check['max_error']:.2f} px")
+    print(f"Collision mismatches: {check['collision_mismatch']:.2%}")
+
+
+if __name__ == "__main__":
+    main()
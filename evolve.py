@@ -0,0 +1,331 @@
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import simulation
+from atomic_file import write_atomic
+from maze import default_maze, generate_maze, load_maze
+from result_cache import DEFAULT_DIRECTORY, ResultCache
+from sensor_array import CENTER_ANGLE
+
+# Evolutionary tuning of the whole Braitenberg controller.
+#
+# A genome is one value per gene in GENES: the sensitivity, the turn rate, the
+# slow-down gain, the sensor range, the angle of the sensors from the heading
+# and the two wiring weights of the turn law. A real-coded genetic algorithm
+# evolves a population of them. Parents are picked by tournament, children
+# are a blend of two parents (BLX-alpha) with Gaussian mutation, and the best
+# genomes are carried over unchanged. The first population holds the default
+# controller, so the champion never ranks below it on the training set.
+#
+# Fitness is measured over every maze and seed: first the share of trials that
+# reach the finish, then the mean score (time + collisions * 2, lower is
+# better). A trial that times out only scores the timeout plus its collisions,
+# so a controller that creeps along without finishing could otherwise beat
+# one that finishes; genomes are therefore ranked by completion rate first and
+# by mean score only among equal completion rates. All genomes of all
+# generations use the same mazes and seeds, so fitness values are comparable
+# across generations and a genome is only evaluated once.
+#
+# A generation's trials are spread across a process pool whose workers receive
+# the mazes once when they start. Everything random comes from the --seed of
+# the run, so a run can be repeated exactly.
+#
+# After every generation, the output directory gets the per-generation
+# statistics (generations.csv), the best controller so far as a config file
+# for my_autonomous.py (champion.json) and the state needed to continue the
+# run with --resume (state.json). Each is written to a temporary file and then
+# renamed, so an interrupted run never leaves a half-written file.
+#
+#   python evolve.py --generations 50 --population 32 --out evolution
+#   python my_autonomous.py --config evolution/champion.json
+
+# (name, low, high, default)
+GENES = (
+    ("sensitivity", 0.1, 1.5, 0.6),
+    ("turn_rate", 0.5, 6.0, 2.0),
+    ("slow_down", 0.0, 0.95, simulation.SLOW_DOWN),
+    ("sensor_range", 50.0, 300.0, 150.0),
+    ("sensor_angle", 10.0, 80.0, CENTER_ANGLE),
+    ("wiring_right", 0.0, 2.0, simulation.WIRING[0]),
+    ("wiring_left", 0.0, 2.0, simulation.WIRING[1]),
+)
+POPULATION = 24
+GENERATIONS = 30
+ELITE = 2  # Best genomes copied into the next generation unchanged
+TOURNAMENT = 3
+CROSSOVER_RATE = 0.9
+BLEND = 0.5  # BLX-alpha: children range this far beyond their parents' interval
+MUTATION_RATE = 0.3  # Chance that a gene is mutated
+MUTATION_SCALE = 0.1  # Standard deviation of a mutation, as a fraction of the gene's range
+SEEDS = 2  # Trial seeds per maze
+GENERATED_MAZES = 2  # Generated mazes added to the built-in one when no maze files are given
+FIELDNAMES = (("generation", "evaluations", "completion", "best_completion", "best", "mean", "std", "worst",
+               "champion_completion", "champion") + tuple(g[0] for g in GENES))
+
+worker = {}  # Per-process maze and trial settings, set up by init_worker()
+
+def default_genome():
+    return tuple(default for _, _, _, default in GENES)
+
+def random_genome(rng):
+    return tuple(round(rng.uniform(low, high), 4) for _, low, high, _ in GENES)
+
+def clip(genome):
+    return tuple(round(min(max(value, low), high), 4) for value, (_, low, high, _) in zip(genome, GENES))
+
+def controller_params(genome):
+    # Simulation keyword arguments of a genome
+    params = {name: value for (name, _, _, _), value in zip(GENES, genome)}
+    params["wiring"] = (params.pop("wiring_right"), params.pop("wiring_left"))
+    return params
+
+def training_mazes(paths=(), generated=GENERATED_MAZES):
+    # The maze files given, or the built-in maze and a few generated ones
+    if paths:
+        return [load_maze(path) for path in paths]
+    return [default_maze()] + [generate_maze(5, 5, cell_size=180, seed=i, loop_fraction=0.2)
+                               for i in range(generated)]
+
+def init_worker(maze_params, timeout, cache_directory, fixed_params):
+    worker.update(maze_params=maze_params, timeout=timeout, fixed_params=fixed_params,
+                  cache=ResultCache(cache_directory) if cache_directory else None)
+
+def run_task(task):
+    # (completed, score) of one genome in one maze with one seed
+    genome, maze_index, seed = task
+    params = dict(worker["fixed_params"], seed=seed, **worker["maze_params"][maze_index])
+    params.update(controller_params(genome))
+    if worker["cache"] is not None:
+        result = worker["cache"].run_trial(worker["timeout"], **params)
+    else:
+        result = simulation.run_trial(worker["timeout"], **params)
+    return result["completed"], result["score"]
+
+
+class Evolution:
+
+    def __init__(self, mazes, seeds=SEEDS, population=POPULATION, timeout=simulation.TIMEOUT, seed=0,
+                 workers=None, cache_directory=None, **fixed_params):
+        if population <= ELITE:
+            raise ValueError(f"the population must be larger than the {ELITE} elite genomes")
+        self.mazes = mazes
+        self.seeds = seeds
+        self.population_size = population
+        self.timeout = timeout
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_directory = cache_directory
+        self.fixed_params = fixed_params
+        self.rng = random.Random(seed)
+        self.generation = 0
+        self.population = [default_genome()] + [random_genome(self.rng) for _ in range(population - 1)]
+        self.fitness = {}  # Genome -> (completion rate, mean score) over every maze and seed
+        self.history = []  # One statistics row per generation
+        self.pool = None
+
+    def rank(self, genome):
+        # Sort key, best first: highest completion rate, then lowest mean score
+        completion, score = self.fitness[genome]
+        return -completion, score
+
+    @property
+    def champion(self):
+        return min(self.fitness, key=self.rank)
+
+    def evaluate(self, genomes):
+        # Fill in the fitness of genomes not evaluated before
+        new = list(dict.fromkeys(genome for genome in genomes if genome not in self.fitness))
+        tasks = [(genome, maze, seed) for genome in new for maze in range(len(self.mazes))
+                 for seed in range(self.seeds)]
+        if not tasks:
+            return
+        if self.workers == 1:
+            init_worker(*self.worker_args())
+            results = list(map(run_task, tasks))
+        else:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                                initargs=self.worker_args())
+            chunksize = max(1, len(tasks) // (self.workers * 4))
+            results = list(self.pool.map(run_task, tasks, chunksize=chunksize))
+        trials = len(self.mazes) * self.seeds
+        for i, genome in enumerate(new):
+            completed, scores = zip(*results[i * trials:(i + 1) * trials])
+            self.fitness[genome] = (statistics.fmean(completed), statistics.fmean(scores))
+
+    def worker_args(self):
+        maze_params = [maze.simulation_params() for maze in self.mazes]
+        return maze_params, self.timeout, self.cache_directory, self.fixed_params
+
+    def select(self, ranked):
+        # Tournament selection from a population ranked best first
+        return ranked[min(self.rng.randrange(len(ranked)) for _ in range(TOURNAMENT))]
+
+    def crossover(self, a, b):
+        if self.rng.random() >= CROSSOVER_RATE:
+            return a
+        child = []
+        for x, y in zip(a, b):
+            low, high = min(x, y), max(x, y)
+            extra = BLEND * (high - low)
+            child.append(self.rng.uniform(low - extra, high + extra))
+        return child
+
+    def mutate(self, genome):
+        return clip(value + self.rng.gauss(0, MUTATION_SCALE * (high - low))
+                    if self.rng.random() < MUTATION_RATE else value
+                    for value, (_, low, high, _) in zip(genome, GENES))
+
+    def step(self):
+        # Evaluate the current population, record its statistics and breed the next one
+        self.evaluate(self.population)
+        completion = [self.fitness[genome][0] for genome in self.population]
+        scores = [self.fitness[genome][1] for genome in self.population]
+        ranked = sorted(self.population, key=self.rank)
+        champion = self.champion
+        row = {
+            "generation": self.generation,
+            "evaluations": len(self.fitness),
+            "completion": statistics.fmean(completion),
+            "best_completion": self.fitness[ranked[0]][0],
+            "best": self.fitness[ranked[0]][1],
+            "mean": statistics.fmean(scores),
+            "std": statistics.pstdev(scores),
+            "worst": max(scores),
+            "champion_completion": self.fitness[champion][0],
+            "champion": self.fitness[champion][1],
+        }
+        row.update(zip((g[0] for g in GENES), champion))
+        self.history.append(row)
+
+        children = ranked[:ELITE]
+        while len(children) < self.population_size:
+            children.append(self.mutate(self.crossover(self.select(ranked), self.select(ranked))))
+        self.population = children
+        self.generation += 1
+        return row
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def settings(self):
+        # What fitness values depend on; a run can only be resumed with the same
+        return {
+            "mazes": [maze.simulation_params() for maze in self.mazes],
+            "seeds": self.seeds,
+            "timeout": self.timeout,
+        }
+
+    def state(self):
+        # Everything needed to continue the run, as plain values
+        return {
+            "settings": self.settings(),
+            "generation": self.generation,
+            "population": self.population,
+            "fitness": [[list(genome), list(fitness)] for genome, fitness in self.fitness.items()],
+            "history": self.history,
+            "rng": self.rng.getstate(),
+        }
+
+    def restore(self, state):
+        if state["settings"] != json.loads(json.dumps(self.settings())):
+            raise ValueError("the saved run used other mazes, seeds or timeout")
+        self.generation = state["generation"]
+        self.population = [tuple(genome) for genome in state["population"]]
+        self.fitness = {tuple(genome): tuple(fitness) for genome, fitness in state["fitness"]}
+        self.history = state["history"]
+        version, internal, gauss = state["rng"]
+        self.rng.setstate((version, tuple(internal), gauss))
+
+
+def save_results(evolution, out_dir):
+    def write_history(f):
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(evolution.history)
+
+    def write_champion(f):
+        params = controller_params(evolution.champion)
+        params["wiring"] = list(params["wiring"])
+        json.dump(params, f, indent=2)
+
+    write_atomic(os.path.join(out_dir, "generations.csv"), write_history)
+    write_atomic(os.path.join(out_dir, "champion.json"), write_champion)
+    write_atomic(os.path.join(out_dir, "state.json"), lambda f: json.dump(evolution.state(), f))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evolve Braitenberg controller parameters over several mazes.")
+    parser.add_argument("--generations", type=int, default=GENERATIONS,
+                        help=f"generations to run (default {GENERATIONS})")
+    parser.add_argument("--population", type=int, default=POPULATION,
+                        help=f"genomes per generation (default {POPULATION})")
+    parser.add_argument("--mazes", nargs="+", default=[],
+                        help="maze files to train on (default: the built-in maze and generated ones)")
+    parser.add_argument("--generated", type=int, default=GENERATED_MAZES,
+                        help="generated mazes added to the built-in one without --mazes "
+                             f"(default {GENERATED_MAZES})")
+    parser.add_argument("--seeds", type=int, default=SEEDS, help=f"trial seeds per maze (default {SEEDS})")
+    parser.add_argument("--timeout", type=float, default=simulation.TIMEOUT,
+                        help="simulated seconds per trial")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the genetic algorithm (default 0)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", default="evolution", help="output directory (default 'evolution')")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the run saved in the output directory")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_DIRECTORY,
+                        help=f"reuse cached trial results from this directory (default {DEFAULT_DIRECTORY})")
+    args = parser.parse_args()
+
+    mazes = training_mazes(args.mazes, args.generated)
+    try:
+        evolution = Evolution(mazes, args.seeds, args.population, args.timeout, args.seed, args.workers,
+                              args.cache, neighbor_list=True)
+    except ValueError as error:
+        parser.error(str(error))
+    os.makedirs(args.out, exist_ok=True)
+    if args.resume:
+        try:
+            with open(os.path.join(args.out, "state.json")) as f:
+                evolution.restore(json.load(f))
+        except (OSError, ValueError) as error:
+            parser.error(f"cannot resume from '{args.out}': {error}")
+
+    trials = len(mazes) * args.seeds
+    print(f"{len(mazes)} mazes x {args.seeds} seeds = {trials} trials per genome, "
+          f"population {args.population}, {evolution.workers} workers")
+    print(f"{'Gen':>4} | {'Evals':>6} | {'Done':>5} | {'Best':>14} | {'Mean':>8} | {'Std':>7} | "
+          f"{'Champion':>14} | {'Time (s)':>8}")
+    try:
+        while evolution.generation < args.generations:
+            start = time.perf_counter()
+            row = evolution.step()
+            save_results(evolution, args.out)
+            print(f"{row['generation']:>4} | {row['evaluations']:>6} | {row['completion']:>5.0%} | "
+                  f"{row['best_completion']:>4.0%} {row['best']:>9.2f} | {row['mean']:>8.2f} | "
+                  f"{row['std']:>7.2f} | {row['champion_completion']:>4.0%} {row['champion']:>9.2f} | "
+                  f"{time.perf_counter() - start:>8.1f}")
+    finally:
+        evolution.close()
+
+    champion = evolution.champion
+    completion, score = evolution.fitness[champion]
+    default_completion, default_score = evolution.fitness[default_genome()]
+    print(f"\nChampion ({completion:.0%} finished, mean score {score:.2f}; default controller "
+          f"{default_completion:.0%} finished, {default_score:.2f}):")
+    for (name, _, _, _), value in zip(GENES, champion):
+        print(f"  {name} = {value}")
+    print(f"Saved to '{os.path.join(args.out, 'champion.json')}'; run it with "
+          f"python my_autonomous.py --config {os.path.join(args.out, 'champion.json')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import math
+
+# Geometry helpers shared by the interactive scripts and the headless engine.
+# Walls are line segments (x1, y1, x2, y2).
+
+def point_to_line_distance(x, y, x1, y1, x2, y2):
+    # Calculate distance from point (x,y) to line segment (x1,y1)-(x2,y2)
+    A = x - x1
+    B = y - y1
+    C = x2 - x1
+    D = y2 - y1
+
+    dot = A * C + B * D
+    len_sq = C * C + D * D
+
+    if len_sq == 0:  # Line segment is just a point
+        return math.sqrt(A * A + B * B)
+
+    # Calculate projection parameter
+    param = dot / len_sq
+
+    if param < 0:
+        xx = x1
+        yy = y1
+    elif param > 1:
+        xx = x2
+        yy = y2
+    else:
+        xx = x1 + param * C
+        yy = y1 + param * D
+
+    return math.sqrt((x - xx) ** 2 + (y - yy) ** 2)
+
+def line_intersection(x1, y1, x2, y2, x3, y3, x4, y4):
+    # Calculate intersection of two line segments
+    den = (y4 - y3) * (x2 - x1) - (x4 - x3) * (y2 - y1)
+
+    if den == 0:
+        return None  # Lines are parallel
+
+    ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / den
+    ub = ((x2 - x1) * (y1 - y3) - (y2 - y1) * (x1 - x3)) / den
+
+    if 0 <= ua <= 1 and 0 <= ub <= 1:
+        x = x1 + ua * (x2 - x1)
+        y = y1 + ua * (y2 - y1)
+        return (x, y)
+
+    return None
+
+def swept_circle_segment(x, y, dx, dy, radius, x1, y1, x2, y2):
+    # Continuous collision of a circle of radius moving from (x, y) by (dx, dy)
+    # against segment (x1,y1)-(x2,y2). Returns (t, nx, ny) for the earliest time
+    # of impact t in [0, 1] and the unit contact normal pointing from the wall
+    # towards the circle, or None if the circle does not hit the segment.
+    # A circle that already overlaps the segment hits at t = 0 unless it is
+    # moving away from it.
+    distance = point_to_line_distance(x, y, x1, y1, x2, y2)
+    if distance < radius:
+        cx, cy = closest_point_on_segment(x, y, x1, y1, x2, y2)
+        if distance == 0:
+            return None  # Center on the wall; no usable normal
+        nx, ny = (x - cx) / distance, (y - cy) / distance
+        if dx * nx + dy * ny < 0:
+            return (0.0, nx, ny)
+        return None
+
+    best = None
+    ux, uy = x2 - x1, y2 - y1
+    length = math.sqrt(ux * ux + uy * uy)
+
+    # The sides of the capsule around the segment
+    if length > 0:
+        nx, ny = -uy / length, ux / length
+        side = (x - x1) * nx + (y - y1) * ny
+        approach = dx * nx + dy * ny
+        if side < 0:
+            nx, ny, side, approach = -nx, -ny, -side, -approach
+        if approach < 0:
+            t = (radius - side) / approach
+            if 0 <= t <= 1:
+                param = ((x + t * dx - x1) * ux + (y + t * dy - y1) * uy) / (length * length)
+                if 0 <= param <= 1:
+                    best = (t, nx, ny)
+
+    # The rounded ends of the capsule
+    a = dx * dx + dy * dy
+    if a > 0:
+        for ex, ey in ((x1, y1), (x2, y2)):
+            fx, fy = x - ex, y - ey
+            b = 2 * (fx * dx + fy * dy)
+            c = fx * fx + fy * fy - radius * radius
+            disc = b * b - 4 * a * c
+            if disc < 0:
+                continue
+            t = (-b - math.sqrt(disc)) / (2 * a)
+            if 0 <= t <= 1 and (best is None or t < best[0]):
+                best = (t, (fx + t * dx) / radius, (fy + t * dy) / radius)
+    return best
+
+def closest_point_on_segment(x, y, x1, y1, x2, y2):
+    # Point on segment (x1,y1)-(x2,y2) closest to (x,y)
+    C = x2 - x1
+    D = y2 - y1
+    len_sq = C * C + D * D
+    if len_sq == 0:
+        return (x1, y1)
+    param = min(1, max(0, ((x - x1) * C + (y - y1) * D) / len_sq))
+    return (x1 + param * C, y1 + param * D)
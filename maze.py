@@ -0,0 +1,186 @@
+import argparse
+import json
+import random
+import struct
+import sys
+from array import array
+
+import simulation
+
+# Maze files and procedural maze generation.
+#
+# A maze is its walls, start, finish and bounds. Two file formats are supported:
+#   .json - human editable:
+#           {"bounds": [x1, y1, x2, y2], "start": [x, y], "finish": [x, y],
+#            "walls": [[x1, y1, x2, y2], ...]}
+#   .maze - compact binary for large generated mazes: a header followed by the
+#           walls as little-endian float64, read straight into a packed array.
+
+MAGIC = b"MAZE"
+VERSION = 1
+HEADER = struct.Struct("<4sII8d")  # magic, version, wall count, bounds, start, finish
+
+class Maze:
+    # Walls are kept packed as a flat array('d') of x1, y1, x2, y2 values, which
+    # NumPy can also view without copying (raycast.wall_array(maze.walls))
+
+    def __init__(self, walls, start=simulation.START, finish=simulation.FINISH, bounds=None):
+        if isinstance(walls, array) and walls.typecode == "d":
+            self.walls = walls
+        else:
+            self.walls = array("d", (value for wall in walls for value in wall))
+        if len(self.walls) % 4:
+            raise ValueError("Wall data must be a multiple of 4 values (x1, y1, x2, y2)")
+        self.start = tuple(start)
+        self.finish = tuple(finish)
+        self.bounds = tuple(bounds) if bounds is not None else self.wall_bounds()
+
+    @property
+    def wall_count(self):
+        return len(self.walls) // 4
+
+    def wall_list(self):
+        # Walls as (x1, y1, x2, y2) tuples, the form the simulation takes
+        w = self.walls
+        return [tuple(w[i:i + 4]) for i in range(0, len(w), 4)]
+
+    def wall_bounds(self):
+        if not self.walls:
+            return (0.0, 0.0, 0.0, 0.0)
+        xs = self.walls[0::2]
+        ys = self.walls[1::2]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    def simulation_params(self):
+        # Keyword arguments for simulation.Simulation and friends
+        return {"walls": self.wall_list(), "start": self.start, "finish": self.finish}
+
+
+def default_maze():
+    # The maze hard-coded in my_autonomous.py
+    return Maze(simulation.WALLS, simulation.START, simulation.FINISH, (50, 50, 950, 950))
+
+def load_maze(path):
+    if str(path).endswith(".json"):
+        with open(path) as f:
+            data = json.load(f)
+        return Maze(data["walls"], data["start"], data["finish"], data.get("bounds"))
+
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, count, *header = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} maze file")
+    walls = array("d")
+    walls.frombytes(data[HEADER.size:HEADER.size + count * 4 * walls.itemsize])
+    if sys.byteorder == "big":
+        walls.byteswap()
+    return Maze(walls, header[4:6], header[6:8], header[0:4])
+
+def _json_numbers(values):
+    # Whole numbers are written without a trailing .0
+    return json.dumps([int(v) if float(v).is_integer() else v for v in values])
+
+def save_maze(maze, path):
+    if str(path).endswith(".json"):
+        # One wall per line keeps large files readable and diffable
+        walls = ",\n".join(f"  {_json_numbers(wall)}" for wall in maze.wall_list())
+        with open(path, "w") as f:
+            f.write("{\n")
+            f.write(f' "bounds": {_json_numbers(maze.bounds)},\n')
+            f.write(f' "start": {_json_numbers(maze.start)},\n')
+            f.write(f' "finish": {_json_numbers(maze.finish)},\n')
+            f.write(f' "walls": [\n{walls}\n ]\n')
+            f.write("}\n")
+        return
+
+    walls = array("d", maze.walls)
+    if sys.byteorder == "big":
+        walls.byteswap()
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, maze.wall_count, *maze.bounds, *maze.start, *maze.finish))
+        f.write(walls.tobytes())
+
+def generate_maze(rows, cols, cell_size=80, seed=None, loop_fraction=0.0, origin=(50, 50)):
+    # Perfect maze from a seeded depth-first search over a rows x cols grid of
+    # cells, with one wall segment per remaining cell edge. loop_fraction removes
+    # that share of the inner walls again to open up loops. The start is the
+    # top-left cell and the finish the bottom-right one.
+    rng = random.Random(seed)
+    # Open edges between cells, stored as ((row, col), (row, col)) with the lower cell first
+    opened = set()
+    visited = [[False] * cols for _ in range(rows)]
+    stack = [(0, 0)]
+    visited[0][0] = True
+    while stack:
+        row, col = stack[-1]
+        neighbors = [(r, c) for r, c in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1))
+                     if 0 <= r < rows and 0 <= c < cols and not visited[r][c]]
+        if not neighbors:
+            stack.pop()
+            continue
+        nxt = rng.choice(neighbors)
+        visited[nxt[0]][nxt[1]] = True
+        opened.add(tuple(sorted(((row, col), nxt))))
+        stack.append(nxt)
+
+    inner_edges = [((r, c), (r, c + 1)) for r in range(rows) for c in range(cols - 1)]
+    inner_edges += [((r, c), (r + 1, c)) for r in range(rows - 1) for c in range(cols)]
+    closed = [edge for edge in inner_edges if edge not in opened]
+    rng.shuffle(closed)
+    opened.update(closed[:int(len(closed) * loop_fraction)])
+
+    ox, oy = origin
+    walls = []
+    for (r1, c1), (r2, c2) in inner_edges:
+        if ((r1, c1), (r2, c2)) in opened:
+            continue
+        if r1 == r2:  # Vertical wall between horizontally adjacent cells
+            x = ox + c2 * cell_size
+            walls.append((x, oy + r1 * cell_size, x, oy + (r1 + 1) * cell_size))
+        else:  # Horizontal wall between vertically adjacent cells
+            y = oy + r2 * cell_size
+            walls.append((ox + c1 * cell_size, y, ox + (c1 + 1) * cell_size, y))
+
+    # Outer boundary
+    width, height = cols * cell_size, rows * cell_size
+    walls += [
+        (ox, oy, ox + width, oy),
+        (ox, oy, ox, oy + height),
+        (ox, oy + height, ox + width, oy + height),
+        (ox + width, oy, ox + width, oy + height),
+    ]
+    start = (ox + cell_size / 2, oy + cell_size / 2)
+    finish = (ox + width - cell_size / 2, oy + height - cell_size / 2)
+    return Maze(walls, start, finish, (ox, oy, ox + width, oy + height))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate or inspect maze files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write a procedurally generated maze")
+    generate.add_argument("output", help="maze file to write (.json or .maze)")
+    generate.add_argument("--rows", type=int, default=10)
+    generate.add_argument("--cols", type=int, default=10)
+    generate.add_argument("--cell-size", type=float, default=80)
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument("--loop-fraction", type=float, default=0.0)
+
+    info = commands.add_parser("info", help="print a summary of a maze file")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        maze = generate_maze(args.rows, args.cols, args.cell_size, args.seed, args.loop_fraction)
+        save_maze(maze, args.output)
+        print(f"Saved {maze.wall_count} walls to '{args.output}'")
+    else:
+        maze = load_maze(args.path)
+        print(f"Walls: {maze.wall_count}")
+        print(f"Bounds: {maze.bounds}")
+        print(f"Start: {maze.start}, Finish: {maze.finish}")
+
+
+if __name__ == "__main__":
+    main()
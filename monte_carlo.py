@@ -0,0 +1,239 @@
+import argparse
+import math
+import statistics
+
+import simulation
+from maze import load_maze
+from result_cache import DEFAULT_DIRECTORY, ResultCache
+from sweep import SWEEP_PARAMETERS, parameter_grid, run_sweep
+
+# Monte Carlo evaluation of configurations over many seeds.
+#
+# A single trial per configuration mostly measures its random collision
+# kicks. Here every configuration is run with seeds 0, 1, 2, ... and reported
+# as mean and confidence interval of time, collisions and score.
+#
+# Common random numbers: all configurations use the same seeds, so trial k of
+# each configuration draws the same sequence of kicks. Comparisons use the
+# per-seed differences against the best configuration, so noise shared by
+# both cancels out. This helps most between close configurations, whose
+# trials stay in step longest (sensitivity 1.0 against 1.05: about half the
+# variance of independent seeds); far apart ones soon diverge anyway.
+#
+# Sequential stopping: seeds are added in batches, and a configuration stops
+# sampling once its score interval is within precision (a fraction of the mean
+# score), once it is significantly worse than the current best, or at
+# max_seeds. The best one stops once it is precise enough or every other
+# configuration has been ruled out. Clear decisions therefore take few trials.
+
+CONFIDENCE = 0.95
+PRECISION = 0.05  # Target score half width, as a fraction of the mean score
+MIN_SEEDS = 8
+MAX_SEEDS = 200
+BATCH = 8  # Seeds added per round
+METRICS = ("time", "collisions", "score")
+
+EXACT_DF = 10  # Below this many degrees of freedom t_quantile() inverts the exact distribution
+
+def t_cdf(t, df):
+    # Exact distribution function of Student's t for integer df (the finite
+    # series in cos(atan(t / sqrt(df))) of Abramowitz and Stegun 26.7.3/4)
+    theta = math.atan(t / math.sqrt(df))
+    c2 = math.cos(theta) ** 2
+    if df % 2:
+        term = total = math.cos(theta) if df > 1 else 0.0
+        for j in range(1, (df - 1) // 2):
+            term *= c2 * 2 * j / (2 * j + 1)
+            total += term
+        a = 2 / math.pi * (theta + math.sin(theta) * total)
+    else:
+        term = total = 1.0
+        for j in range(1, df // 2):
+            term *= c2 * (2 * j - 1) / (2 * j)
+            total += term
+        a = math.sin(theta) * total
+    return (1 + a) / 2
+
+def t_quantile(p, df):
+    # Quantile of Student's t distribution. The Cornish-Fisher expansion around
+    # the normal quantile is within 0.1% from df = 10 on, but far off for a few
+    # degrees of freedom (11.3 instead of 12.71 at df = 1), so below EXACT_DF
+    # the exact distribution function is inverted by bisection instead.
+    if p < 0.5:
+        return -t_quantile(1 - p, df)
+    if df < EXACT_DF:
+        low, high = 0.0, 1.0
+        while t_cdf(high, df) < p:
+            low, high = high, high * 2
+        for _ in range(100):
+            middle = (low + high) / 2
+            if t_cdf(middle, df) < p:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+    z = statistics.NormalDist().inv_cdf(p)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+def interval(values, confidence=CONFIDENCE):
+    # (mean, half width) of the t confidence interval for the mean of values
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, math.inf
+    half_width = t_quantile((1 + confidence) / 2, len(values) - 1) * statistics.stdev(values) / math.sqrt(len(values))
+    return mean, half_width
+
+
+class MonteCarloEvaluation:
+    # Sequential, seed-paired evaluation of a list of configurations (dicts of
+    # sweep parameters). Trials run through sweep.run_sweep(), so they use all
+    # cores and, with a result_cache.ResultCache, are only simulated once.
+
+    def __init__(self, configs, timeout=simulation.TIMEOUT, confidence=CONFIDENCE, precision=PRECISION,
+                 min_seeds=MIN_SEEDS, max_seeds=MAX_SEEDS, batch=BATCH, workers=None, cache=None, **fixed_params):
+        self.configs = parameter_grid(configs) if isinstance(configs, dict) else list(configs)
+        self.timeout = timeout
+        self.confidence = confidence
+        self.precision = precision
+        self.min_seeds = min_seeds
+        self.max_seeds = max_seeds
+        self.batch = batch
+        self.workers = workers
+        self.cache = cache
+        self.fixed_params = fixed_params
+        self.rows = [[] for _ in self.configs]  # Per configuration, in seed order
+        self.stopped = {}  # Configuration index -> reason it stopped sampling
+
+    @property
+    def trials(self):
+        return sum(len(rows) for rows in self.rows)
+
+    def values(self, index, metric, seeds=None):
+        return [float(row[metric]) for row in self.rows[index][:seeds]]
+
+    def summary(self, index, metric):
+        return interval(self.values(index, metric), self.confidence)
+
+    def best(self):
+        return min(range(len(self.configs)), key=lambda index: self.summary(index, "score")[0])
+
+    def paired(self, index, other, metric="score"):
+        # Interval of the per-seed difference index - other over their common seeds
+        seeds = min(len(self.rows[index]), len(self.rows[other]))
+        differences = [a - b for a, b in zip(self.values(index, metric, seeds), self.values(other, metric, seeds))]
+        return interval(differences, self.confidence)
+
+    def significantly_worse(self, index, other):
+        difference, half_width = self.paired(index, other)
+        return difference - half_width > 0
+
+    def update_stopped(self):
+        best = self.best()
+        for index in range(len(self.configs)):
+            if index in self.stopped or len(self.rows[index]) < self.min_seeds:
+                continue
+            mean, half_width = self.summary(index, "score")
+            if index != best and self.significantly_worse(index, best):
+                self.stopped[index] = "worse than best"
+            elif half_width <= self.precision * abs(mean):
+                self.stopped[index] = "precise"
+            elif len(self.rows[index]) >= self.max_seeds:
+                self.stopped[index] = "max seeds"
+        # The best may have been ruled out earlier while another led; it keeps
+        # sampling until it is precise or nothing else is left to compare with
+        if self.stopped.get(best) == "worse than best":
+            del self.stopped[best]
+        others = [index for index in range(len(self.configs)) if index != best]
+        if best not in self.stopped and all(self.stopped.get(index) == "worse than best" for index in others):
+            self.stopped[best] = "separated"
+
+    def run(self):
+        while len(self.stopped) < len(self.configs):
+            # Active configurations share their seed count, except a best one
+            # that sat out rounds while it was behind
+            groups = {}
+            for index in range(len(self.configs)):
+                if index not in self.stopped:
+                    groups.setdefault(len(self.rows[index]), []).append(index)
+            for first, active in groups.items():
+                count = self.min_seeds if first == 0 else min(self.batch, self.max_seeds - first)
+                rows = run_sweep([self.configs[index] for index in active], seeds=range(first, first + count),
+                                 timeout=self.timeout, workers=self.workers, cache=self.cache, **self.fixed_params)
+                for i, index in enumerate(active):
+                    self.rows[index] += rows[i * count:(i + 1) * count]
+            self.update_stopped()
+        return self
+
+
+def describe(config):
+    return ", ".join(f"{name}={value}" for name, value in config.items())
+
+def print_report(evaluation):
+    best = evaluation.best()
+    level = f"{evaluation.confidence:.0%}"
+    print(f"\nMonte Carlo Results (mean ± {level} confidence half width)")
+    print(f"{'Configuration':<28} | {'Seeds':>5} | {'Time (s)':>15} | {'Collisions':>15} | {'Score':>15} | "
+          f"{'Done':>5} | {'Score vs best':>16} | Stopped")
+    print("-" * 140)
+    for index, config in enumerate(evaluation.configs):
+        cells = []
+        for metric in METRICS:
+            mean, half_width = evaluation.summary(index, metric)
+            cells.append(f"{mean:7.2f} ± {half_width:6.2f}")
+        completed = statistics.fmean(row["completed"] for row in evaluation.rows[index])
+        if index == best:
+            versus = "best"
+        else:
+            mean, half_width = evaluation.paired(index, best)
+            versus = f"{mean:+7.2f} ± {half_width:6.2f}"
+        print(f"{describe(config):<28} | {len(evaluation.rows[index]):>5} | {' | '.join(cells)} | "
+              f"{completed:>5.0%} | {versus:>16} | {evaluation.stopped.get(index, '')}")
+
+    ruled_out = [index for index in range(len(evaluation.configs))
+                 if index != best and evaluation.significantly_worse(index, best)]
+    print(f"\nBest: {describe(evaluation.configs[best])}")
+    if len(ruled_out) == len(evaluation.configs) - 1:
+        print(f"Better than every other configuration at {level} confidence")
+    else:
+        tied = [describe(evaluation.configs[index]) for index in range(len(evaluation.configs))
+                if index != best and index not in ruled_out]
+        print(f"Not significantly better than: {'; '.join(tied)}")
+    fixed = len(evaluation.configs) * evaluation.max_seeds
+    print(f"{evaluation.trials} trials ({fixed} with {evaluation.max_seeds} seeds for every configuration)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare configurations over many seeds with confidence intervals.")
+    for name in SWEEP_PARAMETERS:
+        parser.add_argument("--" + name.replace("_", "-"), type=float, nargs="+",
+                            default=simulation.SENSITIVITY_VALUES if name == "sensitivity" else None)
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE, help=f"confidence level (default {CONFIDENCE})")
+    parser.add_argument("--precision", type=float, default=PRECISION,
+                        help=f"target score half width as a fraction of the mean (default {PRECISION})")
+    parser.add_argument("--min-seeds", type=int, default=MIN_SEEDS, help=f"seeds before stopping (default {MIN_SEEDS})")
+    parser.add_argument("--max-seeds", type=int, default=MAX_SEEDS, help=f"seeds per configuration at most (default {MAX_SEEDS})")
+    parser.add_argument("--batch", type=int, default=BATCH, help=f"seeds added per round (default {BATCH})")
+    parser.add_argument("--timeout", type=float, default=simulation.TIMEOUT, help="simulated seconds per trial")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--maze", help="maze file to run in (default: the built-in maze)")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_DIRECTORY,
+                        help=f"reuse cached trial results from this directory (default {DEFAULT_DIRECTORY})")
+    args = parser.parse_args()
+    if args.min_seeds < 2 or args.max_seeds < args.min_seeds:
+        parser.error("need 2 <= --min-seeds <= --max-seeds")
+
+    grid = {name: getattr(args, name) for name in SWEEP_PARAMETERS if getattr(args, name)}
+    fixed_params = load_maze(args.maze).simulation_params() if args.maze else {}
+    fixed_params.update(neighbor_list=True)
+    cache = ResultCache(args.cache) if args.cache else None
+    evaluation = MonteCarloEvaluation(grid, args.timeout, args.confidence, args.precision, args.min_seeds,
+                                      args.max_seeds, args.batch, args.workers, cache, **fixed_params).run()
+    print_report(evaluation)
+
+
+if __name__ == "__main__":
+    main()
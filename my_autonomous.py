@@ -1,41 +1,27 @@
-import pygame
+import argparse
 import math
 import random
-import matplotlib.pyplot as plt
-import numpy as np
 
-# Initialize Pygame
-pygame.init()
+import config
+import maze
+import simulation
+from neighbor_list import NeighborList
+from profiling import PhaseTimer
+from result_cache import ResultCache
+from sensor_array import SensorArray
+from trace_store import TraceStore, DEFAULT_MAX_POINTS
+
+# pygame, matplotlib and numpy are imported where they are needed, so a
+# headless run (--headless) starts without loading them or opening a window.
 
 # Window setup
 WIDTH, HEIGHT = 1000, 1000
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Braitenberg Vehicle Maze Navigation")
-
-# Font setup for display text
-font = pygame.font.Font(None, 36)
-
-# Define colors
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-RED = (255, 0, 0)
-GREEN = (0, 255, 0)
-BLUE = (0, 0, 255)
-YELLOW = (255, 255, 0)
-TRACE_COLOR = (0, 255, 0)  # Green trace
-
-# User Inputs
-try:
-    max_speed = float(input("Enter Robot Max Speed (default 5): ") or 5)
-    turn_rate = float(input("Enter Turning Rate in degrees/unit time (default 2): ") or 2)
-    sensor_range = float(input("Enter Sensor Range (default 150): ") or 150)
-    sensitivity = float(input("Enter Sensitivity Factor (0.2-1.0, default 0.6): ") or 0.6)
-except ValueError:
-    print("Invalid input! Using default values.")
-    max_speed = 5
-    turn_rate = 2
-    sensor_range = 150
-    sensitivity = 0.6
+
+# User settings, replaced from the command line in main()
+max_speed = 5
+turn_rate = 2
+sensor_range = 150
+sensitivity = 0.6
 
 # Robot setup
 robot_x, robot_y = 100, 100  # Start position
@@ -44,12 +30,15 @@ heading_angle = 270  # Facing upwards
 speed = 0  # Initial speed
 acceleration = 0.2  # Acceleration rate
 deceleration = 0.1  # Deceleration rate
+slow_down = 0.8  # Fraction of max speed dropped at full obstacle reading
+wiring = (1.0, 1.0)  # Weights of the right and left readings in the turn
 
 # Sensor setup
-left_sensor_angle = 45  # Degrees offset from heading
-right_sensor_angle = -45  # Degrees offset from heading
 left_sensor_reading = 0
 right_sensor_reading = 0
+sensors = SensorArray()  # Rays per side, replaced from the command line in main()
+sensor_rays = []  # Rays of the last reading, reused for drawing
+ray_readings = []
 
 # Maze walls - defined as line segments (x1, y1, x2, y2)
 walls = []
@@ -83,136 +72,76 @@ add_wall(800, 200, 800, 950)
 start_x, start_y = 100, 100
 finish_x, finish_y = 900, 900
 
-# Store trace positions
-trace_points = []
+# Store trace positions, simplified and capped at trace_max_points; with
+# trace_spill every raw point of the run (of the latest trial in the
+# sensitivity analysis) is also written to that file
+trace_max_points = DEFAULT_MAX_POINTS
+trace_spill = None
+trace_points = TraceStore()
+
+# Walls around the robot, cached between frames for sensing and collisions
+neighbors = None
+
+# Cache of headless trial results
+result_cache = None
+
+# Trial state saved with C and restored with R (or --resume)
+checkpoint_file = "checkpoint.json"
+
+# Per-phase frame timing, toggled with P and exported when the run ends
+profiler = PhaseTimer(enabled=False)
+profile_file = "profile.json"
+
+# Renderer with the static maze layer cached, created with the window
+renderer = None
 
 # Performance metrics
 collision_count = 0
-start_time = pygame.time.get_ticks()
+start_time = 0
 elapsed_time = 0
 completed = False
 
 # Helper functions for collision detection and sensor readings
-def point_to_line_distance(x, y, x1, y1, x2, y2):
-    # Calculate distance from point (x,y) to line segment (x1,y1)-(x2,y2)
-    A = x - x1
-    B = y - y1
-    C = x2 - x1
-    D = y2 - y1
-
-    dot = A * C + B * D
-    len_sq = C * C + D * D
-    
-    if len_sq == 0:  # Line segment is just a point
-        return math.sqrt(A * A + B * B)
-    
-    # Calculate projection parameter
-    param = dot / len_sq
-    
-    if param < 0:
-        xx = x1
-        yy = y1
-    elif param > 1:
-        xx = x2
-        yy = y2
-    else:
-        xx = x1 + param * C
-        yy = y1 + param * D
-    
-    return math.sqrt((x - xx) ** 2 + (y - yy) ** 2)
-
-def line_intersection(x1, y1, x2, y2, x3, y3, x4, y4):
-    # Calculate intersection of two line segments
-    den = (y4 - y3) * (x2 - x1) - (x4 - x3) * (y2 - y1)
-    
-    if den == 0:
-        return None  # Lines are parallel
-    
-    ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / den
-    ub = ((x2 - x1) * (y1 - y3) - (y2 - y1) * (x1 - x3)) / den
-    
-    if 0 <= ua <= 1 and 0 <= ub <= 1:
-        x = x1 + ua * (x2 - x1)
-        y = y1 + ua * (y2 - y1)
-        return (x, y)
-    
-    return None
-
 def check_collision():
     # Check collision with any wall
-    robot_radius = robot_size / 2
-    for x1, y1, x2, y2 in walls:
-        distance = point_to_line_distance(robot_x, robot_y, x1, y1, x2, y2)
-        if distance < robot_radius:
-            return True
-    return False
+    nearby = neighbors.walls_near(robot_x, robot_y, robot_size / 2)
+    return simulation.check_collision(robot_x, robot_y, nearby, robot_size)
 
 def get_sensor_readings():
-    global left_sensor_reading, right_sensor_reading
-    
-    # Calculate sensor positions and directions
-    left_sensor_angle_rad = math.radians(heading_angle + left_sensor_angle)
-    right_sensor_angle_rad = math.radians(heading_angle + right_sensor_angle)
-    
-    left_sensor_x = robot_x + math.cos(left_sensor_angle_rad) * (robot_size/2)
-    left_sensor_y = robot_y - math.sin(left_sensor_angle_rad) * (robot_size/2)
-    
-    right_sensor_x = robot_x + math.cos(right_sensor_angle_rad) * (robot_size/2)
-    right_sensor_y = robot_y - math.sin(right_sensor_angle_rad) * (robot_size/2)
-    
-    # Reset readings
-    left_sensor_reading = 0
-    right_sensor_reading = 0
-    
-    # Calculate sensor ray endpoints
-    left_ray_end_x = left_sensor_x + math.cos(left_sensor_angle_rad) * sensor_range
-    left_ray_end_y = left_sensor_y - math.sin(left_sensor_angle_rad) * sensor_range
-    
-    right_ray_end_x = right_sensor_x + math.cos(right_sensor_angle_rad) * sensor_range
-    right_ray_end_y = right_sensor_y - math.sin(right_sensor_angle_rad) * sensor_range
-    
-    # Check for ray intersection with walls
-    left_min_distance = sensor_range
-    right_min_distance = sensor_range
-    
-    for wall_x1, wall_y1, wall_x2, wall_y2 in walls:
-        # Check left sensor
-        left_intersection = line_intersection(
-            left_sensor_x, left_sensor_y, left_ray_end_x, left_ray_end_y,
-            wall_x1, wall_y1, wall_x2, wall_y2
-        )
-        
-        if left_intersection:
-            ix, iy = left_intersection
-            distance = math.sqrt((left_sensor_x - ix)**2 + (left_sensor_y - iy)**2)
-            if distance < left_min_distance:
-                left_min_distance = distance
-        
-        # Check right sensor
-        right_intersection = line_intersection(
-            right_sensor_x, right_sensor_y, right_ray_end_x, right_ray_end_y,
-            wall_x1, wall_y1, wall_x2, wall_y2
-        )
-        
-        if right_intersection:
-            ix, iy = right_intersection
-            distance = math.sqrt((right_sensor_x - ix)**2 + (right_sensor_y - iy)**2)
-            if distance < right_min_distance:
-                right_min_distance = distance
-    
-    # Convert distances to readings (closer = higher reading)
-    if left_min_distance < sensor_range:
-        left_sensor_reading = max(0, 1 - (left_min_distance / sensor_range))
-    
-    if right_min_distance < sensor_range:
-        right_sensor_reading = max(0, 1 - (right_min_distance / sensor_range))
-    
-    # Apply sensitivity factor
-    left_sensor_reading *= sensitivity
-    right_sensor_reading *= sensitivity
-    
+    global left_sensor_reading, right_sensor_reading, sensor_rays, ray_readings
+    sensor_rays = sensors.rays(robot_x, robot_y, heading_angle, sensor_range, robot_size)
+    if neighbors.wall_array is not None:
+        # Sensor arrays cast all their rays in one NumPy call
+        import raycast
+        distances = raycast.cast_rays(sensor_rays, neighbors.array_near(robot_x, robot_y), sensor_range).tolist()
+    else:
+        nearby = neighbors.walls_near(robot_x, robot_y)
+        distances = [simulation.ray_distance(*ray, nearby, sensor_range) for ray in sensor_rays]
+    ray_readings = [simulation.distance_to_reading(distance, sensor_range, sensitivity) for distance in distances]
+    left_sensor_reading, right_sensor_reading = sensors.side_readings(ray_readings)
     return left_sensor_reading, right_sensor_reading
 
+def checkpoint():
+    # The interactive trial state, including the random module's state
+    return {
+        "robot_x": robot_x, "robot_y": robot_y, "heading_angle": heading_angle, "speed": speed,
+        "collision_count": collision_count, "elapsed_time": elapsed_time, "completed": completed,
+        "trace_points": list(trace_points), "rng_state": random.getstate(),
+    }
+
+def resume(state):
+    # Continue from a checkpoint(); the caller restarts the clock at elapsed_time
+    global robot_x, robot_y, heading_angle, speed, collision_count, elapsed_time, completed, trace_points
+    robot_x, robot_y = state["robot_x"], state["robot_y"]
+    heading_angle, speed = state["heading_angle"], state["speed"]
+    collision_count, elapsed_time, completed = state["collision_count"], state["elapsed_time"], state["completed"]
+    trace_points.load(state["trace_points"])
+    version, internal_state, gauss_next = state["rng_state"]
+    random.setstate((version, tuple(internal_state), gauss_next))
+    if renderer is not None:
+        renderer.reset_trace()
+        renderer.draw_trace(trace_points)
+
 def check_finish():
     # Check if robot has reached the finish
     distance_to_finish = math.sqrt((robot_x - finish_x)**2 + (robot_y - finish_y)**2)
@@ -220,11 +149,6 @@ def check_finish():
         return True
     return False
 
-# Main loop
-running = True
-auto_mode = True
-mode_text = "Mode: Auto"
-
 # For sensitivity analysis
 sensitivity_values = [0.2, 0.4, 0.6, 0.8, 1.0]
 results = []
@@ -235,6 +159,7 @@ timeout = 90000  # 90 seconds timeout per trial
 
 def run_sensitivity_analysis():
     global robot_x, robot_y, heading_angle, speed, trace_points, collision_count, start_time, elapsed_time, completed, sensitivity
+    import pygame
     
     sensitivity_values = [0.2, 0.4, 0.6, 0.8, 1.0]
     results = []
@@ -247,7 +172,9 @@ def run_sensitivity_analysis():
         robot_x, robot_y = start_x, start_y
         heading_angle = 270
         speed = 0
-        trace_points = []
+        trace_points.close()
+        trace_points = TraceStore(trace_max_points, spill_path=trace_spill)
+        renderer.reset_trace()
         collision_count = 0
         start_time = pygame.time.get_ticks()
         elapsed_time = 0
@@ -269,11 +196,11 @@ def run_sensitivity_analysis():
             left_reading, right_reading = get_sensor_readings()
             
             # Braitenberg vehicle behavior
-            turn_amount = (right_reading - left_reading) * turn_rate
+            turn_amount = (wiring[0] * right_reading - wiring[1] * left_reading) * turn_rate
             heading_angle += turn_amount
             
-            obstacle_factor = max(left_reading, right_reading)
-            target_speed = max_speed * (1 - obstacle_factor * 0.8)
+            obstacle_factor = max(ray_readings)
+            target_speed = max_speed * (1 - obstacle_factor * slow_down)
             
             if speed < target_speed:
                 speed = min(target_speed, speed + acceleration)
@@ -300,48 +227,9 @@ def run_sensitivity_analysis():
                 print(f"Completed with sensitivity {sens}: Time = {elapsed_time:.2f}s, Collisions = {collision_count}")
             
             # Update display for visualization
-            screen.fill(WHITE)
-            
-            # Draw trace
-            for point in trace_points:
-                pygame.draw.circle(screen, TRACE_COLOR, point, 2)
-            
-            # Draw maze walls
-            for x1, y1, x2, y2 in walls:
-                pygame.draw.line(screen, BLACK, (x1, y1), (x2, y2), 3)
-            
-            # Draw start and finish
-            pygame.draw.circle(screen, GREEN, (start_x, start_y), 20, 2)
-            pygame.draw.circle(screen, RED, (finish_x, finish_y), 20, 2)
-            
-            # Draw robot
-            robot = pygame.Surface((robot_size, robot_size), pygame.SRCALPHA)
-            pygame.draw.polygon(robot, RED, [(robot_size // 2, 0), (0, robot_size), (robot_size, robot_size)])
-            rotated_robot = pygame.transform.rotate(robot, heading_angle - 90)
-            rect = rotated_robot.get_rect(center=(robot_x, robot_y))
-            screen.blit(rotated_robot, rect.topleft)
-            
-            # Draw sensor rays
-            left_sensor_angle_rad = math.radians(heading_angle + left_sensor_angle)
-            right_sensor_angle_rad = math.radians(heading_angle + right_sensor_angle)
-            
-            left_sensor_x = robot_x + math.cos(left_sensor_angle_rad) * (robot_size/2)
-            left_sensor_y = robot_y - math.sin(left_sensor_angle_rad) * (robot_size/2)
-            
-            right_sensor_x = robot_x + math.cos(right_sensor_angle_rad) * (robot_size/2)
-            right_sensor_y = robot_y - math.sin(right_sensor_angle_rad) * (robot_size/2)
-            
-            left_ray_end_x = left_sensor_x + math.cos(left_sensor_angle_rad) * sensor_range
-            left_ray_end_y = left_sensor_y - math.sin(left_sensor_angle_rad) * sensor_range
-            
-            right_ray_end_x = right_sensor_x + math.cos(right_sensor_angle_rad) * sensor_range
-            right_ray_end_y = right_sensor_y - math.sin(right_sensor_angle_rad) * sensor_range
-            
-            left_color = (int(255 * left_reading), 0, 0)
-            right_color = (int(255 * right_reading), 0, 0)
-            
-            pygame.draw.line(screen, left_color, (left_sensor_x, left_sensor_y), (left_ray_end_x, left_ray_end_y), 2)
-            pygame.draw.line(screen, right_color, (right_sensor_x, right_sensor_y), (right_ray_end_x, right_ray_end_y), 2)
+            renderer.draw_background()
+            renderer.draw_robot(robot_x, robot_y, heading_angle)
+            renderer.draw_sensor_rays(sensor_rays, ray_readings)
             
             # Display information
             current_time = (pygame.time.get_ticks() - start_time) / 1000
@@ -353,14 +241,14 @@ def run_sensitivity_analysis():
                 f"Collisions: {collision_count}"
             ]
             
-            for i, text in enumerate(info_text):
-                text_surface = font.render(text, True, BLACK)
-                screen.blit(text_surface, (10, 10 + i * 30))
+            renderer.draw_info(info_text)
             
             pygame.display.update()
             
             # Store trace
-            trace_points.append((int(robot_x), int(robot_y)))
+            point = (int(robot_x), int(robot_y))
+            trace_points.append(point)
+            renderer.add_trace_point(point)
             
             # Check for timeout
             if pygame.time.get_ticks() - start_time > timeout:
@@ -372,19 +260,45 @@ def run_sensitivity_analysis():
         performance_score = elapsed_time + collision_count * 2  # Penalize collisions more
         results.append((sens, elapsed_time, collision_count, performance_score))
     
-    # Find best sensitivity
-    best_sensitivity = min(results, key=lambda x: x[3])
-    print("\nSensitivity Analysis Results:")
-    print("Sensitivity | Time (s) | Collisions | Performance Score")
-    print("-" * 50)
-    for sens, time, collisions, score in results:
-        print(f"{sens:.1f}        | {time:.2f}    | {collisions}         | {score:.2f}")
-    print(f"\nBest sensitivity: {best_sensitivity[0]} (Score: {best_sensitivity[3]:.2f})")
-    
+    simulation.print_results(results)
+    plot_results(results)
+
+def run_headless_sensitivity_analysis(plot=True, seed=0):
+    # Same trials as run_sensitivity_analysis() in simulated time, without drawing.
+    # Results are cached on disk, so repeating an unchanged analysis is instant.
+    results = simulation.run_sensitivity_analysis(
+        walls=walls, start=(start_x, start_y), finish=(finish_x, finish_y),
+        max_speed=max_speed, turn_rate=turn_rate, sensor_range=sensor_range,
+        acceleration=acceleration, deceleration=deceleration, robot_size=robot_size,
+        timeout=timeout / 1000, seed=seed, cache=result_cache, **sensor_params()
+    )
+    simulation.print_results(results)
+    if plot:
+        plot_results(results)
+
+def run_robust_sensitivity_analysis(plot=True):
+    # The sensitivity analysis over many seeds, with confidence intervals (see monte_carlo.py)
+    from monte_carlo import MonteCarloEvaluation, print_report
+    evaluation = MonteCarloEvaluation(
+        [{"sensitivity": sens} for sens in sensitivity_values], timeout / 1000, cache=result_cache,
+        walls=walls, start=(start_x, start_y), finish=(finish_x, finish_y),
+        max_speed=max_speed, turn_rate=turn_rate, sensor_range=sensor_range,
+        acceleration=acceleration, deceleration=deceleration, robot_size=robot_size,
+        neighbor_list=True, **sensor_params()
+    ).run()
+    print_report(evaluation)
+    if plot:
+        # Plot the means
+        plot_results([(sens,) + tuple(evaluation.summary(i, metric)[0] for metric in ("time", "collisions", "score"))
+                      for i, sens in enumerate(sensitivity_values)])
+
+def plot_results(results):
     # Plot results
     try:
+        import matplotlib
+        if renderer is None:
+            matplotlib.use("Agg")  # No window to show plots in
         import matplotlib.pyplot as plt
-        import numpy as np
         
         sens_values = [r[0] for r in results]
         times = [r[1] for r in results]
@@ -425,132 +339,278 @@ def run_sensitivity_analysis():
         print("Matplotlib not available. Skipping graph generation.")
 
 
-while running:
-    screen.fill(WHITE)  # Clear screen
-    
-    # Draw trace
-    for point in trace_points:
-        pygame.draw.circle(screen, TRACE_COLOR, point, 2)
-    
-    # Draw maze walls
-    for x1, y1, x2, y2 in walls:
-        pygame.draw.line(screen, BLACK, (x1, y1), (x2, y2), 3)
-    
-    # Draw start and finish
-    pygame.draw.circle(screen, GREEN, (start_x, start_y), 20, 2)
-    pygame.draw.circle(screen, RED, (finish_x, finish_y), 20, 2)
-    
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
+def setup(args):
+    # Apply the command line settings and load the maze
+    global max_speed, turn_rate, sensor_range, sensitivity, timeout, sensors, slow_down, wiring
+    global trace_max_points, trace_spill, trace_points
+    global walls, start_x, start_y, finish_x, finish_y, robot_x, robot_y, neighbors, result_cache
+    max_speed = args.max_speed
+    turn_rate = args.turn_rate
+    sensor_range = args.sensor_range
+    sensitivity = args.sensitivity
+    timeout = args.timeout * 1000
+    slow_down = args.slow_down
+    wiring = tuple(args.wiring)
+    sensors = SensorArray(args.rays_per_side, args.sensor_spread, args.ray_weights, args.sensor_angle)
+    trace_max_points = args.trace_limit
+    trace_spill = args.trace_spill
+
+    # Replace the built-in maze with one loaded from a maze file
+    if args.maze:
+        loaded_maze = maze.load_maze(args.maze)
+        walls = loaded_maze.wall_list()
+        start_x, start_y = loaded_maze.start
+        finish_x, finish_y = loaded_maze.finish
+        robot_x, robot_y = start_x, start_y
+
+    wall_array = None
+    if sensors.rays_per_side > 1:
+        import raycast
+        wall_array = raycast.wall_array(walls)
+    neighbors = NeighborList(walls, sensor_range + robot_size / 2, wall_array=wall_array)
+    if not args.headless:
+        trace_points = TraceStore(trace_max_points, spill_path=trace_spill)
+    if not args.no_cache:
+        result_cache = ResultCache()
+
+def sensor_params():
+    # Simulation keyword arguments for the current sensor array
+    weights = None if len(set(sensors.weights)) == 1 else sensors.weights
+    return dict(rays_per_side=sensors.rays_per_side, sensor_spread=sensors.spread, ray_weights=weights,
+                sensor_angle=sensors.center, slow_down=slow_down, wiring=wiring)
+
+def run_headless(args):
+    # One trial, or the sensitivity analysis, in simulated time with no window
+    if args.analysis and args.robust:
+        run_robust_sensitivity_analysis(args.plot)
+        return
+    if args.analysis:
+        run_headless_sensitivity_analysis(args.plot, args.seed)
+        return
+    params = dict(
+        walls=walls, start=(start_x, start_y), finish=(finish_x, finish_y),
+        max_speed=max_speed, turn_rate=turn_rate, sensor_range=sensor_range, sensitivity=sensitivity,
+        acceleration=acceleration, deceleration=deceleration, robot_size=robot_size, seed=args.seed,
+        **sensor_params()
+    )
+    if result_cache is not None:
+        result = result_cache.run_trial(timeout / 1000, **params)
+    else:
+        result = simulation.run_trial(timeout / 1000, **params)
+    status = "Maze completed!" if result["completed"] else "Trial timed out."
+    print(f"{status} Time: {result['time']:.2f} seconds, Collisions: {result['collisions']}, "
+          f"Score: {result['score']:.2f}")
+
+def run_interactive(resume_file=None):
+    global robot_x, robot_y, heading_angle, speed, trace_points, collision_count, start_time, elapsed_time, completed
+    global renderer
+    import pygame
+    from renderer import Renderer
+
+    # Initialize Pygame
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Braitenberg Vehicle Maze Navigation")
+
+    # Font setup for display text
+    font = pygame.font.Font(None, 36)
+
+    renderer = Renderer(screen, walls, (start_x, start_y), (finish_x, finish_y), robot_size, font)
+    if resume_file:
+        resume(simulation.load_snapshot(resume_file))
+        print(f"Resumed from '{resume_file}' at {elapsed_time:.2f} seconds")
+    start_time = pygame.time.get_ticks() - elapsed_time * 1000
+
+    # Main loop
+    running = True
+    auto_mode = True
+    mode_text = "Mode: Auto"
+
+    while running:
+        profiler.begin_frame()
+
+        # Cached maze layer and trace
+        renderer.draw_background()
+        profiler.lap("drawing")
+
+        # Event handling
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_a:
+                    print("Starting sensitivity analysis...")
+                    run_sensitivity_analysis()
+                    print("Analysis complete!")
+                    profiler.begin_frame()
+                elif event.key == pygame.K_h:
+                    print("Starting headless sensitivity analysis...")
+                    run_headless_sensitivity_analysis()
+                    print("Analysis complete!")
+                    profiler.begin_frame()
+                elif event.key == pygame.K_c:
+                    simulation.save_snapshot(checkpoint(), checkpoint_file)
+                    print(f"Checkpoint saved to '{checkpoint_file}' at {elapsed_time:.2f} seconds")
+                elif event.key == pygame.K_r:
+                    try:
+                        resume(simulation.load_snapshot(checkpoint_file))
+                    except FileNotFoundError:
+                        print("No checkpoint saved yet (press C)")
+                    else:
+                        start_time = pygame.time.get_ticks() - elapsed_time * 1000
+                        print(f"Restored checkpoint at {elapsed_time:.2f} seconds")
+                    profiler.begin_frame()
+                elif event.key == pygame.K_p:
+                    # Toggle per-phase profiling and its overlay
+                    profiler.enabled = not profiler.enabled
+                    profiler.begin_frame()
+        profiler.lap("events")
+
+        # Get sensor readings
+        left_reading, right_reading = get_sensor_readings()
+        profiler.lap("sensing")
+
+        if auto_mode:
+            # Braitenberg vehicle behavior (cross-wired)
+            # Right sensor controls left wheel, left sensor controls right wheel
+            # This creates obstacle avoidance behavior
+
+            # Calculate turn based on sensor difference
+            turn_amount = (wiring[0] * right_reading - wiring[1] * left_reading) * turn_rate
+            heading_angle += turn_amount
+
+            # Adjust speed based on sensor readings
+            # Slow down when obstacles are detected
+            obstacle_factor = max(ray_readings)
+            target_speed = max_speed * (1 - obstacle_factor * slow_down)
+
+            if speed < target_speed:
+                speed = min(target_speed, speed + acceleration)
+            elif speed > target_speed:
+                speed = max(target_speed, speed - deceleration)
+        profiler.lap("control")
+
+        # Convert angle to movement
+        old_x, old_y = robot_x, robot_y
+        robot_x += speed * math.cos(math.radians(heading_angle))
+        robot_y -= speed * math.sin(math.radians(heading_angle))
+        profiler.lap("integration")
+
+        # Check for collision
+        if check_collision():
+            # Collision response - back up and turn randomly
+            robot_x, robot_y = old_x, old_y
+            heading_angle += random.uniform(-45, 45)
+            speed = -speed * 0.5  # Reverse at half speed
+            collision_count += 1
+            print(f"Collision! Count: {collision_count}")
+
+        # Check if finished
+        if check_finish() and not completed:
+            completed = True
+            elapsed_time = (pygame.time.get_ticks() - start_time) / 1000  # Convert to seconds
+            print(f"Maze completed! Time: {elapsed_time:.2f} seconds, Collisions: {collision_count}")
             running = False
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_a:
-                print("Starting sensitivity analysis...")
-                run_sensitivity_analysis()
-                print("Analysis complete!")
-    
-    # Get sensor readings
-    left_reading, right_reading = get_sensor_readings()
-    
-    if auto_mode:
-        # Braitenberg vehicle behavior (cross-wired)
-        # Right sensor controls left wheel, left sensor controls right wheel
-        # This creates obstacle avoidance behavior
-        
-        # Calculate turn based on sensor difference
-        turn_amount = (right_reading - left_reading) * turn_rate
-        heading_angle += turn_amount
-        
-        # Adjust speed based on sensor readings
-        # Slow down when obstacles are detected
-        obstacle_factor = max(left_reading, right_reading)
-        target_speed = max_speed * (1 - obstacle_factor * 0.8)
-        
-        if speed < target_speed:
-            speed = min(target_speed, speed + acceleration)
-        elif speed > target_speed:
-            speed = max(target_speed, speed - deceleration)
-    
-    # Convert angle to movement
-    old_x, old_y = robot_x, robot_y
-    robot_x += speed * math.cos(math.radians(heading_angle))
-    robot_y -= speed * math.sin(math.radians(heading_angle))
-    
-    # Check for collision
-    if check_collision():
-        # Collision response - back up and turn randomly
-        robot_x, robot_y = old_x, old_y
-        heading_angle += random.uniform(-45, 45)
-        speed = -speed * 0.5  # Reverse at half speed
-        collision_count += 1
-        print(f"Collision! Count: {collision_count}")
-    
-    # Check if finished
-    if check_finish() and not completed:
-        completed = True
-        elapsed_time = (pygame.time.get_ticks() - start_time) / 1000  # Convert to seconds
-        print(f"Maze completed! Time: {elapsed_time:.2f} seconds, Collisions: {collision_count}")
-        running = False
-    
-    # Store trace
-    trace_points.append((int(robot_x), int(robot_y)))
-    
-    # Draw the robot (rotating triangle)
-    robot = pygame.Surface((robot_size, robot_size), pygame.SRCALPHA)
-    pygame.draw.polygon(robot, RED, [(robot_size // 2, 0), (0, robot_size), (robot_size, robot_size)])
-    rotated_robot = pygame.transform.rotate(robot, heading_angle - 90)
-    rect = rotated_robot.get_rect(center=(robot_x, robot_y))
-    screen.blit(rotated_robot, rect.topleft)
-    
-    # Draw sensor rays
-    left_sensor_angle_rad = math.radians(heading_angle + left_sensor_angle)
-    right_sensor_angle_rad = math.radians(heading_angle + right_sensor_angle)
-    
-    left_sensor_x = robot_x + math.cos(left_sensor_angle_rad) * (robot_size/2)
-    left_sensor_y = robot_y - math.sin(left_sensor_angle_rad) * (robot_size/2)
-    
-    right_sensor_x = robot_x + math.cos(right_sensor_angle_rad) * (robot_size/2)
-    right_sensor_y = robot_y - math.sin(right_sensor_angle_rad) * (robot_size/2)
-    
-    left_ray_end_x = left_sensor_x + math.cos(left_sensor_angle_rad) * sensor_range
-    left_ray_end_y = left_sensor_y - math.sin(left_sensor_angle_rad) * sensor_range
-    
-    right_ray_end_x = right_sensor_x + math.cos(right_sensor_angle_rad) * sensor_range
-    right_ray_end_y = right_sensor_y - math.sin(right_sensor_angle_rad) * sensor_range
-    
-    # Draw sensor rays with color based on reading intensity
-    left_color = (int(255 * left_reading), 0, 0)
-    right_color = (int(255 * right_reading), 0, 0)
-    
-    pygame.draw.line(screen, left_color, (left_sensor_x, left_sensor_y), (left_ray_end_x, left_ray_end_y), 2)
-    pygame.draw.line(screen, right_color, (right_sensor_x, right_sensor_y), (right_ray_end_x, right_ray_end_y), 2)
-    
-    # Display information
-    if not completed:
-        elapsed_time = (pygame.time.get_ticks() - start_time) / 1000
-    
-   
-    # Add to your info_text list:
-    info_text = [
-        f"{mode_text}",
-        f"Speed: {speed:.2f}",
-        f"Sensitivity: {sensitivity:.2f}",
-        f"Time: {elapsed_time:.2f}s",
-        f"Collisions: {collision_count}",
-        "Press A to run sensitivity analysis"
-    ]
+        profiler.lap("collision")
+
+        # Store trace
+        point = (int(robot_x), int(robot_y))
+        trace_points.append(point)
+        renderer.add_trace_point(point)
+        profiler.lap("trace")
+
+        # Draw the robot (rotating triangle)
+        renderer.draw_robot(robot_x, robot_y, heading_angle)
+
+        # Draw sensor rays with color based on reading intensity
+        renderer.draw_sensor_rays(sensor_rays, ray_readings)
+
+        # Display information
+        if not completed:
+            elapsed_time = (pygame.time.get_ticks() - start_time) / 1000
+
+
+        # Add to your info_text list:
+        info_text = [
+            f"{mode_text}",
+            f"Speed: {speed:.2f}",
+            f"Sensitivity: {sensitivity:.2f}",
+            f"Time: {elapsed_time:.2f}s",
+            f"Collisions: {collision_count}",
+            "Press A to run sensitivity analysis",
+            "Press H to run it headless",
+            "Press C/R to save/restore a checkpoint",
+            "Press P to toggle profiling"
+        ]
+        if profiler.enabled:
+            info_text += profiler.overlay_lines()
+
+
+        renderer.draw_info(info_text)
+        profiler.lap("drawing")
+
+        pygame.display.update()
+        profiler.lap("display")
+        profiler.end_frame()
+
+        # Check for timeout
+        if auto_mode and elapsed_time > timeout and not completed:
+            print(f"Trial timed out after {timeout/1000} seconds")
+            completed = True
+
+    if profiler.frames:
+        profiler.export(profile_file)
+        print(f"Frame timings saved to '{profile_file}'")
+
+    trace_points.close()
+    pygame.quit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Braitenberg vehicle maze navigation.")
+    parser.add_argument("--max-speed", type=float, default=5, help="robot max speed (default 5)")
+    parser.add_argument("--turn-rate", type=float, default=2,
+                        help="turning rate in degrees/unit time (default 2)")
+    parser.add_argument("--sensor-range", type=float, default=150, help="sensor range (default 150)")
+    parser.add_argument("--sensitivity", type=float, default=0.6, help="sensitivity factor, 0.2-1.0 (default 0.6)")
+    parser.add_argument("--slow-down", type=float, default=0.8,
+                        help="fraction of max speed dropped at full obstacle reading (default 0.8)")
+    parser.add_argument("--wiring", type=float, nargs=2, default=[1.0, 1.0], metavar=("RIGHT", "LEFT"),
+                        help="weights of the right and left readings in the turn (default 1 1)")
+    parser.add_argument("--sensor-angle", type=float, default=45,
+                        help="degrees between the heading and the middle of each side's rays (default 45)")
+    parser.add_argument("--rays-per-side", type=int, default=1, help="sensor rays on each side (default 1)")
+    parser.add_argument("--sensor-spread", type=float, default=90,
+                        help="degrees covered by each side's rays (default 90)")
+    parser.add_argument("--ray-weights", type=float, nargs="+",
+                        help="weight of each ray of a side, from the heading outwards (default: equal)")
+    parser.add_argument("--maze", help="maze file (default: the built-in maze)")
+    parser.add_argument("--timeout", type=float, default=90, help="seconds per trial (default 90)")
+    parser.add_argument("--headless", action="store_true",
+                        help="run in simulated time without a window and print the result")
+    parser.add_argument("--analysis", action="store_true",
+                        help="with --headless, run the sensitivity analysis instead of one trial")
+    parser.add_argument("--robust", action="store_true",
+                        help="with --headless --analysis, run many seeds per value and report confidence intervals")
+    parser.add_argument("--plot", action="store_true",
+                        help="with --headless --analysis, also save the analysis graphs")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the headless collision kicks")
+    parser.add_argument("--no-cache", action="store_true", help="do not reuse cached headless results")
+    parser.add_argument("--trace-limit", type=int, default=DEFAULT_MAX_POINTS,
+                        help=f"trace points kept in memory before older ones are coarsened (default {DEFAULT_MAX_POINTS})")
+    parser.add_argument("--trace-spill", metavar="FILE", help="also write every raw trace point to this file")
+    parser.add_argument("--resume", metavar="FILE", help=f"start from a checkpoint saved with C (e.g. {checkpoint_file})")
+    args = config.parse_args(parser, argv)
+
+    try:
+        setup(args)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.headless:
+        run_headless(args)
+    else:
+        run_interactive(args.resume)
 
-    
-    for i, text in enumerate(info_text):
-        text_surface = font.render(text, True, BLACK)
-        screen.blit(text_surface, (10, 10 + i * 30))
-    
-    pygame.display.update()
-    
-    # Check for timeout
-    if auto_mode and elapsed_time > timeout and not completed:
-        print(f"Trial timed out after {timeout/1000} seconds")
-        completed = True
 
-pygame.quit()
+if __name__ == "__main__":
+    main()
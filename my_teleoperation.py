@@ -1,113 +1,195 @@
-import pygame
+import argparse
+import logging
 import math
 
-# Initialize Pygame
-pygame.init()
+import pygame
+
+import config
+import simulation
+from async_logging import start_logging, stop_logging
+from renderer import Renderer
+from simulation import TICK
+from trace_store import TraceStore, DEFAULT_MAX_POINTS
 
 # Window setup
 WIDTH, HEIGHT = 1000, 1000
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Pygame Robot Teleoperation")
-# Font setup for indisplay text
-font = pygame.font.Font(None, 36)
-text = font.render("Key: ", True, (0, 0, 0))
-
-
-# Define colors
-WHITE = (255, 255, 255)
-RED = (255, 0, 0)
-TRACE_COLOR = (0, 255, 0)  # Green trace
-
-# User Inputs
-try:
-    max_speed = float(input("Enter Robot Max Speed (default 1): ") or 1)  # Default = 1
-    turn_speed = float(input("Enter Turning Speed (default 1): ") or 1)  # Default = 1
-except ValueError:
-    print("Invalid input! Using default values.")
-    max_speed = 1
-    turn_speed = 1
-
-# Robot setup
-robot_x, robot_y = WIDTH // 2, HEIGHT // 2  # Start in the middle
-robot_size = 40
-heading_angle = 90  # Facing upwards
-speed = 0  # Initial speed
-acceleration = 0.2  # Acceleration rate
-deceleration = 0.1  # Deceleration rate
-
-# Store trace positions
-trace_points = []
-
-# Main loop
-running = True
-while running:
-    screen.fill(WHITE)  # Clear screen
-
-    # Draw trace
-    for point in trace_points:
-        pygame.draw.circle(screen, TRACE_COLOR, point, 2)
-
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-    # Get key presses
-    keys = pygame.key.get_pressed()
-
-    # Rotation
-    if keys[pygame.K_LEFT]:  
-        heading_angle += turn_speed  # Turn left (counterclockwise)
-        print("LEFT arrow pressed")
-        text = font.render("Key: LEFT", True, (0, 0, 0))
-        print(f"Turning LEFT (Angle: {heading_angle%360} degrees)")
-
-    if keys[pygame.K_RIGHT]:  
-        heading_angle -= turn_speed  # Turn right (clockwise)
-        print("RIGHT arrow pressed")
-        text = font.render("Key: RIGHT", True, (0, 0, 0))
-        print(f"Turning RIGHT (Angle: {heading_angle%360} degrees)")
-
-    # Acceleration & Deceleration
-    if keys[pygame.K_UP]:  
-        speed = min(max_speed, speed + acceleration)  # Accelerate forward
-        print("UP arrow pressed")
-        text = font.render("Key: UP", True, (0, 0, 0))
-        print(f"Accelerating FORWARD X:{robot_x}, Y:{robot_y}")
-
-    elif keys[pygame.K_DOWN]:  
-        speed = max(-max_speed, speed - acceleration)  # Accelerate backward
-        print("DOWN arrow pressed")
-        text = font.render("Key: DOWN", True, (0, 0, 0))
-        print(f"Accelerating BACKWARD X:{robot_x}, Y:{robot_y}")
-
-    else:  
-        if speed > 0:
-            speed = max(0, speed - deceleration)  # Gradually slow down
-        elif speed < 0:
-            speed = min(0, speed + deceleration)  # Gradually slow down
-
-    # Convert angle to movement
-    robot_x += speed * math.cos(math.radians(heading_angle))
-    robot_y -= speed * math.sin(math.radians(heading_angle))
-
-    # Boundary conditions (keep robot inside window)
-    robot_x = max(robot_size // 2, min(WIDTH - robot_size // 2, robot_x))
-    robot_y = max(robot_size // 2, min(HEIGHT - robot_size // 2, robot_y))
-
-    # Store trace
-    trace_points.append((int(robot_x), int(robot_y)))
-
-    # Draw the robot (rotating triangle)
-    robot = pygame.Surface((robot_size, robot_size), pygame.SRCALPHA)
-    pygame.draw.polygon(robot, RED, [(robot_size // 2, 0), (0, robot_size), (robot_size, robot_size)])
-    rotated_robot = pygame.transform.rotate(robot, heading_angle - 90)  # Rotate for correct orientation
-
-    # Get new rectangle position
-    rect = rotated_robot.get_rect(center=(robot_x, robot_y))
-    screen.blit(rotated_robot, rect.topleft)  # Draw robot
-    screen.blit(text, (10, 10))  # Display key press
-
-    pygame.display.update()  # Update display
-
-pygame.quit()
+
+# Frame and physics rates
+FPS = 60
+PHYSICS_RATE = 60  # Physics steps per second
+MAX_LAG = 0.25  # Seconds of physics a slow frame may catch up on; the rest is dropped
+
+ARROW_KEYS = ((pygame.K_LEFT, "LEFT"), (pygame.K_RIGHT, "RIGHT"), (pygame.K_UP, "UP"), (pygame.K_DOWN, "DOWN"))
+ARROW_NAMES = [name for _, name in ARROW_KEYS]
+
+# The window edges confine the robot, so the sensors reported to remote
+# clients see them as walls
+BOUNDARY_WALLS = [(0, 0, WIDTH, 0), (0, 0, 0, HEIGHT), (0, HEIGHT, WIDTH, HEIGHT), (WIDTH, 0, WIDTH, HEIGHT)]
+SENSOR_RANGE = 150
+
+def run(max_speed=1, turn_speed=1, fps=FPS, physics_rate=PHYSICS_RATE, logger=None, server=None, trace=None):
+    # server: optional command_server.CommandServer; its commands drive the
+    # robot whenever no arrow key is held, and it is sent the state every frame
+    logger = logger or logging.getLogger("teleoperation")
+
+    # Initialize Pygame
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Pygame Robot Teleoperation")
+    # Font setup for indisplay text
+    font = pygame.font.Font(None, 36)
+
+    # Robot setup
+    robot_x, robot_y = WIDTH // 2, HEIGHT // 2  # Start in the middle
+    robot_size = 40
+    heading_angle = 90  # Facing upwards
+    speed = 0  # Initial speed
+    acceleration = 0.2  # Acceleration rate
+    deceleration = 0.1  # Deceleration rate
+
+    # Store trace positions, simplified and capped (see trace_store.py)
+    trace_points = trace if trace is not None else TraceStore()
+
+    # Renderer with the cached background and robot sprites
+    renderer = Renderer(screen, robot_size=robot_size, font=font)
+    key_text = "Key: "
+
+    # Frame and physics rate governor. Physics advances in fixed steps of
+    # 1 / physics_rate seconds; speeds and turn rates are per 1/60 s tick,
+    # as in the simulation, so the robot moves the same at any rate.
+    clock = pygame.time.Clock()
+    physics_step = 1 / physics_rate
+    ticks = physics_step / TICK
+    lag = 0.0
+    held = set()
+    start_time = pygame.time.get_ticks()
+
+    # Main loop
+    running = True
+    while running:
+        # Sleep until the next frame is due
+        lag = min(lag + clock.tick(fps) / 1000, MAX_LAG)
+
+        # Event handling
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        # Get key presses, once per frame; every physics step of the frame uses them
+        keys = pygame.key.get_pressed()
+        pressed = {name for key, name in ARROW_KEYS if keys[key]}
+        for name in ARROW_NAMES:
+            if name in pressed - held:
+                logger.info("%s arrow pressed (X:%.1f, Y:%.1f, Angle:%.1f degrees)",
+                            name, robot_x, robot_y, heading_angle % 360)
+                key_text = f"Key: {name}"
+            elif name in held - pressed:
+                logger.info("%s arrow released (X:%.1f, Y:%.1f, Angle:%.1f degrees)",
+                            name, robot_x, robot_y, heading_angle % 360)
+        held = pressed
+
+        # Turn (positive is left) and throttle from the keys, else from the remote client
+        if held:
+            turn = ("LEFT" in held) - ("RIGHT" in held)
+            throttle = 1 if "UP" in held else -1 if "DOWN" in held else 0
+        elif server is not None:
+            turn, throttle = server.command()
+        else:
+            turn = throttle = 0
+
+        while lag >= physics_step:
+            lag -= physics_step
+
+            # Rotation
+            heading_angle += turn_speed * turn * ticks
+            if turn > 0:
+                logger.debug("Turning LEFT (Angle: %s degrees)", heading_angle % 360)
+            elif turn < 0:
+                logger.debug("Turning RIGHT (Angle: %s degrees)", heading_angle % 360)
+
+            # Acceleration & Deceleration
+            if throttle > 0:
+                speed = min(max_speed, speed + acceleration * ticks)  # Accelerate forward
+                logger.debug("Accelerating FORWARD X:%s, Y:%s", robot_x, robot_y)
+
+            elif throttle < 0:
+                speed = max(-max_speed, speed - acceleration * ticks)  # Accelerate backward
+                logger.debug("Accelerating BACKWARD X:%s, Y:%s", robot_x, robot_y)
+
+            else:
+                if speed > 0:
+                    speed = max(0, speed - deceleration * ticks)  # Gradually slow down
+                elif speed < 0:
+                    speed = min(0, speed + deceleration * ticks)  # Gradually slow down
+
+            # Convert angle to movement
+            robot_x += speed * ticks * math.cos(math.radians(heading_angle))
+            robot_y -= speed * ticks * math.sin(math.radians(heading_angle))
+
+            # Boundary conditions (keep robot inside window)
+            robot_x = max(robot_size // 2, min(WIDTH - robot_size // 2, robot_x))
+            robot_y = max(robot_size // 2, min(HEIGHT - robot_size // 2, robot_y))
+
+            # Store trace
+            point = (int(robot_x), int(robot_y))
+            trace_points.append(point)
+            renderer.add_trace_point(point)
+
+        if server is not None:
+            left, right = simulation.get_sensor_readings(
+                robot_x, robot_y, heading_angle, BOUNDARY_WALLS, SENSOR_RANGE, 1.0, robot_size
+            )
+            server.publish({"time": (pygame.time.get_ticks() - start_time) / 1000, "x": robot_x, "y": robot_y,
+                            "heading": heading_angle, "speed": speed, "left": left, "right": right})
+
+        renderer.draw_background()  # Clear screen and draw trace
+
+        # Draw the robot (rotating triangle)
+        renderer.draw_robot(robot_x, robot_y, heading_angle)
+        renderer.draw_info([key_text])  # Display key press
+
+        pygame.display.update()  # Update display
+
+    pygame.quit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the robot with the arrow keys.")
+    parser.add_argument("--max-speed", type=float, default=1, help="robot max speed (default 1)")
+    parser.add_argument("--turn-speed", type=float, default=1, help="turning speed (default 1)")
+    parser.add_argument("--fps", type=float, default=FPS, help=f"frame rate cap (default {FPS})")
+    parser.add_argument("--physics-rate", type=float, default=PHYSICS_RATE,
+                        help=f"physics steps per second (default {PHYSICS_RATE})")
+    parser.add_argument("--log-file", help="write the log here instead of the terminal")
+    parser.add_argument("--verbose", action="store_true", help="also log every physics step")
+    parser.add_argument("--listen", type=int, metavar="PORT",
+                        help="accept drive commands on this localhost TCP port (0 picks a free one)")
+    parser.add_argument("--unix", metavar="PATH", help="accept drive commands on this Unix socket")
+    parser.add_argument("--stream-rate", type=float, default=30,
+                        help="robot state messages per second sent to command clients (default 30)")
+    parser.add_argument("--trace-limit", type=int, default=DEFAULT_MAX_POINTS,
+                        help=f"trace points kept in memory before older ones are coarsened (default {DEFAULT_MAX_POINTS})")
+    parser.add_argument("--trace-spill", metavar="FILE", help="also write every raw trace point to this file")
+    args = config.parse_args(parser, argv)
+
+    logger, listener = start_logging("teleoperation", logging.DEBUG if args.verbose else logging.INFO,
+                                     args.log_file)
+    server = None
+    trace = TraceStore(args.trace_limit, spill_path=args.trace_spill)
+    try:
+        if args.listen is not None or args.unix:
+            from command_server import CommandServer
+            server = CommandServer(port=args.listen, path=args.unix, stream_rate=args.stream_rate, logger=logger)
+            server.start()
+        run(args.max_speed, args.turn_speed, args.fps, args.physics_rate, logger, server, trace)
+    finally:
+        trace.close()
+        if server is not None:
+            server.stop()
+            logger.info("Command server: %d commands, %d state frames sent, %d skipped",
+                        server.commands_received, server.frames_sent, server.frames_skipped)
+        stop_logging(listener)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import math
+
+from geometry import point_to_line_distance
+
+# Verlet-style neighbor list of the walls around a moving robot.
+#
+# The robot only moves a few pixels per step, so the walls it can sense or
+# touch hardly change from one step to the next. The list caches every wall
+# within radius + margin of the point where it was built. Any query for the
+# walls within reach of (x, y) is answered from the cache as long as
+# (x, y) is still close enough to the build point that the reach circle lies
+# inside the cached circle; otherwise the list is rebuilt around (x, y).
+# With the default margin a robot at full speed rebuilds about every eighth
+# step, and every query in between only touches the cached walls.
+#
+# Cached walls keep their wall list order, so the queries give exactly the
+# same results as a scan over all walls.
+
+DEFAULT_MARGIN = 40
+EPSILON = 1e-6  # Keeps walls exactly at the edge despite rounding
+
+class NeighborList:
+
+    def __init__(self, walls, radius, margin=DEFAULT_MARGIN, grid=None, wall_array=None):
+        self.walls = list(walls)
+        self.radius = radius  # Largest reach queries normally ask for
+        self.margin = margin
+        self.grid = grid  # Optional SpatialGrid to speed up the rebuilds
+        self.wall_array = wall_array  # Optional (N, 4) array, see raycast.wall_array()
+        self.center = None
+        self.indices = []
+        self.nearby = []
+        self.nearby_array = None
+        self.rebuilds = 0
+
+    def rebuild(self, x, y):
+        reach = self.radius + self.margin + EPSILON
+        if self.grid is not None:
+            candidates = self.grid.indices_near_point(x, y, reach)
+        else:
+            candidates = range(len(self.walls))
+        self.indices = [i for i in candidates if point_to_line_distance(x, y, *self.walls[i]) <= reach]
+        self.nearby = [self.walls[i] for i in self.indices]
+        if self.wall_array is not None:
+            self.nearby_array = self.wall_array[self.indices]
+        self.center = (x, y)
+        self.rebuilds += 1
+
+    def update(self, x, y, reach=None):
+        # Make sure the cache holds every wall within reach of (x, y); returns
+        # False if reach is larger than the cache can ever cover
+        if reach is None:
+            reach = self.radius
+        if reach > self.radius:
+            return False
+        if self.center is None or math.hypot(x - self.center[0], y - self.center[1]) + reach > self.radius + self.margin:
+            self.rebuild(x, y)
+        return True
+
+    def walls_near(self, x, y, reach=None):
+        # Walls that could be within reach of (x, y), in wall list order
+        if not self.update(x, y, reach):
+            return self.walls
+        return self.nearby
+
+    def array_near(self, x, y, reach=None):
+        # Same as walls_near() as rows of the wall array
+        if not self.update(x, y, reach):
+            return self.wall_array
+        return self.nearby_array
@@ -0,0 +1,107 @@
+import argparse
+import math
+
+import simulation
+from maze import load_maze
+
+# Adaptive sensitivity search with early termination.
+#
+# Instead of a full trial at every point of a fixed grid, a coarse grid first
+# brackets the best sensitivity and a golden-section search then narrows the
+# bracket down to the requested resolution. The score (time + collisions * 2)
+# only grows while a trial runs, so a trial can be stopped once its partial
+# score shows it loses the comparison it was run for; its score is then a
+# lower bound, at least the limit it was given. Grid trials run with the best
+# score so far as their limit. A golden-section trial is only compared with
+# the point kept from the previous step, whose score is always exact, so it
+# runs with that score as its limit (nudged up for the left point, which wins
+# ties). Every comparison therefore comes out as it would without stopping
+# early, and pruning only saves simulated time.
+
+GOLDEN = (math.sqrt(5) - 1) / 2
+
+class AdaptiveSearch:
+
+    def __init__(self, timeout=simulation.TIMEOUT, prune=True, **params):
+        self.timeout = timeout
+        self.prune = prune
+        self.params = params
+        self.history = []  # (sensitivity, result) in evaluation order
+        self.cache = {}
+        self.best = None  # Result of the best finished (not pruned) trial
+
+    @property
+    def simulated_seconds(self):
+        return sum(result["steps"] for _, result in self.history) * self.params.get("time_step", simulation.TICK)
+
+    def evaluate(self, sensitivity, score_limit=None):
+        # Score of one trial, stopped once it reaches score_limit. A stopped
+        # (pruned) trial returns its partial score, which is at least the limit.
+        sensitivity = round(sensitivity, 6)
+        if not self.prune:
+            score_limit = None
+        cached = self.cache.get(sensitivity)
+        if cached is not None and not (cached["pruned"] and (score_limit is None or cached["score"] < score_limit)):
+            return cached["score"]
+        result = simulation.run_trial(self.timeout, score_limit, sensitivity=sensitivity, **self.params)
+        self.history.append((sensitivity, result))
+        self.cache[sensitivity] = result
+        if not result["pruned"] and (self.best is None or result["score"] < self.best["score"]):
+            self.best = result
+        return result["score"]
+
+    def search(self, low=0.2, high=1.0, coarse=5, tolerance=0.01):
+        # Coarse grid to bracket the best value, then golden-section refinement
+        grid = [low + (high - low) * i / (coarse - 1) for i in range(coarse)]
+        scores = [self.evaluate(s, self.best["score"] if self.best else None) for s in grid]
+        best = min(range(coarse), key=lambda i: scores[i])
+        a = grid[max(best - 1, 0)]
+        b = grid[min(best + 1, coarse - 1)]
+
+        c = b - GOLDEN * (b - a)
+        d = a + GOLDEN * (b - a)
+        fc = self.evaluate(c)
+        fd = self.evaluate(d, fc)
+        while b - a > tolerance:
+            if fc <= fd:
+                b, d, fd = d, c, fc
+                c = b - GOLDEN * (b - a)
+                fc = self.evaluate(c, math.nextafter(fd, math.inf))
+            else:
+                a, c, fc = c, d, fd
+                d = a + GOLDEN * (b - a)
+                fd = self.evaluate(d, fc)
+        return self.best
+
+
+def print_history(search):
+    print("Sensitivity | Time (s) | Collisions | Performance Score")
+    print("-" * 50)
+    for sens, result in sorted(search.history, key=lambda item: item[0]):
+        note = "  (stopped early)" if result["pruned"] else ""
+        print(f"{sens:.3f}      | {result['time']:.2f}    | {result['collisions']}         | {result['score']:.2f}{note}")
+    best = search.best
+    print(f"\nBest sensitivity: {best['sensitivity']:.3f} (Score: {best['score']:.2f})")
+    print(f"{len(search.history)} trials, {search.simulated_seconds:.1f} simulated seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive search for the best sensitivity.")
+    parser.add_argument("--low", type=float, default=0.2)
+    parser.add_argument("--high", type=float, default=1.0)
+    parser.add_argument("--coarse", type=int, default=5, help="points in the initial bracketing grid")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="final bracket width")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=simulation.TIMEOUT, help="simulated seconds per trial")
+    parser.add_argument("--no-prune", action="store_true", help="run every trial to the end")
+    parser.add_argument("--maze", help="maze file (default: the built-in maze)")
+    args = parser.parse_args()
+
+    params = load_maze(args.maze).simulation_params() if args.maze else {}
+    search = AdaptiveSearch(args.timeout, not args.no_prune, seed=args.seed, **params)
+    search.search(args.low, args.high, args.coarse, args.tolerance)
+    print_history(search)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import csv
+import json
+import time
+from collections import deque
+
+# Per-phase frame timing for the interactive loops.
+#
+# Call begin_frame() at the top of the loop, lap("phase") after each phase
+# and end_frame() at the bottom. Each lap measures the time since the
+# previous mark, so instrumenting a phase costs one perf_counter() call. Phases
+# that appear several times in a frame are summed. A rolling window of frames
+# is kept per phase for p50/p95/max; when the timer is disabled every call
+# returns immediately.
+
+WINDOW = 600  # Frames kept for the rolling statistics
+
+class PhaseTimer:
+
+    def __init__(self, enabled=True, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.samples = {}  # phase -> deque of per-frame seconds
+        self.totals = {}  # phase -> seconds over the whole run
+        self.frames = 0
+        self.frame = {}
+        self.mark = 0.0
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.frame = {}
+        self.mark = time.perf_counter()
+
+    def lap(self, phase):
+        # Charge the time since the last mark to phase
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.frame[phase] = self.frame.get(phase, 0.0) + now - self.mark
+        self.mark = now
+
+    def end_frame(self):
+        if not self.enabled or not self.frame:
+            return
+        self.frame["frame"] = sum(self.frame.values())
+        for phase, seconds in self.frame.items():
+            if phase not in self.samples:
+                self.samples[phase] = deque(maxlen=self.window)
+                self.totals[phase] = 0.0
+            self.samples[phase].append(seconds)
+            self.totals[phase] += seconds
+        self.frames += 1
+        self.frame = {}
+
+    def stats(self):
+        # {phase: {"p50", "p95", "max", "mean", "total"}} in milliseconds,
+        # percentiles over the rolling window and total over the whole run
+        stats = {}
+        for phase, samples in self.samples.items():
+            ordered = sorted(samples)
+            n = len(ordered)
+            stats[phase] = {
+                "p50": ordered[int(0.50 * (n - 1))] * 1000,
+                "p95": ordered[int(0.95 * (n - 1))] * 1000,
+                "max": ordered[-1] * 1000,
+                "mean": sum(ordered) / n * 1000,
+                "total": self.totals[phase] * 1000,
+            }
+        return stats
+
+    def overlay_lines(self):
+        # One HUD line per phase for drawing next to the info text
+        return [f"{phase}: p50 {s['p50']:.2f} p95 {s['p95']:.2f} max {s['max']:.2f} ms"
+                for phase, s in self.stats().items()]
+
+    def export(self, path):
+        # Write the statistics to a .json or .csv file
+        stats = self.stats()
+        if str(path).endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["phase", "p50_ms", "p95_ms", "max_ms", "mean_ms", "total_ms"])
+                for phase, s in stats.items():
+                    writer.writerow([phase, s["p50"], s["p95"], s["max"], s["mean"], s["total"]])
+        else:
+            with open(path, "w") as f:
+                json.dump({"frames": self.frames, "window": self.window, "phases": stats}, f, indent=2)
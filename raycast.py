@@ -0,0 +1,52 @@
+import numpy as np
+
+import simulation
+
+# Vectorized ray casting against the maze walls.
+# The walls are kept as a contiguous (N, 4) float array of (x1, y1, x2, y2)
+# rows and every ray is tested against every segment in one set of NumPy
+# operations. The arithmetic mirrors geometry.line_intersection() step by
+# step, so the readings are the same as the scalar code.
+
+def wall_array(walls):
+    # Pack a list of (x1, y1, x2, y2) walls into a contiguous (N, 4) float array
+    return np.ascontiguousarray(np.asarray(walls, dtype=np.float64).reshape(-1, 4))
+
+def walls_near(walls, x, y, reach):
+    # Rows of a wall array whose bounding box comes within reach of (x, y)
+    # along both axes, a superset of the walls within reach
+    near = ((np.minimum(walls[:, 0], walls[:, 2]) <= x + reach) & (np.maximum(walls[:, 0], walls[:, 2]) >= x - reach)
+            & (np.minimum(walls[:, 1], walls[:, 3]) <= y + reach) & (np.maximum(walls[:, 1], walls[:, 3]) >= y - reach))
+    return walls[near]
+
+def cast_rays(rays, walls, max_distance):
+    # Distance along each ray (sensor_x, sensor_y, end_x, end_y) to the nearest
+    # wall, or max_distance where no wall is hit. max_distance is a scalar or
+    # one value per ray. Returns an (R,) array.
+    rays = np.asarray(rays, dtype=np.float64).reshape(-1, 4)
+    distances = np.broadcast_to(np.asarray(max_distance, dtype=np.float64), (len(rays),)).copy()
+    if len(walls) == 0 or len(rays) == 0:
+        return distances
+
+    # Rays along axis 0, walls along axis 1
+    x1, y1, x2, y2 = (rays[:, i:i + 1] for i in range(4))
+    x3, y3, x4, y4 = walls[:, 0], walls[:, 1], walls[:, 2], walls[:, 3]
+
+    den = (y4 - y3) * (x2 - x1) - (x4 - x3) * (y2 - y1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / den
+        ub = ((x2 - x1) * (y1 - y3) - (y2 - y1) * (x1 - x3)) / den
+        hit = (den != 0) & (ua >= 0) & (ua <= 1) & (ub >= 0) & (ub <= 1)
+
+        ix = x1 + ua * (x2 - x1)
+        iy = y1 + ua * (y2 - y1)
+        hit_distance = np.where(hit, np.sqrt((x1 - ix)**2 + (y1 - iy)**2), np.inf)
+    return np.minimum(distances, hit_distance.min(axis=1))
+
+def get_sensor_readings(x, y, heading_angle, walls, sensor_range, sensitivity,
+                        robot_size=simulation.ROBOT_SIZE):
+    # Drop-in replacement for simulation.get_sensor_readings() taking a wall array
+    rays = simulation.sensor_rays(x, y, heading_angle, sensor_range, robot_size)
+    left_distance, right_distance = cast_rays(rays, walls, sensor_range).tolist()
+    return (simulation.distance_to_reading(left_distance, sensor_range, sensitivity),
+            simulation.distance_to_reading(right_distance, sensor_range, sensitivity))
@@ -0,0 +1,235 @@
+import argparse
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pygame
+
+import simulation
+from maze import default_maze, load_maze
+from renderer import Renderer
+from trajectory import Trajectory, TrajectoryRecorder
+
+# Offscreen export of recorded trajectories to image sequences or video.
+#
+# Frames are drawn with the same Renderer as the interactive scripts onto
+# offscreen surfaces, so no window is needed. The static maze layer is drawn
+# once in the main process and handed to every worker as raw pixels. The
+# frames of all trajectories are split into jobs, one per trajectory or, when
+# there are fewer trajectories than workers, several chunks per trajectory;
+# a chunk starts by redrawing the trace up to its first frame. Image formats
+# are written by pygame (.png, or the much faster .bmp/.tga); mp4 frames are
+# converted to NumPy arrays and piped to ffmpeg, and the chunks of each
+# trajectory are joined afterwards.
+#
+#   python render_export.py runs/*.traj --maze mazes/default.json --out review
+#   python render_export.py --record 20 --out review --format mp4
+
+FORMATS = ("png", "bmp", "tga", "mp4")
+FPS = 25  # Output frames per second
+SPEED = 8.0  # Simulated seconds shown per second of output
+SCALE = 0.5  # Output size relative to the maze
+MARGIN = 50  # Pixels right of and below the maze bounds
+MIN_CHUNK_FRAMES = 50
+
+worker = {}  # Per-process renderer state, set up by init_worker()
+
+def frame_size(maze):
+    return (int(maze.bounds[2] + MARGIN), int(maze.bounds[3] + MARGIN))
+
+def frame_stride(time_step, fps=FPS, speed=SPEED):
+    # Trajectory records per output frame
+    return max(1, round(speed / fps / time_step))
+
+def frame_count(records, stride):
+    # Frames needed to show every stride-th record and the last one
+    return (records - 2) // stride + 2 if records > 1 else records
+
+def frame_array(surface):
+    # (height, width, 3) uint8 RGB copy of a surface
+    return np.ascontiguousarray(pygame.surfarray.array3d(surface).swapaxes(0, 1))
+
+def init_worker(maze, size, background, sensor_range, scale):
+    pygame.font.init()
+    surface = pygame.Surface(size)
+    renderer = Renderer(surface, maze.wall_list(), maze.start, maze.finish)
+    renderer.background = pygame.image.frombytes(background, size, "RGB")
+    output_size = (round(size[0] * scale), round(size[1] * scale))
+    worker.update(renderer=renderer, surface=surface, sensor_range=sensor_range, output_size=output_size)
+
+def render_frames(trajectory, stride, first, stop, label=""):
+    # Draw frames first..stop-1 of a trajectory; yields (frame number, surface).
+    # The surface is reused, so copy or save it before the next frame.
+    renderer = worker["renderer"]
+    surface = worker["surface"]
+    last = len(trajectory) - 1
+    index = min(first * stride, last)
+    renderer.reset_trace()
+    for point in trajectory.positions(0, index + 1).astype(int).tolist():
+        renderer.add_trace_point(tuple(point))
+
+    for frame in range(first, stop):
+        new_index = min(frame * stride, last)
+        for point in trajectory.positions(index + 1, new_index + 1).astype(int).tolist():
+            renderer.add_trace_point(tuple(point))
+        index = new_index
+
+        record = trajectory[index]
+        x, y, heading_angle = float(record["x"]), float(record["y"]), float(record["heading"])
+        step = int(record["step"])
+        collisions = int(np.searchsorted(trajectory.collision_steps, step, side="right"))
+        renderer.draw_background()
+        renderer.draw_robot(x, y, heading_angle)
+        renderer.draw_sensor_rays(
+            simulation.sensor_rays(x, y, heading_angle, worker["sensor_range"]),
+            (float(record["left"]), float(record["right"]))
+        )
+        renderer.draw_info([
+            label,
+            f"Time: {step * trajectory.time_step:.2f}s",
+            f"Speed: {float(record['speed']):.2f}",
+            f"Collisions: {collisions}",
+        ])
+        if surface.get_size() != worker["output_size"]:
+            yield frame, pygame.transform.smoothscale(surface, worker["output_size"])
+        else:
+            yield frame, surface
+
+def render_job(job):
+    # Render one chunk of frames to an image directory or a video file
+    path, stride, first, stop, output, fmt, fps = job
+    trajectory = Trajectory(path)
+    label = os.path.splitext(os.path.basename(path))[0]
+    frames = render_frames(trajectory, stride, first, stop, label)
+    if fmt != "mp4":
+        os.makedirs(output, exist_ok=True)
+        for frame, surface in frames:
+            pygame.image.save(surface, os.path.join(output, f"frame_{frame:06d}.{fmt}"))
+        return stop - first
+
+    width, height = worker["output_size"]
+    encoder = subprocess.Popen(
+        ["ffmpeg", "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24",
+         "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+         "-c:v", "libx264", "-pix_fmt", "yuv420p", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", output],
+        stdin=subprocess.PIPE,
+    )
+    for _, surface in frames:
+        encoder.stdin.write(frame_array(surface).tobytes())
+    encoder.stdin.close()
+    if encoder.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed writing '{output}'")
+    return stop - first
+
+def join_videos(parts, output):
+    # Concatenate video chunks without re-encoding
+    if len(parts) == 1:
+        os.replace(parts[0], output)
+        return
+    listing = output + ".parts.txt"
+    with open(listing, "w") as f:
+        f.writelines(f"file '{os.path.abspath(part)}'\n" for part in parts)
+    subprocess.run(["ffmpeg", "-loglevel", "error", "-y", "-f", "concat", "-safe", "0", "-i", listing,
+                    "-c", "copy", output], check=True)
+    os.remove(listing)
+    for part in parts:
+        os.remove(part)
+
+def plan_jobs(paths, out_dir, fmt, fps, speed, workers):
+    # Split the trajectories' frames into jobs; returns (jobs, {output: [video parts]})
+    trajectories = [(path, Trajectory(path)) for path in paths]
+    chunks_per_trajectory = max(1, -(-workers // len(trajectories)))
+    jobs = []
+    videos = {}
+    for path, trajectory in trajectories:
+        stride = frame_stride(trajectory.time_step, fps, speed)
+        frames = frame_count(len(trajectory), stride)
+        name = os.path.splitext(os.path.basename(path))[0]
+        chunks = max(1, min(chunks_per_trajectory, frames // MIN_CHUNK_FRAMES))
+        bounds = [frames * i // chunks for i in range(chunks + 1)]
+        for i in range(chunks):
+            if fmt == "mp4":
+                output = os.path.join(out_dir, f"{name}.part{i:02d}.mp4")
+                videos.setdefault(os.path.join(out_dir, f"{name}.mp4"), []).append(output)
+            else:
+                output = os.path.join(out_dir, name)
+            jobs.append((path, stride, bounds[i], bounds[i + 1], output, fmt, fps))
+    return jobs, videos
+
+def record_trials(count, out_dir, timeout, **params):
+    # Record count trials with seeds 0..count-1 for a review pack
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for seed in range(count):
+        path = os.path.join(out_dir, f"trial_{seed:02d}.traj")
+        with TrajectoryRecorder(path) as recorder:
+            simulation.Simulation(seed=seed, recorder=recorder, neighbor_list=True, **params).run(timeout)
+        paths.append(path)
+    return paths
+
+def export(paths, maze, out_dir, fmt="png", fps=FPS, speed=SPEED, scale=SCALE, sensor_range=150, workers=None):
+    # Render every trajectory in paths; returns the number of frames written
+    if fmt == "mp4" and shutil.which("ffmpeg") is None:
+        raise RuntimeError("mp4 export needs ffmpeg on the PATH; use an image format instead")
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Static maze layer, drawn once and shared with every worker
+    pygame.font.init()
+    size = frame_size(maze)
+    background = Renderer(pygame.Surface(size), maze.wall_list(), maze.start, maze.finish).build_background()
+    initargs = (maze, size, pygame.image.tobytes(background, "RGB"), sensor_range, scale)
+
+    jobs, videos = plan_jobs(paths, out_dir, fmt, fps, speed, workers)
+    if workers == 1:
+        init_worker(*initargs)
+        frames = sum(map(render_job, jobs))
+    else:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=initargs) as pool:
+            frames = sum(pool.map(render_job, jobs))
+    for output, parts in videos.items():
+        join_videos(parts, output)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render recorded trajectories to image sequences or video.")
+    parser.add_argument("paths", nargs="*", help="trajectory files to render")
+    parser.add_argument("--out", default="renders", help="output directory (default 'renders')")
+    parser.add_argument("--format", choices=FORMATS, default="png",
+                        help="image format of the frame sequences, or mp4 (needs ffmpeg)")
+    parser.add_argument("--maze", help="maze file the runs used (default: the built-in maze)")
+    parser.add_argument("--fps", type=float, default=FPS, help=f"output frames per second (default {FPS})")
+    parser.add_argument("--speed", type=float, default=SPEED,
+                        help=f"simulated seconds per second of output (default {SPEED})")
+    parser.add_argument("--scale", type=float, default=SCALE, help=f"output size relative to the maze (default {SCALE})")
+    parser.add_argument("--sensor-range", type=float, default=150, help="sensor range used to draw the rays")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--record", type=int, metavar="N",
+                        help="first record N trials (seeds 0..N-1) into the output directory")
+    parser.add_argument("--sensitivity", type=float, default=0.6, help="sensitivity of the recorded trials")
+    parser.add_argument("--timeout", type=float, default=simulation.TIMEOUT,
+                        help="simulated seconds per recorded trial")
+    args = parser.parse_args()
+
+    maze = load_maze(args.maze) if args.maze else default_maze()
+    start = time.perf_counter()
+    paths = list(args.paths)
+    if args.record:
+        paths += record_trials(args.record, args.out, args.timeout, sensor_range=args.sensor_range,
+                               sensitivity=args.sensitivity, **maze.simulation_params())
+        print(f"Recorded {args.record} trials in {time.perf_counter() - start:.1f}s")
+    if not paths:
+        parser.error("no trajectory files given (pass paths or --record N)")
+
+    frames = export(paths, maze, args.out, args.format, args.fps, args.speed, args.scale,
+                    args.sensor_range, args.workers)
+    print(f"Rendered {frames} frames of {len(paths)} trajectories to '{args.out}' "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import pygame
+
+import simulation
+
+# Layered pygame renderer shared by my_autonomous.py and my_teleoperation.py.
+#
+# Static geometry (background, walls, start and finish) is drawn once to a
+# cached layer. The trace is drawn incrementally onto a persistent copy of
+# that layer, so each frame costs one blit no matter how long the run has
+# been. Rotated robot sprites are cached by quantized heading, and HUD lines
+# are only re-rendered when their text changes.
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+TRACE_COLOR = (0, 255, 0)  # Green trace
+
+HEADING_STEP = 1  # Degrees per cached robot sprite
+
+class Renderer:
+
+    def __init__(self, screen, walls=(), start=None, finish=None, robot_size=simulation.ROBOT_SIZE,
+                 font=None, heading_step=HEADING_STEP):
+        self.screen = screen
+        self.walls = list(walls)
+        self.start = start
+        self.finish = finish
+        self.robot_size = robot_size
+        self.font = font or pygame.font.Font(None, 36)
+        self.heading_step = heading_step
+
+        # Unrotated robot triangle, pointing up
+        self.robot = pygame.Surface((robot_size, robot_size), pygame.SRCALPHA)
+        pygame.draw.polygon(self.robot, RED, [(robot_size // 2, 0), (0, robot_size), (robot_size, robot_size)])
+
+        self.sprites = {}
+        self.text_lines = []  # (text, surface) per HUD line
+        self.background = None
+        self.scene = None  # Background plus the trace drawn so far
+
+    def set_maze(self, walls, start=None, finish=None):
+        self.walls = list(walls)
+        self.start = start
+        self.finish = finish
+        self.background = None
+        self.scene = None
+
+    def build_background(self):
+        # Static layer: background color, maze walls, start and finish
+        background = pygame.Surface(self.screen.get_size())
+        if pygame.display.get_surface() is not None:
+            background = background.convert()
+        background.fill(WHITE)
+        for x1, y1, x2, y2 in self.walls:
+            pygame.draw.line(background, BLACK, (x1, y1), (x2, y2), 3)
+        if self.start is not None:
+            pygame.draw.circle(background, GREEN, self.start, 20, 2)
+        if self.finish is not None:
+            pygame.draw.circle(background, RED, self.finish, 20, 2)
+        return background
+
+    def reset_trace(self):
+        # Start a new trace, e.g. between analysis trials
+        if self.background is None:
+            self.background = self.build_background()
+        self.scene = self.background.copy()
+
+    def add_trace_point(self, point):
+        # Draw only the newest trace point onto the persistent layer
+        if self.scene is None:
+            self.reset_trace()
+        pygame.draw.circle(self.scene, TRACE_COLOR, point, 2)
+
+    def draw_trace(self, points):
+        # Draw a whole (simplified) trace onto the persistent layer, e.g. after
+        # restoring a checkpoint
+        if self.scene is None:
+            self.reset_trace()
+        points = list(points)
+        if len(points) > 1:
+            pygame.draw.lines(self.scene, TRACE_COLOR, False, points, 4)
+        for point in points[:1] + points[-1:]:
+            pygame.draw.circle(self.scene, TRACE_COLOR, point, 2)
+
+    def draw_background(self):
+        # Blit the static layer together with the trace
+        if self.scene is None:
+            self.reset_trace()
+        self.screen.blit(self.scene, (0, 0))
+
+    def robot_sprite(self, heading_angle):
+        # Rotated robot surface for the heading, rounded to heading_step degrees
+        key = round((heading_angle - 90) / self.heading_step) % round(360 / self.heading_step)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = pygame.transform.rotate(self.robot, key * self.heading_step)
+            self.sprites[key] = sprite
+        return sprite
+
+    def draw_robot(self, robot_x, robot_y, heading_angle):
+        sprite = self.robot_sprite(heading_angle)
+        rect = sprite.get_rect(center=(robot_x, robot_y))
+        self.screen.blit(sprite, rect.topleft)
+
+    def draw_sensor_rays(self, rays, readings):
+        # Sensor rays with color based on reading intensity
+        for (sensor_x, sensor_y, ray_end_x, ray_end_y), reading in zip(rays, readings):
+            color = (int(255 * reading), 0, 0)
+            pygame.draw.line(self.screen, color, (sensor_x, sensor_y), (ray_end_x, ray_end_y), 2)
+
+    def draw_info(self, info_text, position=(10, 10), line_height=30):
+        # HUD text; a line is only re-rendered when its text changed
+        del self.text_lines[len(info_text):]
+        for i, text in enumerate(info_text):
+            if i == len(self.text_lines):
+                self.text_lines.append((None, None))
+            if self.text_lines[i][0] != text:
+                self.text_lines[i] = (text, self.font.render(text, True, BLACK))
+            self.screen.blit(self.text_lines[i][1], (position[0], position[1] + i * line_height))
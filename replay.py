@@ -0,0 +1,134 @@
+import argparse
+
+import numpy as np
+import pygame
+
+import simulation
+from maze import default_maze, load_maze
+from renderer import Renderer, BLACK, RED
+from trajectory import Trajectory
+
+# Replay viewer for recorded trajectory files.
+# The file is memory-mapped, so jumping to any step only reads that part of it.
+#
+# Controls:
+#   Space         play / pause
+#   Left / Right  step back / forward (hold Shift for 100 steps)
+#   Up / Down     faster / slower playback
+#   Home / End    jump to the first / last step
+#   C / Shift+C   jump to the next / previous collision
+#   Mouse click   seek on the scrub bar at the bottom of the window
+
+WIDTH, HEIGHT = 1000, 1000
+SCRUB_BAR_HEIGHT = 16
+MAX_TRACE_POINTS = 20000  # Trace points redrawn after a seek
+
+def redraw_trace(renderer, trajectory, index):
+    # Rebuild the trace layer up to record index after a seek
+    renderer.reset_trace()
+    points = trajectory.positions(0, index + 1)
+    stride = max(1, len(points) // MAX_TRACE_POINTS)
+    for point in points[::stride].astype(int).tolist():
+        renderer.add_trace_point(tuple(point))
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded trajectory file.")
+    parser.add_argument("path", help="trajectory file")
+    parser.add_argument("--maze", help="maze file the run used (default: the built-in maze)")
+    parser.add_argument("--sensor-range", type=float, default=150, help="sensor range used to draw the rays")
+    parser.add_argument("--fps", type=int, default=60)
+    args = parser.parse_args()
+
+    trajectory = Trajectory(args.path)
+    if not len(trajectory):
+        print(f"'{args.path}' has no recorded steps")
+        return
+    maze = load_maze(args.maze) if args.maze else default_maze()
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(f"Replay: {args.path}")
+    renderer = Renderer(screen, maze.wall_list(), maze.start, maze.finish)
+    clock = pygame.time.Clock()
+
+    index = 0
+    steps_per_frame = 1
+    playing = True
+    seek_to = 0
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                jump = 100 if event.mod & pygame.KMOD_SHIFT else 1
+                if event.key == pygame.K_SPACE:
+                    playing = not playing
+                elif event.key == pygame.K_RIGHT:
+                    seek_to = index + jump
+                elif event.key == pygame.K_LEFT:
+                    seek_to = index - jump
+                elif event.key == pygame.K_UP:
+                    steps_per_frame *= 2
+                elif event.key == pygame.K_DOWN:
+                    steps_per_frame = max(1, steps_per_frame // 2)
+                elif event.key == pygame.K_HOME:
+                    seek_to = 0
+                elif event.key == pygame.K_END:
+                    seek_to = len(trajectory) - 1
+                elif event.key == pygame.K_c:
+                    if event.mod & pygame.KMOD_SHIFT:
+                        seek_to = trajectory.previous_collision(index)
+                    else:
+                        seek_to = trajectory.next_collision(index)
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.pos[1] >= HEIGHT - SCRUB_BAR_HEIGHT:
+                seek_to = int(event.pos[0] / WIDTH * (len(trajectory) - 1))
+
+        if seek_to is not None:
+            # Seeking rebuilds the trace; playing forward only adds new points
+            index = min(max(seek_to, 0), len(trajectory) - 1)
+            redraw_trace(renderer, trajectory, index)
+            seek_to = None
+        elif playing and index < len(trajectory) - 1:
+            new_index = min(index + steps_per_frame, len(trajectory) - 1)
+            for point in trajectory.positions(index + 1, new_index + 1).astype(int).tolist():
+                renderer.add_trace_point(tuple(point))
+            index = new_index
+
+        record = trajectory[index]
+        x, y, heading_angle = float(record["x"]), float(record["y"]), float(record["heading"])
+        step = int(record["step"])
+        collisions = int(np.searchsorted(trajectory.collision_steps, step, side="right"))
+
+        renderer.draw_background()
+        renderer.draw_robot(x, y, heading_angle)
+        renderer.draw_sensor_rays(
+            simulation.sensor_rays(x, y, heading_angle, args.sensor_range),
+            (float(record["left"]), float(record["right"]))
+        )
+        renderer.draw_info([
+            f"Step: {step} / {int(trajectory[-1]['step'])}" + ("" if playing else " (paused)"),
+            f"Time: {step * trajectory.time_step:.2f}s",
+            f"Speed: {float(record['speed']):.2f}",
+            f"Collisions: {collisions}",
+            f"Playback: x{steps_per_frame}",
+        ])
+
+        # Scrub bar with the collision steps marked
+        bar_top = HEIGHT - SCRUB_BAR_HEIGHT
+        pygame.draw.rect(screen, (220, 220, 220), (0, bar_top, WIDTH, SCRUB_BAR_HEIGHT))
+        last_step = max(1, int(trajectory[-1]["step"]))
+        for collision_step in trajectory.collision_steps[::max(1, len(trajectory.collision_steps) // WIDTH)]:
+            marker_x = int(collision_step / last_step * WIDTH)
+            pygame.draw.line(screen, RED, (marker_x, bar_top), (marker_x, HEIGHT), 1)
+        cursor_x = int(index / max(1, len(trajectory) - 1) * WIDTH)
+        pygame.draw.rect(screen, BLACK, (cursor_x - 2, bar_top, 4, SCRUB_BAR_HEIGHT))
+
+        pygame.display.update()
+        clock.tick(args.fps)
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+
+import simulation
+from atomic_file import write_atomic
+
+# Persistent, content-addressed cache of trial results.
+#
+# The key is a hash of everything that determines a trial's outcome: the full
+# parameter set (with defaults filled in), a hash of the maze walls, start and
+# finish, the RNG seed, the timeout and simulation.ENGINE_VERSION. Options that
+# do not change the result (vectorized sensing, the spatial index) are left
+# out of the key. Each entry is a small JSON file, optionally with the trial's
+# trajectory file next to it. Entries are evicted least recently used first
+# once the cache grows past its size limit.
+#
+# The directory is only scanned when the size kept in memory (from one scan,
+# plus everything put since) passes the limit, and eviction then goes down to
+# EVICT_TO of the limit, so a long sweep scans the cache now and then instead
+# of on every put. Trials without a seed are not reproducible and bypass the
+# cache.
+
+DEFAULT_DIRECTORY = ".result_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+EVICT_TO = 0.9  # Fraction of max_bytes left after an eviction
+
+# Simulation options that only change how fast a trial runs, not its result
+RESULT_NEUTRAL = {"vectorized", "spatial_index", "cell_size", "neighbor_list", "neighbor_margin",
+                  "distance_field", "field_resolution", "field_cache", "record_trace", "recorder", "trace_max_points",
+                  "trace_spill"}
+MAZE_PARAMETERS = ("walls", "start", "finish")
+
+def maze_hash(walls=simulation.WALLS, start=simulation.START, finish=simulation.FINISH):
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(map(float, wall)) for wall in walls]).encode())
+    digest.update(json.dumps([list(map(float, start)), list(map(float, finish))]).encode())
+    return digest.hexdigest()
+
+def simulation_defaults():
+    signature = inspect.signature(simulation.Simulation.__init__)
+    return {name: p.default for name, p in signature.parameters.items() if name != "self"}
+
+class ResultCache:
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = None  # Estimated size of the cache, known after the first scan
+
+    def key(self, timeout=simulation.TIMEOUT, **params):
+        full = simulation_defaults()
+        full.update(params)
+        maze = {name: full.pop(name) for name in MAZE_PARAMETERS}
+        description = {name: value for name, value in full.items() if name not in RESULT_NEUTRAL}
+        description.update(
+            maze=maze_hash(**maze),
+            timeout=float(timeout),
+            engine_version=simulation.ENGINE_VERSION,
+        )
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key, suffix=".json"):
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key):
+        try:
+            with open(self.path(key)) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(self.path(key))  # Mark as recently used
+        return result
+
+    def trajectory_path(self, key):
+        # Path of the cached trajectory file for key, or None if there is none
+        path = self.path(key, ".traj")
+        return path if os.path.exists(path) else None
+
+    def put(self, key, result, trajectory_file=None):
+        # Write atomically so concurrent sweep workers never see half a file.
+        # The directory is only created here, so a cache that is never written
+        # leaves nothing on disk.
+        os.makedirs(self.directory, exist_ok=True)
+        if trajectory_file is not None:
+            os.replace(trajectory_file, self.path(key, ".traj"))
+        write_atomic(self.path(key), lambda f: json.dump(result, f))
+        if self.total_bytes is None:
+            self.evict()
+            return
+        self.total_bytes += os.path.getsize(self.path(key))
+        if trajectory_file is not None:
+            self.total_bytes += os.path.getsize(self.path(key, ".traj"))
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        # Scan the cache and, if it is over max_bytes, drop least recently used
+        # entries until it fits in EVICT_TO of it. Other processes may share
+        # the directory, so the scan also corrects the size kept in memory.
+        entries = {}
+        total = 0
+        for name in os.listdir(self.directory):
+            key, suffix = os.path.splitext(name)
+            if suffix not in (".json", ".traj"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            size, used = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(used, stat.st_mtime))
+            total += stat.st_size
+        if total > self.max_bytes:
+            for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                for suffix in (".json", ".traj"):
+                    try:
+                        os.remove(self.path(key, suffix))
+                    except FileNotFoundError:
+                        pass
+                total -= size
+        self.total_bytes = total
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith((".json", ".traj", ".tmp")):
+                    os.remove(os.path.join(self.directory, name))
+        self.total_bytes = 0
+
+    def run_trial(self, timeout=simulation.TIMEOUT, score_limit=None, record_trajectory=False, **params):
+        # simulation.run_trial() backed by the cache. A cached full result is
+        # returned even when score_limit is given; pruned results are not
+        # stored, since they depend on the limit. With record_trajectory the
+        # trial's trajectory is cached too (see trajectory_path()). Trials
+        # without a seed draw fresh random kicks every run and are not cached.
+        if params.get("seed") is None:
+            if not record_trajectory:
+                return simulation.run_trial(timeout, score_limit, **params)
+            raise ValueError("only seeded trials can be cached with their trajectory")
+        key = self.key(timeout, **params)
+        result = self.get(key)
+        if result is not None and (not record_trajectory or self.trajectory_path(key)):
+            return result
+
+        if not record_trajectory:
+            result = simulation.run_trial(timeout, score_limit, **params)
+            if not result["pruned"]:
+                self.put(key, result)
+            return result
+
+        from trajectory import TrajectoryRecorder
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        with TrajectoryRecorder(temp_path, params.get("time_step", simulation.TICK)) as recorder:
+            result = simulation.run_trial(timeout, recorder=recorder, **params)
+        self.put(key, result, temp_path)
+        return result
@@ -0,0 +1,66 @@
+import math
+
+# Sensor arrays: rays_per_side rays on each side of the heading.
+#
+# The ray offsets are fixed relative to the heading, so their cosines and
+# sines are computed once when the array is built. Each step only needs the
+# cosine and sine of the heading; every ray direction follows by rotating the
+# offset table (cos(h + a) = cos h cos a - sin h sin a), instead of two trig
+# calls per ray. The rays of a side are spread evenly over `spread` degrees
+# around `center` (CENTER_ANGLE by default), so one ray per side gives the
+# classic 45 degree pair.
+#
+# Each side's reading is the weighted mean of its rays' readings, with the
+# weights listed from the ray nearest the heading outwards and mirrored on the
+# right side; these feed the cross-wired turn law in place of the two single
+# readings. The speed still drops with the strongest single reading.
+
+CENTER_ANGLE = 45  # Degrees offset from heading of the middle of each side
+DEFAULT_SPREAD = 90  # Degrees covered by each side's rays
+
+class SensorArray:
+
+    def __init__(self, rays_per_side=1, spread=DEFAULT_SPREAD, weights=None, center=CENTER_ANGLE):
+        if rays_per_side < 1:
+            raise ValueError("a sensor array needs at least one ray per side")
+        weights = [1.0] * rays_per_side if weights is None else [float(w) for w in weights]
+        if len(weights) != rays_per_side or min(weights) < 0 or sum(weights) <= 0:
+            raise ValueError(f"expected {rays_per_side} non-negative ray weights, got {weights}")
+        self.rays_per_side = rays_per_side
+        self.spread = spread
+        self.center = center
+
+        # Left rays nearest the heading first, then their mirror images
+        left = [center + spread * ((i + 0.5) / rays_per_side - 0.5) for i in range(rays_per_side)]
+        self.angles = left + [-angle for angle in left]
+        self.cos = [math.cos(math.radians(angle)) for angle in self.angles]
+        self.sin = [math.sin(math.radians(angle)) for angle in self.angles]
+        total = sum(weights)
+        self.weights = [w / total for w in weights]
+
+    def __len__(self):
+        return len(self.angles)
+
+    def rays(self, x, y, heading_angle, sensor_range, robot_size):
+        # Ray segments (start_x, start_y, end_x, end_y): the left rays, then the right
+        heading_rad = math.radians(heading_angle)
+        cos_h, sin_h = math.cos(heading_rad), math.sin(heading_rad)
+        radius = robot_size / 2
+        rays = []
+        for cos_a, sin_a in zip(self.cos, self.sin):
+            cos = cos_h * cos_a - sin_h * sin_a
+            sin = sin_h * cos_a + cos_h * sin_a
+            sensor_x = x + cos * radius
+            sensor_y = y - sin * radius
+            rays.append((sensor_x, sensor_y, sensor_x + cos * sensor_range, sensor_y - sin * sensor_range))
+        return rays
+
+    def side_readings(self, readings):
+        # (left, right) weighted readings from one reading per ray
+        n = self.rays_per_side
+        left = 0
+        right = 0
+        for weight, left_reading, right_reading in zip(self.weights, readings[:n], readings[n:]):
+            left += weight * left_reading
+            right += weight * right_reading
+        return left, right
@@ -0,0 +1,417 @@
+import json
+import math
+import random
+
+from geometry import point_to_line_distance, line_intersection, swept_circle_segment
+from sensor_array import SensorArray, CENTER_ANGLE, DEFAULT_SPREAD
+from trace_store import TraceStore, DEFAULT_MAX_POINTS
+
+# Headless Braitenberg vehicle simulation.
+# Runs the same sensing, control and collision logic as my_autonomous.py but
+# advances in fixed simulated timesteps with no display, so a trial runs at
+# full CPU speed and gives the same result on every machine.
+
+# Robot setup (same defaults as my_autonomous.py)
+ROBOT_SIZE = 40
+START_HEADING = 270  # Facing upwards
+ACCELERATION = 0.2
+DECELERATION = 0.1
+SLOW_DOWN = 0.8  # Fraction of max speed dropped at full obstacle reading
+WIRING = (1.0, 1.0)  # Weights of the right reading (left wheel) and the left reading (right wheel) in the turn
+
+# Sensor setup: one ray per side at 45 degrees from the heading, see sensor_array.py
+SENSORS = SensorArray()
+
+# Gap left between robot and wall after a continuous collision
+CONTACT_SKIN = 0.01
+
+# Performance metrics
+FINISH_RADIUS = 30
+COLLISION_PENALTY = 2  # Seconds added to the score per collision
+
+# Speeds, turn rates and accelerations are given per tick of the interactive
+# loop. One tick is this many simulated seconds.
+TICK = 1 / 60
+TIMEOUT = 90  # Simulated seconds per trial
+
+# Bump whenever a change alters trial results, so cached results are not reused
+ENGINE_VERSION = 2
+
+# Default maze (same layout as my_autonomous.py)
+START = (100, 100)
+FINISH = (900, 900)
+WALLS = [
+    # Outer boundary
+    (50, 50, 950, 50),
+    (50, 50, 50, 950),
+    (50, 950, 950, 950),
+    (950, 50, 950, 950),
+    # Horizontal walls
+    (400, 200, 800, 200),
+    (200, 800, 600, 800),
+    (200, 400, 600, 400),
+    (400, 600, 800, 600),
+    # Vertical walls
+    (200, 50, 200, 800),
+    (800, 200, 800, 950),
+]
+
+SENSITIVITY_VALUES = [0.2, 0.4, 0.6, 0.8, 1.0]
+
+# Attributes that make up a trial's dynamic state, see Simulation.snapshot().
+# The RNG state and the trace are stored alongside them.
+SNAPSHOT_STATE = ("robot_x", "robot_y", "heading_angle", "speed", "left_reading", "right_reading",
+                  "steps", "collision_count", "completed")
+
+def check_collision(x, y, walls, robot_size=ROBOT_SIZE):
+    # Check collision of the robot circle with any wall
+    robot_radius = robot_size / 2
+    for x1, y1, x2, y2 in walls:
+        distance = point_to_line_distance(x, y, x1, y1, x2, y2)
+        if distance < robot_radius:
+            return True
+    return False
+
+def sensor_rays(x, y, heading_angle, sensor_range, robot_size=ROBOT_SIZE, sensors=SENSORS):
+    # Sensor ray segments (start_x, start_y, end_x, end_y), left rays then right
+    return sensors.rays(x, y, heading_angle, sensor_range, robot_size)
+
+def ray_distance(sensor_x, sensor_y, ray_end_x, ray_end_y, walls, sensor_range):
+    # Distance along the ray to the nearest wall, or sensor_range if none is hit
+    min_distance = sensor_range
+    for wall_x1, wall_y1, wall_x2, wall_y2 in walls:
+        intersection = line_intersection(
+            sensor_x, sensor_y, ray_end_x, ray_end_y,
+            wall_x1, wall_y1, wall_x2, wall_y2
+        )
+        if intersection:
+            ix, iy = intersection
+            distance = math.sqrt((sensor_x - ix)**2 + (sensor_y - iy)**2)
+            if distance < min_distance:
+                min_distance = distance
+    return min_distance
+
+def distance_to_reading(distance, sensor_range, sensitivity):
+    # Convert distances to readings (closer = higher reading)
+    reading = 0
+    if distance < sensor_range:
+        reading = max(0, 1 - (distance / sensor_range))
+    return reading * sensitivity
+
+def get_sensor_readings(x, y, heading_angle, walls, sensor_range, sensitivity, robot_size=ROBOT_SIZE):
+    (left_ray, right_ray) = sensor_rays(x, y, heading_angle, sensor_range, robot_size)
+    left_distance = ray_distance(*left_ray, walls, sensor_range)
+    right_distance = ray_distance(*right_ray, walls, sensor_range)
+    return (distance_to_reading(left_distance, sensor_range, sensitivity),
+            distance_to_reading(right_distance, sensor_range, sensitivity))
+
+def sweep_collision(x, y, dx, dy, walls, robot_size=ROBOT_SIZE):
+    # Earliest impact of the robot circle moving from (x, y) by (dx, dy) with
+    # any wall, as (t, nx, ny) with t in [0, 1], or None
+    robot_radius = robot_size / 2
+    best = None
+    for x1, y1, x2, y2 in walls:
+        hit = swept_circle_segment(x, y, dx, dy, robot_radius, x1, y1, x2, y2)
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = hit
+    return best
+
+def performance_score(elapsed_time, collision_count):
+    return elapsed_time + collision_count * COLLISION_PENALTY  # Penalize collisions more
+
+
+class Simulation:
+    # A single vehicle in a maze, advanced one fixed timestep per step() call
+
+    def __init__(self, walls=WALLS, start=START, finish=FINISH, max_speed=5, turn_rate=2,
+                 sensor_range=150, sensitivity=0.6, acceleration=ACCELERATION,
+                 deceleration=DECELERATION, slow_down=SLOW_DOWN, robot_size=ROBOT_SIZE,
+                 time_step=TICK, seed=None, record_trace=False, vectorized=False,
+                 spatial_index=False, cell_size=None, recorder=None, continuous_collision=False,
+                 neighbor_list=False, neighbor_margin=None, distance_field=False, field_resolution=None, field_cache=True,
+                 rays_per_side=1, sensor_spread=DEFAULT_SPREAD, ray_weights=None, sensor_angle=CENTER_ANGLE,
+                 wiring=WIRING, trace_max_points=DEFAULT_MAX_POINTS, trace_spill=None):
+        self.walls = list(walls)
+        self.start = start
+        self.finish = finish
+        self.max_speed = max_speed
+        self.turn_rate = turn_rate
+        self.sensor_range = sensor_range
+        self.sensitivity = sensitivity
+        self.acceleration = acceleration
+        self.deceleration = deceleration
+        self.slow_down = slow_down
+        self.wiring = tuple(wiring)
+        self.robot_size = robot_size
+        self.time_step = time_step
+        self.seed = seed
+        self.record_trace = record_trace
+        # The trace is a simplified, size-capped TraceStore; trace_spill keeps
+        # every point of the latest run in a file
+        self.trace_max_points = trace_max_points
+        self.trace_spill = trace_spill
+        self.trace_points = None
+        self.recorder = recorder  # Optional trajectory.TrajectoryRecorder
+        # Sweep the robot along each step instead of testing only the end
+        # position, so large timesteps cannot tunnel through walls
+        self.continuous_collision = continuous_collision
+        self.sensors = SensorArray(rays_per_side, sensor_spread, ray_weights, sensor_angle)
+
+        # Vectorized sensing keeps the walls as a packed (N, 4) array. Sensor
+        # arrays with several rays per side always cast this way, all rays in
+        # one call, rather than a Python loop that costs per ray; this includes
+        # the distance field, whose sphere trace is one ray at a time.
+        self.wall_array = None
+        if vectorized or rays_per_side > 1:
+            import raycast
+            self.wall_array = raycast.wall_array(self.walls)
+
+        # The spatial index limits collision and sensing to nearby walls
+        self.grid = None
+        if spatial_index:
+            from spatial_index import SpatialGrid, DEFAULT_CELL_SIZE
+            self.grid = SpatialGrid(self.walls, cell_size or DEFAULT_CELL_SIZE)
+
+        # The neighbor list caches the walls around the robot between steps;
+        # it covers the sensor rays, which reach furthest from the robot
+        self.neighbors = None
+        if neighbor_list:
+            from neighbor_list import NeighborList, DEFAULT_MARGIN
+            margin = DEFAULT_MARGIN if neighbor_margin is None else neighbor_margin
+            self.neighbors = NeighborList(self.walls, sensor_range + robot_size / 2, margin,
+                                          self.grid, self.wall_array)
+
+        # The distance field skips open space with lookups in a precomputed
+        # grid and falls back to the exact tests near walls, so results match.
+        # Continuous collision still sweeps against the exact walls. Built
+        # fields are cached on disk: field_cache is a directory, True for the
+        # default one or None to always build the field in memory.
+        self.field = None
+        if distance_field:
+            import distance_field as df
+            directory = df.DEFAULT_DIRECTORY if field_cache is True else field_cache
+            self.field = df.build_field(self.walls, field_resolution or df.DEFAULT_RESOLUTION, directory=directory)
+        self.reset()
+
+    def reset(self):
+        self.rng = random.Random(self.seed)
+        self.robot_x, self.robot_y = self.start
+        self.heading_angle = START_HEADING
+        self.speed = 0
+        self.left_reading = 0
+        self.right_reading = 0
+        self.rays = []  # Sensor rays and their readings from the last sense()
+        self.ray_readings = []
+        self.steps = 0
+        self.collision_count = 0
+        self.completed = False
+        if self.trace_points is not None:
+            self.trace_points.close()
+        self.trace_points = TraceStore(self.trace_max_points, spill_path=self.trace_spill) if self.record_trace else None
+
+    @property
+    def elapsed_time(self):
+        return self.steps * self.time_step
+
+    def snapshot(self):
+        # The full dynamic state as a dict of plain values, RNG included. It can
+        # be pickled or written with save_snapshot(), and restore() continues the
+        # trial exactly, in this or another Simulation.
+        state = {name: getattr(self, name) for name in SNAPSHOT_STATE}
+        state["rng_state"] = self.rng.getstate()
+        if self.record_trace:
+            state["trace"] = self.trace_points.state()
+        state["engine_version"] = ENGINE_VERSION
+        return state
+
+    def restore(self, state):
+        # Continue from a snapshot(). With different parameters than the
+        # snapshot was taken with, the trial branches into a variant.
+        if state.get("engine_version") != ENGINE_VERSION:
+            raise ValueError(f"snapshot is from engine version {state.get('engine_version')}, "
+                             f"this is version {ENGINE_VERSION}")
+        for name in SNAPSHOT_STATE:
+            setattr(self, name, state[name])
+        version, internal_state, gauss_next = state["rng_state"]
+        self.rng.setstate((version, tuple(internal_state), gauss_next))
+        if self.record_trace and "trace" in state:
+            self.trace_points.restore(state["trace"])
+        self.rays = []
+        self.ray_readings = []
+
+    def ray_distances(self, rays):
+        # Distance to the nearest wall along each sensor ray. The vectorized
+        # modes cast all rays in one call.
+        if self.field is not None and self.wall_array is None:
+            return [self.field.ray_distance(*ray, self.sensor_range) for ray in rays]
+        if self.neighbors is not None:
+            if self.wall_array is not None:
+                import raycast
+                wall_array = self.neighbors.array_near(self.robot_x, self.robot_y)
+                return raycast.cast_rays(rays, wall_array, self.sensor_range).tolist()
+            walls = self.neighbors.walls_near(self.robot_x, self.robot_y)
+            return [ray_distance(*ray, walls, self.sensor_range) for ray in rays]
+        if self.wall_array is not None:
+            # Every ray lies within reach of the robot, so one query for the
+            # walls around it covers all of them, whatever their number
+            import raycast
+            reach = self.sensor_range + self.robot_size / 2
+            if self.grid is None:
+                wall_array = raycast.walls_near(self.wall_array, self.robot_x, self.robot_y, reach)
+            else:
+                wall_array = self.wall_array[self.grid.indices_near_point(self.robot_x, self.robot_y, reach)]
+            return raycast.cast_rays(rays, wall_array, self.sensor_range).tolist()
+        if self.grid is None:
+            return [ray_distance(*ray, self.walls, self.sensor_range) for ray in rays]
+        return [ray_distance(*ray, self.grid.walls_along_segment(*ray), self.sensor_range)
+                for ray in rays]
+
+    def sense(self):
+        self.rays = self.sensors.rays(self.robot_x, self.robot_y, self.heading_angle,
+                                      self.sensor_range, self.robot_size)
+        self.ray_readings = [distance_to_reading(distance, self.sensor_range, self.sensitivity)
+                             for distance in self.ray_distances(self.rays)]
+        self.left_reading, self.right_reading = self.sensors.side_readings(self.ray_readings)
+        return self.left_reading, self.right_reading
+
+    def sweep_collision(self, x, y, dx, dy):
+        walls = self.walls
+        # Walls near the swept path: a circle around the step midpoint
+        reach = math.sqrt(dx * dx + dy * dy) / 2 + self.robot_size / 2
+        if self.neighbors is not None:
+            walls = self.neighbors.walls_near(x + dx / 2, y + dy / 2, reach)
+        elif self.grid is not None:
+            walls = self.grid.walls_near_point(x + dx / 2, y + dy / 2, reach)
+        return sweep_collision(x, y, dx, dy, walls, self.robot_size)
+
+    def check_collision(self, x, y):
+        if self.field is not None:
+            return self.field.check_collision(x, y, self.robot_size)
+        walls = self.walls
+        if self.neighbors is not None:
+            walls = self.neighbors.walls_near(x, y, self.robot_size / 2)
+        elif self.grid is not None:
+            walls = self.grid.walls_near_point(x, y, self.robot_size / 2)
+        return check_collision(x, y, walls, self.robot_size)
+
+    def step(self):
+        # Advance one timestep; returns True once the finish is reached
+        ticks = self.time_step / TICK
+        left_reading, right_reading = self.sense()
+
+        # Braitenberg vehicle behavior (cross-wired)
+        right_weight, left_weight = self.wiring
+        turn_amount = (right_weight * right_reading - left_weight * left_reading) * self.turn_rate
+        self.heading_angle += turn_amount * ticks
+
+        obstacle_factor = max(self.ray_readings)
+        target_speed = self.max_speed * (1 - obstacle_factor * self.slow_down)
+
+        if self.speed < target_speed:
+            self.speed = min(target_speed, self.speed + self.acceleration * ticks)
+        elif self.speed > target_speed:
+            self.speed = max(target_speed, self.speed - self.deceleration * ticks)
+
+        # Move robot
+        old_x, old_y = self.robot_x, self.robot_y
+        if self.continuous_collision:
+            dx = self.speed * ticks * math.cos(math.radians(self.heading_angle))
+            dy = -self.speed * ticks * math.sin(math.radians(self.heading_angle))
+            hit = self.sweep_collision(old_x, old_y, dx, dy)
+            collided = hit is not None
+            if collided:
+                # Stop at the point of impact, just clear of the wall
+                t, nx, ny = hit
+                self.robot_x = old_x + dx * t + nx * CONTACT_SKIN
+                self.robot_y = old_y + dy * t + ny * CONTACT_SKIN
+            else:
+                self.robot_x += dx
+                self.robot_y += dy
+        else:
+            self.robot_x += self.speed * ticks * math.cos(math.radians(self.heading_angle))
+            self.robot_y -= self.speed * ticks * math.sin(math.radians(self.heading_angle))
+            collided = self.check_collision(self.robot_x, self.robot_y)
+            if collided:
+                self.robot_x, self.robot_y = old_x, old_y
+
+        # Collision response - back up and turn randomly
+        if collided:
+            self.heading_angle += self.rng.uniform(-45, 45)
+            self.speed = -self.speed * 0.5
+            self.collision_count += 1
+
+        self.steps += 1
+        if self.record_trace:
+            self.trace_points.append((int(self.robot_x), int(self.robot_y)))
+        if self.recorder is not None:
+            self.recorder.record(self.steps, self.robot_x, self.robot_y, self.heading_angle, self.speed,
+                                 left_reading, right_reading, collided)
+
+        distance_to_finish = math.sqrt((self.robot_x - self.finish[0])**2 + (self.robot_y - self.finish[1])**2)
+        if distance_to_finish < FINISH_RADIUS:
+            self.completed = True
+        return self.completed
+
+    def run(self, timeout=TIMEOUT, score_limit=None):
+        # Step until the finish is reached or the simulated timeout expires.
+        # The score only grows while a trial runs, so with score_limit (e.g. the
+        # best score so far) a trial whose partial score reaches it can no longer
+        # win and is stopped early; its score is then a lower bound.
+        max_steps = int(round(timeout / self.time_step))
+        pruned = False
+        while self.steps < max_steps and not self.completed and not self.step():
+            if score_limit is not None and performance_score(self.elapsed_time, self.collision_count) >= score_limit:
+                pruned = True
+                break
+        elapsed_time = self.elapsed_time if self.completed or pruned else float(timeout)
+        return {
+            "sensitivity": self.sensitivity,
+            "time": elapsed_time,
+            "collisions": self.collision_count,
+            "score": performance_score(elapsed_time, self.collision_count),
+            "completed": self.completed,
+            "steps": self.steps,
+            "pruned": pruned,
+        }
+
+
+def run_trial(timeout=TIMEOUT, score_limit=None, **params):
+    return Simulation(**params).run(timeout, score_limit)
+
+def branch(state, **params):
+    # A Simulation with params that continues from a snapshot
+    sim = Simulation(**params)
+    sim.restore(state)
+    return sim
+
+def save_snapshot(state, path):
+    with open(path, "w") as f:
+        json.dump(state, f)
+
+def load_snapshot(path):
+    with open(path) as f:
+        return json.load(f)
+
+def run_sensitivity_analysis(sensitivity_values=SENSITIVITY_VALUES, timeout=TIMEOUT, cache=None, **params):
+    # Same trials as my_autonomous.run_sensitivity_analysis(), headless.
+    # With a result_cache.ResultCache, unchanged trials are not re-simulated.
+    # Returns (sensitivity, time, collisions, score) tuples.
+    trial = cache.run_trial if cache is not None else run_trial
+    results = []
+    for sens in sensitivity_values:
+        result = trial(timeout, sensitivity=sens, **params)
+        results.append((sens, result["time"], result["collisions"], result["score"]))
+    return results
+
+def print_results(results):
+    best_sensitivity = min(results, key=lambda x: x[3])
+    print("\nSensitivity Analysis Results:")
+    print("Sensitivity | Time (s) | Collisions | Performance Score")
+    print("-" * 50)
+    for sens, time, collisions, score in results:
+        print(f"{sens:.1f}        | {time:.2f}    | {collisions}         | {score:.2f}")
+    print(f"\nBest sensitivity: {best_sensitivity[0]} (Score: {best_sensitivity[3]:.2f})")
+
+
+if __name__ == "__main__":
+    print_results(run_sensitivity_analysis(seed=0))
@@ -0,0 +1,64 @@
+import math
+
+from geometry import point_to_line_distance
+
+# Uniform grid spatial index over the maze walls.
+# Built once from the wall list; each cell holds the indices of the walls that
+# pass through it. Collision checks only look at the cells around the robot and
+# sensor rays only test the walls in the cells they pass through, so the cost
+# per query depends on the local wall density rather than the maze size.
+#
+# A wall is stored in every cell whose circumscribed circle it touches, which
+# over-covers slightly but never misses a cell the wall passes through. Queries
+# use the same test, so they return every wall the exact check could find.
+
+DEFAULT_CELL_SIZE = 100
+
+class SpatialGrid:
+
+    def __init__(self, walls, cell_size=DEFAULT_CELL_SIZE):
+        self.walls = list(walls)
+        self.cell_size = cell_size
+        self.half_diagonal = cell_size * math.sqrt(2) / 2
+        self.cells = {}
+        for index, (x1, y1, x2, y2) in enumerate(self.walls):
+            for cell in self.cells_along_segment(x1, y1, x2, y2):
+                self.cells.setdefault(cell, []).append(index)
+
+    def cell_range(self, min_x, min_y, max_x, max_y):
+        # All cells overlapping the axis-aligned box
+        size = self.cell_size
+        return [(cx, cy)
+                for cx in range(math.floor(min_x / size), math.floor(max_x / size) + 1)
+                for cy in range(math.floor(min_y / size), math.floor(max_y / size) + 1)]
+
+    def cells_along_segment(self, x1, y1, x2, y2):
+        # Cells the segment (x1, y1)-(x2, y2) passes through
+        cells = []
+        for cx, cy in self.cell_range(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)):
+            center_x = (cx + 0.5) * self.cell_size
+            center_y = (cy + 0.5) * self.cell_size
+            if point_to_line_distance(center_x, center_y, x1, y1, x2, y2) <= self.half_diagonal:
+                cells.append((cx, cy))
+        return cells
+
+    def _indices(self, cells):
+        # Wall indices stored in the given cells, in wall list order
+        found = set()
+        for cell in cells:
+            found.update(self.cells.get(cell, ()))
+        return sorted(found)
+
+    def indices_near_point(self, x, y, radius):
+        return self._indices(self.cell_range(x - radius, y - radius, x + radius, y + radius))
+
+    def indices_along_segment(self, x1, y1, x2, y2):
+        return self._indices(self.cells_along_segment(x1, y1, x2, y2))
+
+    def walls_near_point(self, x, y, radius):
+        # Every wall that could be within radius of (x, y)
+        return [self.walls[i] for i in self.indices_near_point(x, y, radius)]
+
+    def walls_along_segment(self, x1, y1, x2, y2):
+        # Every wall that could intersect the segment, e.g. a sensor ray
+        return [self.walls[i] for i in self.indices_along_segment(x1, y1, x2, y2)]
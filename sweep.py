@@ -0,0 +1,166 @@
+import argparse
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import simulation
+from maze import load_maze
+from result_cache import DEFAULT_DIRECTORY, ResultCache
+
+# Parallel parameter sweeps with the headless engine.
+# Each trial is one parameter configuration plus an explicit RNG seed, so the
+# random collision kicks, and therefore the results, are reproducible no matter
+# which worker process runs the trial or in which order.
+#
+# With branch_at, the trials of each seed share a prefix: the fixed parameters
+# are simulated for branch_at seconds once, and every configuration continues
+# from a snapshot of that state instead of re-simulating the prefix. Each
+# configuration's parameters only apply from the branch point on.
+
+SWEEP_PARAMETERS = ("sensitivity", "turn_rate", "sensor_range", "max_speed", "acceleration", "slow_down")
+RESULT_COLUMNS = ("seed", "time", "collisions", "score", "completed")
+
+def parameter_grid(grid):
+    # Expand {"sensitivity": [0.2, 0.4], "turn_rate": [1, 2]} into a list of
+    # configurations, one per combination
+    for name in grid:
+        if name not in SWEEP_PARAMETERS:
+            raise ValueError(f"Unknown sweep parameter: {name}")
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def make_trials(configs, seeds=(0,)):
+    # One trial per configuration and seed
+    return [dict(config, seed=seed) for config in configs for seed in seeds]
+
+def run_trial(trial, timeout=simulation.TIMEOUT, fixed_params=None, cache=None, snapshot=None):
+    # Run one trial and return its row: the trial parameters plus the results.
+    # With a result_cache.ResultCache, a trial that ran before is not re-simulated.
+    # With a snapshot, the trial continues from it (see run_prefix()).
+    params = dict(fixed_params or {})
+    params.update(trial)
+    if snapshot is not None:
+        result = simulation.branch(snapshot, **params).run(timeout)
+    elif cache is not None:
+        result = cache.run_trial(timeout, **params)
+    else:
+        result = simulation.run_trial(timeout, **params)
+    row = dict(trial)
+    for column in RESULT_COLUMNS[1:]:
+        row[column] = result[column]
+    return row
+
+def _run_trial(args):
+    return run_trial(*args)
+
+def run_prefix(seed, branch_at, fixed_params=None):
+    # Snapshot of a trial with the fixed parameters after branch_at seconds
+    sim = simulation.Simulation(seed=seed, **(fixed_params or {}))
+    sim.run(branch_at)
+    return sim.snapshot()
+
+def _run_prefix(args):
+    return run_prefix(*args)
+
+def run_sweep(configs, seeds=(0,), timeout=simulation.TIMEOUT, workers=None, cache=None, branch_at=None,
+              **fixed_params):
+    # Run every configuration with every seed across a process pool.
+    # configs is a list of parameter dicts or a grid dict (see parameter_grid()).
+    # Rows come back in trial order regardless of which worker finished first.
+    if isinstance(configs, dict):
+        configs = parameter_grid(configs)
+    if branch_at is not None and cache is not None:
+        raise ValueError("branched trials depend on their prefix and cannot use the result cache")
+    trials = make_trials(configs, seeds)
+
+    workers = workers or os.cpu_count() or 1
+    pool = None
+    if workers > 1 and len(trials) > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    mapper = pool.map if pool is not None else map
+    try:
+        snapshots = {}
+        if branch_at is not None:
+            prefixes = [(seed, branch_at, fixed_params) for seed in seeds]
+            snapshots = dict(zip(seeds, mapper(_run_prefix, prefixes)))
+        tasks = [(trial, timeout, fixed_params, cache, snapshots.get(trial["seed"])) for trial in trials]
+        if pool is None:
+            return list(map(_run_trial, tasks))
+        chunksize = max(1, len(tasks) // (workers * 4))
+        return list(pool.map(_run_trial, tasks, chunksize=chunksize))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def table_columns(rows):
+    # Parameter columns in SWEEP_PARAMETERS order, then the result columns
+    present = set().union(*rows) if rows else set()
+    return [name for name in SWEEP_PARAMETERS if name in present] + list(RESULT_COLUMNS)
+
+def print_table(rows):
+    columns = table_columns(rows)
+    print(" | ".join(f"{column:>12}" for column in columns))
+    print("-" * (15 * len(columns)))
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row.get(column, "")
+            cells.append(f"{value:>12.2f}" if isinstance(value, float) else f"{value!s:>12}")
+        print(" | ".join(cells))
+    if rows:
+        best = min(rows, key=lambda row: row["score"])
+        params = ", ".join(f"{name}={best[name]}" for name in columns if name in SWEEP_PARAMETERS)
+        print(f"\nBest: {params}, seed={best['seed']} (Score: {best['score']:.2f})")
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=table_columns(rows))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a parallel headless parameter sweep.")
+    parser.add_argument("--sensitivity", type=float, nargs="+", default=simulation.SENSITIVITY_VALUES)
+    parser.add_argument("--turn-rate", type=float, nargs="+")
+    parser.add_argument("--sensor-range", type=float, nargs="+")
+    parser.add_argument("--max-speed", type=float, nargs="+")
+    parser.add_argument("--acceleration", type=float, nargs="+")
+    parser.add_argument("--slow-down", type=float, nargs="+")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--timeout", type=float, default=simulation.TIMEOUT, help="simulated seconds per trial")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--csv", help="also write the results table to this CSV file")
+    parser.add_argument("--maze", help="maze file to run in (default: the built-in maze)")
+    parser.add_argument("--time-step", type=float, default=simulation.TICK, help="simulated seconds per step")
+    parser.add_argument("--continuous-collision", action="store_true",
+                        help="sweep the robot along each step (needed for large time steps)")
+    parser.add_argument("--distance-field", type=float, nargs="?", const=0, metavar="RESOLUTION",
+                        help="sense and collide through a precomputed distance field with this grid spacing")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_DIRECTORY,
+                        help=f"reuse cached trial results from this directory (default {DEFAULT_DIRECTORY})")
+    parser.add_argument("--branch-at", type=float, metavar="SECONDS",
+                        help="simulate the first SECONDS once per seed with the default parameters "
+                             "and branch every configuration from there")
+    args = parser.parse_args()
+    if args.branch_at is not None and args.cache:
+        parser.error("--branch-at cannot be combined with --cache")
+
+    grid = {name: getattr(args, name) for name in SWEEP_PARAMETERS if getattr(args, name)}
+    fixed_params = load_maze(args.maze).simulation_params() if args.maze else {}
+    fixed_params.update(time_step=args.time_step, continuous_collision=args.continuous_collision)
+    if args.distance_field is not None:
+        # 0 (the flag on its own) keeps the default grid spacing
+        fixed_params.update(distance_field=True, field_resolution=args.distance_field or None)
+    cache = ResultCache(args.cache) if args.cache else None
+    rows = run_sweep(grid, seeds=args.seeds, timeout=args.timeout, workers=args.workers, cache=cache,
+                     branch_at=args.branch_at, **fixed_params)
+    print_table(rows)
+    if args.csv:
+        write_csv(rows, args.csv)
+        print(f"Results saved to '{args.csv}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import logging
+import threading
+
+from async_logging import DroppingQueue, start_logging, stop_logging
+
+
+class StalledStream:
+    # File stand-in whose writes wait until released
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.writing.set()
+        self.release.wait(5)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+
+def test_queue_drops_the_oldest_records_when_full():
+    records = DroppingQueue(3)
+    for i in range(5):
+        records.put_nowait(i)
+    assert records.dropped == 2
+    assert [records.get_nowait() for _ in range(3)] == [2, 3, 4]
+
+
+def test_everything_logged_is_written_on_stop(tmp_path):
+    path = tmp_path / "run.log"
+    logger, listener = start_logging("test_flush", path=str(path), fmt="%(message)s")
+    for i in range(1000):
+        logger.info("step %d", i)
+    stop_logging(listener)
+    assert path.read_text().splitlines() == [f"step {i}" for i in range(1000)]
+    assert listener.handlers[0].stream.closed
+
+
+def test_a_stalled_writer_drops_old_records(tmp_path):
+    path = tmp_path / "stalled.log"
+    logger, listener = start_logging("test_stalled", path=str(path), fmt="%(message)s", max_queued=5)
+    handler = listener.handlers[0]
+    handler.stream = stream = StalledStream(handler.stream)
+    logger.info("first")
+    assert stream.writing.wait(5)  # The writer is stuck on the first record
+    for i in range(20):
+        logger.info("step %d", i)
+    stream.release.set()
+    stop_logging(listener)
+    lines = path.read_text().splitlines()
+    assert lines == ["first"] + [f"step {i}" for i in range(15, 20)] + [
+        "15 log records dropped while the writer fell behind"]
+    assert logging.getLogger("test_stalled").handlers[0].queue.dropped == 15
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from atomic_file import write_atomic
+
+
+def test_write_replaces_the_file(tmp_path):
+    path = tmp_path / "state.json"
+    write_atomic(path, lambda f: f.write("old"))
+    write_atomic(path, lambda f: f.write(b"new"), "wb")
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = tmp_path / "state.json"
+    write_atomic(path, lambda f: f.write("old"))
+
+    def fail(f):
+        f.write("half")
+        raise RuntimeError("interrupted")
+
+    with pytest.raises(RuntimeError):
+        write_atomic(path, fail)
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["state.json"]
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from command_client import drive
+from command_server import IDLE, CommandServer
+
+
+class CountingServer(CommandServer):
+    # Counts how often the current command is replaced
+
+    updates = 0
+
+    @property
+    def latest_command(self):
+        return self._latest_command
+
+    @latest_command.setter
+    def latest_command(self, command):
+        self._latest_command = command
+        self.updates += 1
+
+
+@pytest.fixture
+def server():
+    server = CountingServer(port=0)
+    server.start()
+    yield server
+    server.stop()
+
+
+async def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        await asyncio.sleep(0.01)
+
+
+def test_a_burst_of_commands_collapses_into_the_latest(server):
+    async def burst():
+        host, port = server.address.rsplit(":", 1)
+        reader, writer = await asyncio.open_connection(host, int(port))
+        updates = server.updates
+        lines = [json.dumps({"turn": i / 100, "throttle": 1}) for i in range(100)]
+        lines[50] = "not json"
+        writer.write(("\n".join(lines) + "\n").encode() + b'{"turn": 3, "throttle": -0.5}\n')
+        await writer.drain()
+        await wait_until(lambda: server.commands_received == 100)
+        assert server.command() == (1.0, -0.5)
+        # One update per chunk read, not one per command
+        assert server.updates - updates < 10
+        writer.close()
+        await writer.wait_closed()
+        await wait_until(lambda: server.command() == IDLE)
+
+    asyncio.run(burst())
+
+
+def test_scripted_client_drives_and_disconnect_resets_to_idle(server):
+    async def session():
+        host, port = server.address.rsplit(":", 1)
+        server.publish({"time": 1.0, "x": 10, "y": 20, "heading": 90, "speed": 0, "left": 0, "right": 0})
+        states = []
+        script = [{"turn": 0.5, "throttle": 1, "duration": 0.5}]
+        client = asyncio.create_task(drive(script, host, int(port), rate=50, on_state=states.append))
+        await wait_until(lambda: server.command() == (0.5, 1.0))
+        await client
+        await wait_until(lambda: server.command() == IDLE)
+        assert server.commander is None
+        assert [state["seq"] for state in states] == [1]
+        assert states[0]["x"] == 10
+
+    asyncio.run(session())
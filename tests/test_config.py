@@ -0,0 +1,86 @@
+import argparse
+import json
+
+import pytest
+
+import config
+import my_autonomous
+
+
+def make_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-speed", type=float, default=5)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--wiring", type=float, nargs=2, default=[1.0, 1.0])
+    parser.add_argument("--mode", choices=["fast", "exact"], default="exact")
+    parser.add_argument("--maze")
+    parser.add_argument("--headless", action="store_true")
+    return parser
+
+
+def write_config(tmp_path, values):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps(values))
+    return str(path)
+
+
+def test_config_values_replace_defaults_and_flags_override_them(tmp_path):
+    path = write_config(tmp_path, {"max_speed": 7.5, "seeds": [1, 2], "wiring": [0.5, 2],
+                                   "headless": True, "maze": "mazes/default.json"})
+    args = config.parse_args(make_parser(), ["--config", path, "--seeds", "3", "--mode", "fast"])
+    assert args.max_speed == 7.5  # Underscored keys are the same option
+    assert args.seeds == [3]
+    assert args.wiring == [0.5, 2.0]
+    assert args.mode == "fast"
+    assert args.headless is True
+    assert args.maze == "mazes/default.json"
+
+
+def test_config_values_are_converted_like_flags(tmp_path):
+    path = write_config(tmp_path, {"max-speed": "6", "seeds": 4, "maze": None})
+    args = config.parse_args(make_parser(), ["--config", path])
+    assert (args.max_speed, args.seeds, args.maze) == (6.0, [4], None)
+
+
+def test_no_config_file_leaves_the_defaults():
+    args = config.parse_args(make_parser(), [])
+    assert (args.max_speed, args.seeds, args.config) == (5, [0], None)
+
+
+@pytest.mark.parametrize("values", [
+    {"max-speed": "fast"},
+    {"max-speed": [1, 2]},
+    {"seeds": [1, "two"]},
+    {"wiring": [1]},
+    {"mode": "slow"},
+    {"headless": "yes"},
+    {"max-sped": 5},
+    ["max-speed", 5],
+])
+def test_bad_config_values_are_rejected(tmp_path, capsys, values):
+    path = write_config(tmp_path, values)
+    with pytest.raises(SystemExit):
+        config.parse_args(make_parser(), ["--config", path])
+    assert path in capsys.readouterr().err
+
+
+def test_unreadable_config_files_are_rejected(tmp_path, capsys):
+    for path in (tmp_path / "missing.json", tmp_path / "broken.json"):
+        if path.name == "broken.json":
+            path.write_text("{not json")
+        with pytest.raises(SystemExit):
+            config.parse_args(make_parser(), ["--config", str(path)])
+        assert "cannot read config file" in capsys.readouterr().err
+
+
+def test_bad_flags_still_fail_with_a_config_file(tmp_path):
+    path = write_config(tmp_path, {"max-speed": 8})
+    with pytest.raises(SystemExit):
+        config.parse_args(make_parser(), ["--config", path, "--max-speed", "fast"])
+
+
+def test_autonomous_script_rejects_a_bad_config_before_running(tmp_path, capsys):
+    path = write_config(tmp_path, {"sensitivity": "high", "headless": True})
+    with pytest.raises(SystemExit):
+        my_autonomous.main(["--config", path])
+    assert "sensitivity" in capsys.readouterr().err
@@ -0,0 +1,34 @@
+import random
+
+import evolve
+from evolve import GENES, Evolution, clip, default_genome, training_mazes
+
+
+def test_mutation_and_crossover_stay_in_bounds():
+    evolution = Evolution(training_mazes(generated=0), seeds=1, population=4, timeout=1, workers=1)
+    rng = random.Random(0)
+    for _ in range(200):
+        a = evolve.random_genome(rng)
+        b = evolve.random_genome(rng)
+        child = evolution.mutate(evolution.crossover(a, b))
+        for value, (_, low, high, _) in zip(child, GENES):
+            assert low <= value <= high
+    assert clip([1e9] * len(GENES)) == tuple(high for _, _, high, _ in GENES)
+
+
+def test_completion_rate_ranks_before_score():
+    evolution = Evolution(training_mazes(generated=0), seeds=1, population=4, timeout=1, workers=1)
+    finisher = default_genome()
+    loiterer = evolve.random_genome(random.Random(1))
+    evolution.fitness = {finisher: (0.5, 400.0), loiterer: (0.0, 90.0)}
+    assert evolution.champion == finisher
+
+
+def test_runs_are_reproducible():
+    def run():
+        evolution = Evolution(training_mazes(generated=1), seeds=1, population=6, timeout=10, seed=3, workers=1)
+        for _ in range(2):
+            evolution.step()
+        return evolution.history, evolution.champion
+
+    assert run() == run()
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+import simulation
+from maze import Maze, default_maze, generate_maze, load_maze, save_maze
+
+DEFAULT_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mazes", "default.json")
+
+# The walls, start and finish my_autonomous.py had hard-coded before maze files
+ORIGINAL_WALLS = [
+    (50, 50, 950, 50), (50, 50, 50, 950), (50, 950, 950, 950), (950, 50, 950, 950),
+    (400, 200, 800, 200), (200, 800, 600, 800), (200, 400, 600, 400), (400, 600, 800, 600),
+    (200, 50, 200, 800), (800, 200, 800, 950),
+]
+
+
+@pytest.mark.parametrize("suffix", [".json", ".maze"])
+def test_save_and_load_round_trip(tmp_path, suffix):
+    maze = generate_maze(6, 7, cell_size=55.5, seed=3, loop_fraction=0.3)
+    path = tmp_path / ("maze" + suffix)
+    save_maze(maze, path)
+    loaded = load_maze(path)
+    assert loaded.wall_list() == maze.wall_list()
+    assert (loaded.start, loaded.finish, loaded.bounds) == (maze.start, maze.finish, maze.bounds)
+
+
+def test_json_files_keep_whole_numbers_readable(tmp_path):
+    path = tmp_path / "small.json"
+    save_maze(Maze([(0, 0, 10, 0.5)], start=(1, 2), finish=(3, 4)), path)
+    text = path.read_text()
+    assert "[0, 0, 10, 0.5]" in text
+    assert '"start": [1, 2]' in text
+
+
+def test_binary_files_are_checked(tmp_path):
+    path = tmp_path / "bad.maze"
+    path.write_bytes(b"NOPE" + bytes(100))
+    with pytest.raises(ValueError):
+        load_maze(path)
+
+
+def test_default_maze_file_matches_the_original_walls():
+    maze = load_maze(DEFAULT_JSON)
+    assert maze.wall_list() == ORIGINAL_WALLS
+    assert (maze.start, maze.finish) == ((100, 100), (900, 900))
+    assert maze.wall_list() == simulation.WALLS == default_maze().wall_list()
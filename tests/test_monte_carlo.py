@@ -0,0 +1,89 @@
+import math
+import statistics
+
+import pytest
+
+from monte_carlo import MonteCarloEvaluation, interval, t_quantile
+
+
+@pytest.mark.parametrize("p, df, expected", [
+    (0.975, 1, 12.706), (0.975, 2, 4.303), (0.975, 3, 3.182), (0.975, 5, 2.571), (0.975, 9, 2.262),
+    (0.975, 10, 2.228), (0.975, 30, 2.042), (0.995, 1, 63.657), (0.995, 4, 4.604), (0.995, 20, 2.845),
+])
+def test_t_quantile_matches_tables(p, df, expected):
+    assert t_quantile(p, df) == pytest.approx(expected, abs=1e-3)
+    assert t_quantile(1 - p, df) == pytest.approx(-expected, abs=1e-3)
+
+
+def test_interval_half_width():
+    assert interval([1.0, 2.0, 3.0]) == pytest.approx((2.0, 4.303 / math.sqrt(3)), abs=1e-3)
+    assert interval([1.0, 3.0], confidence=0.99) == pytest.approx((2.0, 63.657), abs=1e-3)
+    assert interval([5.0]) == (5.0, math.inf)
+
+
+def evaluation(*scores, **options):
+    # An evaluation whose configurations already have the given per-seed scores
+    evaluation = MonteCarloEvaluation([{"sensitivity": 0.1 * (i + 1)} for i in range(len(scores))], **options)
+    evaluation.rows = [[{"score": score} for score in values] for values in scores]
+    return evaluation
+
+
+def test_paired_difference_cancels_shared_noise():
+    noise = [0.0, 40.0, -25.0, 10.0, 60.0, -30.0, 5.0, -15.0]
+    better = [100 + n for n in noise]
+    worse = [103 + n + 0.5 * (-1) ** k for k, n in enumerate(noise)]
+    ev = evaluation(better, worse)
+    difference, half_width = ev.paired(1, 0)
+    assert difference == pytest.approx(3.0)
+    assert (difference, half_width) == pytest.approx(interval([w - b for w, b in zip(worse, better)]))
+    # The unpaired intervals overlap; the paired one separates the two
+    assert ev.summary(1, "score")[1] > 3.0
+    assert ev.significantly_worse(1, 0)
+    assert not ev.significantly_worse(0, 1)
+
+
+def test_paired_difference_uses_common_seeds():
+    ev = evaluation([1.0, 2.0, 3.0, 4.0], [2.0, 4.0])
+    assert ev.paired(1, 0) == pytest.approx(interval([1.0, 2.0]))
+
+
+def test_stopping_rules():
+    noise = [0.0, 40.0, -25.0, 10.0, 60.0, -30.0, 5.0, -15.0]
+    best = [100 + n for n in noise]
+    worse = [110 + n + (-1) ** k for k, n in enumerate(noise)]
+    close = [100.5 + n + 3 * (-1) ** k for k, n in enumerate(noise)]
+
+    # Not enough seeds yet: nothing stops
+    ev = evaluation(best[:4], worse[:4], min_seeds=8)
+    ev.update_stopped()
+    assert ev.stopped == {}
+
+    # Everything else ruled out: the best stops as separated
+    ev = evaluation(best, worse, min_seeds=8)
+    ev.update_stopped()
+    assert ev.stopped == {1: "worse than best", 0: "separated"}
+
+    # A tie keeps sampling until max_seeds, unless precise enough
+    ev = evaluation(best, close, min_seeds=8, max_seeds=8, precision=0.01)
+    ev.update_stopped()
+    assert ev.stopped == {0: "max seeds", 1: "max seeds"}
+    ev = evaluation(best, close, min_seeds=8, max_seeds=100, precision=0.5)
+    ev.update_stopped()
+    assert ev.stopped == {0: "precise", 1: "precise"}
+
+    # A best that was ruled out while another led resumes sampling
+    ev = evaluation(best, worse, min_seeds=8)
+    ev.stopped = {0: "worse than best"}
+    ev.update_stopped()
+    assert ev.stopped.get(0) != "worse than best"
+
+
+def test_run_stops_every_configuration_with_paired_seeds():
+    ev = MonteCarloEvaluation({"sensitivity": [0.2, 1.0]}, timeout=5, min_seeds=2, max_seeds=4, batch=2,
+                              workers=1).run()
+    assert set(ev.stopped) == {0, 1}
+    for rows in ev.rows:
+        assert 2 <= len(rows) <= 4
+        assert [row["seed"] for row in rows] == list(range(len(rows)))
+    assert ev.trials == sum(len(rows) for rows in ev.rows)
+    assert statistics.fmean(ev.values(0, "score")) == ev.summary(0, "score")[0]
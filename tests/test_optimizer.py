@@ -0,0 +1,12 @@
+import pytest
+
+from optimizer import AdaptiveSearch
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_pruning_does_not_change_the_result(seed):
+    pruned = AdaptiveSearch(timeout=40, seed=seed)
+    full = AdaptiveSearch(timeout=40, prune=False, seed=seed)
+    best = pruned.search(tolerance=0.05)
+    assert best == full.search(tolerance=0.05)
+    assert pruned.simulated_seconds <= full.simulated_seconds
@@ -0,0 +1,78 @@
+import csv
+import json
+
+import pytest
+
+import profiling
+from profiling import PhaseTimer
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(profiling.time, "perf_counter", clock)
+    return clock
+
+
+def run_frames(timer, clock, durations):
+    # durations: one list of (phase, seconds) laps per frame
+    for frame in durations:
+        timer.begin_frame()
+        for phase, seconds in frame:
+            clock.now += seconds
+            timer.lap(phase)
+        timer.end_frame()
+
+
+def test_laps_are_summed_per_phase_and_frame(clock):
+    timer = PhaseTimer()
+    run_frames(timer, clock, [[("physics", 0.001), ("draw", 0.004), ("physics", 0.002)]])
+    stats = timer.stats()
+    assert stats["physics"]["total"] == pytest.approx(3)
+    assert stats["draw"]["total"] == pytest.approx(4)
+    assert stats["frame"]["total"] == pytest.approx(7)
+    assert timer.frames == 1
+
+
+def test_percentiles_use_the_rolling_window(clock):
+    timer = PhaseTimer(window=100)
+    # 200 frames of 1..200 ms; the window keeps 101..200
+    run_frames(timer, clock, [[("draw", ms / 1000)] for ms in range(1, 201)])
+    stats = timer.stats()["draw"]
+    assert stats["p50"] == pytest.approx(150)
+    assert stats["p95"] == pytest.approx(195)
+    assert stats["max"] == pytest.approx(200)
+    assert stats["mean"] == pytest.approx(150.5)
+    assert stats["total"] == pytest.approx(sum(range(1, 201)))
+    assert timer.overlay_lines()[0].startswith("draw: p50 150.00 p95 195.00 max 200.00 ms")
+
+
+def test_disabled_timer_records_nothing(clock):
+    timer = PhaseTimer(enabled=False)
+    run_frames(timer, clock, [[("draw", 0.01)]] * 3)
+    assert (timer.frames, timer.stats(), timer.overlay_lines()) == (0, {}, [])
+
+
+def test_export(clock, tmp_path):
+    timer = PhaseTimer()
+    run_frames(timer, clock, [[("sense", 0.002), ("draw", 0.003)]] * 4)
+    timer.export(tmp_path / "profile.json")
+    data = json.loads((tmp_path / "profile.json").read_text())
+    assert (data["frames"], data["window"]) == (4, profiling.WINDOW)
+    assert data["phases"]["sense"]["p50"] == pytest.approx(2)
+
+    timer.export(tmp_path / "profile.csv")
+    with open(tmp_path / "profile.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["phase", "p50_ms", "p95_ms", "max_ms", "mean_ms", "total_ms"]
+    assert [row[0] for row in rows[1:]] == ["sense", "draw", "frame"]
+    assert float(rows[3][5]) == pytest.approx(20)
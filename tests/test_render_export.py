@@ -0,0 +1,47 @@
+import pygame
+import pytest
+
+from maze import default_maze
+from render_export import export, frame_count, frame_size, frame_stride, plan_jobs
+from trajectory import TrajectoryRecorder
+
+
+def record_run(path, steps, time_step=0.02):
+    with TrajectoryRecorder(path, time_step) as recorder:
+        for step in range(1, steps + 1):
+            recorder.record(step, 100 + step * 10, 100 + step * 5, 270, 2.0, 0.1, 0.4, step == 2)
+    return str(path)
+
+
+def test_frame_stride_and_count():
+    assert frame_stride(0.02, fps=25, speed=8) == 16
+    assert frame_stride(1.0, fps=25, speed=8) == 1
+    # Every stride-th record and the last one
+    assert [frame_count(records, 16) for records in (0, 1, 2, 17, 18, 33)] == [0, 1, 2, 2, 3, 3]
+
+
+@pytest.mark.parametrize("fmt", ["png", "bmp"])
+def test_export_writes_scaled_frames(tmp_path, fmt):
+    path = record_run(tmp_path / "run.traj", 10)  # Frames of records 0 and 9
+    out_dir = tmp_path / "out"
+    maze = default_maze()
+    frames = export([path], maze, str(out_dir), fmt=fmt, workers=1)
+    assert frames == 2
+    names = sorted(p.name for p in (out_dir / "run").iterdir())
+    assert names == [f"frame_000000.{fmt}", f"frame_000001.{fmt}"]
+
+    width, height = frame_size(maze)
+    first, last = (pygame.image.load(str(out_dir / "run" / name)) for name in names)
+    assert first.get_size() == (round(width * 0.5), round(height * 0.5))
+    # The robot has moved between the two frames
+    assert pygame.image.tobytes(first, "RGB") != pygame.image.tobytes(last, "RGB")
+
+
+def test_long_runs_are_split_into_chunks(tmp_path):
+    path = record_run(tmp_path / "long.traj", 1600, time_step=0.02)  # 101 frames at stride 16
+    jobs, videos = plan_jobs([path], str(tmp_path), "png", 25, 8, workers=4)
+    assert videos == {}
+    assert [(first, stop) for _, _, first, stop, _, _, _ in jobs] == [(0, 50), (50, 101)]
+    jobs, videos = plan_jobs([path], str(tmp_path), "mp4", 25, 8, workers=1)
+    assert len(jobs) == 1
+    assert list(videos) == [str(tmp_path / "long.mp4")]
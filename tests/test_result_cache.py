@@ -0,0 +1,49 @@
+import os
+
+from result_cache import ResultCache
+
+
+def test_key_ignores_result_neutral_options(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = cache.key(30, seed=0, sensitivity=0.6)
+    assert cache.key(30, seed=0, sensitivity=0.6, neighbor_list=True, vectorized=True, distance_field=True,
+                     field_cache=None) == key
+    assert cache.key(30, seed=1, sensitivity=0.6) != key
+    assert cache.key(30, seed=0, sensitivity=0.8) != key
+    assert cache.key(40, seed=0, sensitivity=0.6) != key
+    assert cache.key(30, seed=0, sensitivity=0.6, walls=[(0, 0, 10, 10)]) != key
+
+
+def test_repeated_trials_are_served_from_the_cache(tmp_path):
+    cache = ResultCache(tmp_path)
+    result = cache.run_trial(10, seed=0)
+    entries = os.listdir(tmp_path)
+    assert len(entries) == 1
+    assert cache.run_trial(10, seed=0, neighbor_list=True) == result
+    assert os.listdir(tmp_path) == entries
+
+
+def test_unseeded_trials_are_not_cached(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.run_trial(5, seed=None)
+    assert os.listdir(tmp_path) == []
+
+
+def test_eviction_keeps_the_cache_under_its_limit(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=20_000)
+    for i in range(400):
+        cache.put(f"key{i}", {"score": i, "padding": "x" * 100})
+    size = sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+    assert size <= 20_000
+    assert cache.total_bytes == size
+    assert cache.get("key399") is not None
+
+
+def test_directory_is_created_on_the_first_put(tmp_path):
+    directory = tmp_path / "cache"
+    cache = ResultCache(directory)
+    assert cache.get(cache.key(10, seed=0)) is None
+    cache.clear()
+    assert not directory.exists()
+    cache.run_trial(10, seed=0)
+    assert len(os.listdir(directory)) == 1
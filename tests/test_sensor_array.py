@@ -0,0 +1,47 @@
+import math
+
+import pytest
+
+import simulation
+from sensor_array import SensorArray
+
+
+def test_ray_angles_are_spread_around_the_center():
+    assert SensorArray().angles == [45, -45]
+    sensors = SensorArray(3, spread=60, center=40)
+    assert sensors.angles == pytest.approx([20, 40, 60, -20, -40, -60])
+    assert len(sensors) == 6
+
+
+def test_rays_start_on_the_robot_edge_and_point_along_their_angles():
+    sensors = SensorArray(4)
+    heading = 30
+    for (x1, y1, x2, y2), angle in zip(sensors.rays(500, 400, heading, 150, 40), sensors.angles):
+        direction = math.radians(heading + angle)
+        assert (x1, y1) == pytest.approx((500 + 20 * math.cos(direction), 400 - 20 * math.sin(direction)))
+        assert (x2, y2) == pytest.approx((x1 + 150 * math.cos(direction), y1 - 150 * math.sin(direction)))
+
+
+def test_side_readings_are_weighted_means():
+    sensors = SensorArray(3, weights=[3, 1, 0])
+    assert sensors.weights == [0.75, 0.25, 0.0]
+    assert sensors.side_readings([0.8, 0.4, 1.0, 0.2, 0.0, 0.6]) == pytest.approx((0.7, 0.15))
+    with pytest.raises(ValueError):
+        SensorArray(2, weights=[1])
+    with pytest.raises(ValueError):
+        SensorArray(0)
+
+
+def test_simulation_readings_follow_the_weighted_rays():
+    # A wall straight ahead is seen by the rays nearest the heading only
+    sim = simulation.Simulation(walls=[(300, 0, 300, 600)], start=(200, 300), rays_per_side=2, sensor_spread=80,
+                                ray_weights=[3, 1], sensitivity=1.0)
+    sim.heading_angle = 0
+    left, right = sim.sense()
+    distances = [simulation.ray_distance(*ray, sim.walls, sim.sensor_range) for ray in sim.rays]
+    readings = [simulation.distance_to_reading(d, sim.sensor_range, 1.0) for d in distances]
+    assert sim.ray_readings == pytest.approx(readings)
+    assert readings[1] == readings[3] == 0  # The outer rays at 65 degrees miss the wall
+    assert readings[0] > 0
+    assert readings[0] == pytest.approx(readings[2])
+    assert (left, right) == pytest.approx((0.75 * readings[0], 0.75 * readings[2]))
@@ -0,0 +1,95 @@
+import pytest
+
+import simulation
+from geometry import line_intersection, point_to_line_distance
+from maze import generate_maze
+
+MAZE = generate_maze(8, 8, cell_size=110, seed=2, loop_fraction=0.2).simulation_params()
+MODES = {
+    "vectorized": {"vectorized": True},
+    "spatial_index": {"spatial_index": True},
+    "spatial_index+vectorized": {"spatial_index": True, "vectorized": True},
+    "neighbor_list": {"neighbor_list": True},
+    "neighbor_list+vectorized": {"neighbor_list": True, "spatial_index": True, "vectorized": True},
+    "distance_field": {"distance_field": True},
+}
+
+
+@pytest.mark.parametrize("maze", [{}, MAZE], ids=["default", "generated"])
+@pytest.mark.parametrize("rays_per_side", [1, 4])
+@pytest.mark.parametrize("mode", MODES)
+def test_sensing_and_collision_modes_agree(mode, rays_per_side, maze, tmp_path):
+    params = dict(seed=1, sensitivity=0.8, rays_per_side=rays_per_side, **maze)
+    exact = simulation.Simulation(**params)
+    options = dict(MODES[mode])
+    if "distance_field" in options:
+        options["field_cache"] = tmp_path
+    fast = simulation.Simulation(**options, **params)
+    assert fast.run(20) == exact.run(20)
+    assert (fast.robot_x, fast.robot_y, fast.heading_angle) == (exact.robot_x, exact.robot_y, exact.heading_angle)
+
+
+@pytest.mark.parametrize("rays_per_side", [1, 3])
+def test_batch_matches_single_vehicles(rays_per_side):
+    from batch_simulation import BatchSimulation
+
+    sensitivities = [0.2, 0.6, 1.0, 0.6]
+    seeds = [0, 1, 2, 3]
+    batch = BatchSimulation(len(seeds), sensitivity=sensitivities, seeds=seeds, rays_per_side=rays_per_side, **MAZE)
+    results = batch.run(20)
+    for k, (sensitivity, seed) in enumerate(zip(sensitivities, seeds)):
+        sim = simulation.Simulation(sensitivity=sensitivity, seed=seed, rays_per_side=rays_per_side, **MAZE)
+        assert results[k] == sim.run(20)
+        assert (batch.robot_x[k], batch.robot_y[k]) == pytest.approx((sim.robot_x, sim.robot_y))
+
+
+def wall_crossings(sim, seconds):
+    # Steps whose straight move from the old to the new position crosses a wall
+    crossings = 0
+    for _ in range(int(seconds / sim.time_step)):
+        old_x, old_y = sim.robot_x, sim.robot_y
+        if sim.step():
+            break
+        if any(line_intersection(old_x, old_y, sim.robot_x, sim.robot_y, *wall) for wall in sim.walls):
+            crossings += 1
+    return crossings
+
+
+def test_continuous_collision_does_not_tunnel():
+    # One-second steps move the robot up to 300 px, far more than a wall's reach
+    assert wall_crossings(simulation.Simulation(seed=0, time_step=1.0, **MAZE), 60) > 0
+    assert wall_crossings(simulation.Simulation(seed=0, time_step=1.0, continuous_collision=True, **MAZE), 60) == 0
+
+
+def test_continuous_collision_stops_at_the_wall():
+    # Heading right at the wall x = 300 with a step that would jump past it
+    sim = simulation.Simulation(walls=[(300, 0, 300, 600)], start=(200, 300), finish=(1000, 1000),
+                                time_step=1.0, continuous_collision=True)
+    sim.heading_angle = 0
+    sim.speed = sim.max_speed
+    sim.step()
+    assert sim.collision_count == 1
+    assert sim.robot_x < 300
+    assert point_to_line_distance(sim.robot_x, sim.robot_y, 300, 0, 300, 600) >= sim.robot_size / 2
+
+
+def test_snapshot_restore_and_branch_are_deterministic(tmp_path):
+    params = dict(seed=4, sensitivity=0.7, record_trace=True, **MAZE)
+    sim = simulation.Simulation(**params)
+    sim.run(10)
+    state = sim.snapshot()
+    path = tmp_path / "snapshot.json"
+    simulation.save_snapshot(state, path)
+    expected = sim.run(30)
+
+    restored = simulation.Simulation(**params)
+    restored.restore(simulation.load_snapshot(path))
+    assert restored.run(30) == expected
+    assert list(restored.trace_points) == list(sim.trace_points)
+
+    # Branches from the same state with the same parameters agree, and a
+    # branch with other parameters continues from the same point
+    first = simulation.branch(state, **dict(params, sensitivity=0.3)).run(30)
+    assert simulation.branch(state, **dict(params, sensitivity=0.3)).run(30) == first
+    assert simulation.branch(state, **params).run(30) == expected
+    assert first["steps"] > state["steps"]
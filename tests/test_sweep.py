@@ -0,0 +1,53 @@
+import csv
+
+import pytest
+
+import simulation
+from result_cache import ResultCache
+from sweep import parameter_grid, run_sweep, write_csv
+
+TIMEOUT = 3
+
+
+def test_parameter_grid():
+    assert parameter_grid({"sensitivity": [0.2, 0.4], "turn_rate": [1]}) == [
+        {"sensitivity": 0.2, "turn_rate": 1}, {"sensitivity": 0.4, "turn_rate": 1}]
+    with pytest.raises(ValueError):
+        parameter_grid({"sensitvity": [0.2]})
+
+
+def test_single_process_sweep_matches_single_trials():
+    rows = run_sweep({"sensitivity": [0.4, 0.8]}, seeds=[0, 1], timeout=TIMEOUT, workers=1, max_speed=6)
+    assert [(row["sensitivity"], row["seed"]) for row in rows] == [(0.4, 0), (0.4, 1), (0.8, 0), (0.8, 1)]
+    for row in rows:
+        result = simulation.run_trial(TIMEOUT, sensitivity=row["sensitivity"], seed=row["seed"], max_speed=6)
+        assert (row["time"], row["collisions"], row["score"], row["completed"]) == (
+            result["time"], result["collisions"], result["score"], result["completed"])
+    assert "max_speed" not in rows[0]
+
+
+def test_cached_sweep_gives_the_same_rows(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    configs = [{"sensitivity": 0.6}]
+    first = run_sweep(configs, seeds=[2], timeout=TIMEOUT, workers=1, cache=cache)
+    assert len(list((tmp_path / "cache").glob("*.json"))) == 1
+    assert run_sweep(configs, seeds=[2], timeout=TIMEOUT, workers=1, cache=cache) == first
+    assert first == run_sweep(configs, seeds=[2], timeout=TIMEOUT, workers=1)
+
+
+def test_branching_at_the_fixed_parameters_changes_nothing():
+    configs = [{"sensitivity": 0.6}]
+    branched = run_sweep(configs, seeds=[0], timeout=TIMEOUT, workers=1, branch_at=1, sensitivity=0.6)
+    assert branched == run_sweep(configs, seeds=[0], timeout=TIMEOUT, workers=1)
+    with pytest.raises(ValueError):
+        run_sweep(configs, workers=1, branch_at=1, cache=ResultCache())
+
+
+def test_write_csv(tmp_path):
+    rows = run_sweep([{"sensitivity": 0.4, "turn_rate": 1}], seeds=[0], timeout=TIMEOUT, workers=1)
+    path = tmp_path / "sweep.csv"
+    write_csv(rows, path)
+    with open(path, newline="") as f:
+        written = list(csv.DictReader(f))
+    assert list(written[0]) == ["sensitivity", "turn_rate", "seed", "time", "collisions", "score", "completed"]
+    assert float(written[0]["score"]) == pytest.approx(rows[0]["score"])
@@ -0,0 +1,35 @@
+import math
+
+from geometry import point_to_line_distance
+from trace_store import TraceStore, read_spill
+
+
+def lissajous(count):
+    return [(int(500 + 400 * math.cos(i / 500)), int(500 + 400 * math.sin(i / 300))) for i in range(count)]
+
+
+def test_simplified_trace_stays_within_tolerance():
+    raw = lissajous(5000)
+    store = TraceStore(tolerance=1.0)
+    store.extend(raw)
+    kept = list(store)
+    assert len(kept) < len(raw) // 5
+    assert kept[0] == raw[0] and kept[-1] == raw[-1]
+    segments = list(zip(kept, kept[1:]))
+    for x, y in raw:
+        assert min(point_to_line_distance(x, y, *a, *b) for a, b in segments) <= 1.0
+
+
+def test_compaction_bounds_the_kept_points():
+    store = TraceStore(max_points=200)
+    store.extend(lissajous(200_000))
+    assert len(store) <= 201
+    assert store.count == 200_000
+
+
+def test_spill_file_keeps_every_raw_point(tmp_path):
+    raw = lissajous(10_000)
+    path = tmp_path / "trace.bin"
+    with TraceStore(max_points=100, spill_path=path) as store:
+        store.extend(raw)
+    assert list(read_spill(path)) == raw
@@ -0,0 +1,75 @@
+import pytest
+
+import simulation
+from trajectory import Trajectory, TrajectoryRecorder
+
+COLLISIONS = (10, 11, 30)
+
+
+def record_steps(recorder, steps):
+    for step in steps:
+        recorder.record(step, step * 2.0, 500 - step, step * 0.5, 3.0, 0.25, 0.75, step in COLLISIONS)
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "run.traj"
+    with TrajectoryRecorder(path, time_step=0.02, buffer_steps=16) as recorder:
+        record_steps(recorder, range(1, 51))
+
+    trajectory = Trajectory(path)
+    assert len(trajectory) == 50
+    assert trajectory.time_step == 0.02
+    record = trajectory[19]
+    assert (record["step"], record["x"], record["y"], record["heading"]) == (20, 40.0, 480.0, 10.0)
+    assert (record["speed"], record["left"], record["right"], record["collision"]) == (3.0, 0.25, 0.75, 0)
+    assert trajectory.positions(0, 3).tolist() == [[2.0, 499.0], [4.0, 498.0], [6.0, 497.0]]
+    assert trajectory.collision_steps.tolist() == list(COLLISIONS)
+
+    assert trajectory.index_of_step(20) == 19
+    assert trajectory.index_of_step(0) == 0
+    assert trajectory.index_of_step(99) == 49
+    assert trajectory.next_collision(0) == 9
+    assert trajectory.next_collision(9) == 10
+    assert trajectory.next_collision(10) == 29
+    assert trajectory.next_collision(29) is None
+    assert trajectory.previous_collision(29) == 10
+    assert trajectory.previous_collision(9) is None
+
+
+def test_steps_with_gaps_are_searched(tmp_path):
+    path = tmp_path / "gaps.traj"
+    with TrajectoryRecorder(path) as recorder:
+        record_steps(recorder, [5, 10, 11, 30, 31])
+    trajectory = Trajectory(path)
+    assert trajectory.index_of_step(30) == 3
+    assert trajectory.next_collision(0) == 1
+    assert trajectory.next_collision(1) == 2
+    assert trajectory.next_collision(2) == 3
+    assert trajectory.previous_collision(4) == 3
+
+
+def test_simulation_recording(tmp_path):
+    path = tmp_path / "sim.traj"
+    with TrajectoryRecorder(path) as recorder:
+        sim = simulation.Simulation(seed=0, recorder=recorder)
+        result = sim.run(20)
+    trajectory = Trajectory(path)
+    assert len(trajectory) == result["steps"]
+    assert len(trajectory.collision_steps) == result["collisions"]
+    assert (trajectory[-1]["x"], trajectory[-1]["y"]) == pytest.approx((sim.robot_x, sim.robot_y), abs=1e-3)
+
+
+def test_unclosed_recording_is_recovered(tmp_path):
+    # A recorder that never reaches close() leaves the header without a count
+    # or index; the records flushed so far are still readable
+    path = tmp_path / "crashed.traj"
+    recorder = TrajectoryRecorder(path, buffer_steps=16)
+    record_steps(recorder, range(1, 41))  # Two full chunks on disk, 8 records still buffered
+    recorder.file.close()
+
+    trajectory = Trajectory(path)
+    assert len(trajectory) == 32
+    assert trajectory[-1]["step"] == 32
+    assert trajectory.collision_steps.tolist() == [10, 11, 30]
+    assert trajectory.next_collision(0) == 9
+    assert trajectory.previous_collision(31) == 29
@@ -0,0 +1,171 @@
+import math
+from array import array
+
+# Bounded-memory store of the robot's trace.
+#
+# Points are kept as int x, y pairs in one flat array('i') instead of a list
+# of tuples, 8 bytes per point instead of about 70. They are simplified as
+# they arrive by cone intersection: each point since the last kept one allows
+# the directions (seen from the kept point) whose ray passes within tolerance
+# pixels of it, and the intersection of those direction ranges is tracked. A
+# new point stays pending while it lies inside that cone and is not nearer the
+# kept point than the points before it. Otherwise the previous point is kept
+# and a new cone starts from it. Straight runs collapse to their end points,
+# and the sub-pixel jitter of a robot pinned against a wall collapses to a
+# single point. Every point stays within about tolerance of the simplified
+# trace, and an append costs the same however many points are pending.
+#
+# When more than max_points are kept, the older half of them is simplified
+# again with a coarser tolerance, or thinned to every other point if that
+# does not halve it. Recent points keep full detail while older history gets
+# coarser, and memory stays flat however long the run goes. With
+# spill_path every raw point is also written to a file of native int32 x, y
+# pairs, to be read back with read_spill().
+
+DEFAULT_MAX_POINTS = 100_000
+DEFAULT_TOLERANCE = 1.0  # Pixels
+SPILL_BUFFER = 4096  # Points buffered before a write to the spill file
+
+class TraceStore:
+
+    def __init__(self, max_points=DEFAULT_MAX_POINTS, tolerance=DEFAULT_TOLERANCE, spill_path=None):
+        self.max_points = max_points
+        self.tolerance = tolerance
+        self.coarse_tolerance = 2 * tolerance  # Used by compact()
+        self.points = array("i")  # Kept points, x0, y0, x1, y1, ...
+        self.pending = None  # Newest point, not kept yet
+        self.cone = None  # (base angle, low, high) of the pending points, low/high relative to base
+        self.reach = 0  # Furthest distance of a pending point from the last kept one
+        self.count = 0  # Points appended in total
+        self.spill_path = spill_path
+        self.spill = open(spill_path, "wb") if spill_path else None
+        self.spill_buffer = array("i")
+
+    def __len__(self):
+        return len(self.points) // 2 + (1 if self.pending else 0)
+
+    def __iter__(self):
+        # The simplified trace: the kept points, then the newest point
+        points = self.points
+        for i in range(0, len(points), 2):
+            yield points[i], points[i + 1]
+        if self.pending:
+            yield self.pending
+
+    def append(self, point):
+        x, y = point
+        self.count += 1
+        if self.spill is not None:
+            self.spill_buffer.extend((x, y))
+            if len(self.spill_buffer) >= 2 * SPILL_BUFFER:
+                self.flush()
+
+        if not self.points:
+            self.points.extend((x, y))
+            return
+        if not self.extends_run(x, y):
+            # The pending points no longer fit one segment; keep the previous one
+            self.points.extend(self.pending)
+            self.cone = None
+            self.reach = 0
+            self.extends_run(x, y)
+            if len(self.points) // 2 > self.max_points:
+                self.compact()
+        self.pending = (x, y)
+
+    def extends_run(self, x, y):
+        # Whether (x, y) continues the segment from the last kept point; if so
+        # the cone is narrowed to it
+        dx = x - self.points[-2]
+        dy = y - self.points[-1]
+        distance = math.sqrt(dx * dx + dy * dy)
+        if distance <= self.tolerance:
+            return self.reach <= self.tolerance  # Still on the kept point
+        angle = math.atan2(dy, dx)
+        half_width = math.asin(self.tolerance / distance)
+        if self.cone is None:
+            if self.reach > self.tolerance:
+                return False
+            self.cone = (angle, -half_width, half_width)
+        else:
+            base, low, high = self.cone
+            relative = (angle - base + math.pi) % (2 * math.pi) - math.pi
+            if not low <= relative <= high or distance < self.reach - self.tolerance:
+                return False
+            self.cone = (base, max(low, relative - half_width), min(high, relative + half_width))
+        self.reach = max(self.reach, distance)
+        return True
+
+    def extend(self, points):
+        for point in points:
+            self.append(point)
+
+    def state(self):
+        # The kept points and the simplification in progress as plain values;
+        # restore() continues from them exactly as if nothing had happened
+        return {"points": self.points.tolist(), "pending": self.pending, "cone": self.cone, "reach": self.reach,
+                "count": self.count, "coarse_tolerance": self.coarse_tolerance}
+
+    def restore(self, state):
+        self.points = array("i", state["points"])
+        self.pending = tuple(state["pending"]) if state["pending"] else None
+        self.cone = tuple(state["cone"]) if state["cone"] else None
+        self.reach = state["reach"]
+        self.count = state["count"]
+        self.coarse_tolerance = state["coarse_tolerance"]
+
+    def load(self, points):
+        # Replace the trace with already simplified points, e.g. from a checkpoint.
+        # The trace then continues from them, though not always simplified exactly
+        # as it would have been without the interruption.
+        points = [tuple(point) for point in points]
+        self.points = array("i", [value for point in points[:1] for value in point])
+        self.pending = None
+        self.cone = None
+        self.reach = 0
+        if len(points) > 1:
+            self.points.extend(value for point in points[1:-1] for value in point)
+            self.extends_run(*points[-1])
+            self.pending = points[-1]
+
+    def compact(self):
+        # Halve the older half of the kept points, keeping the point where the
+        # halves meet. The newer half, and so the pending cone, is untouched.
+        split = len(self.points) // 4 * 2  # Flat index of the point where the halves meet
+        older = TraceStore(max_points=float("inf"), tolerance=self.coarse_tolerance)
+        for i in range(0, split + 2, 2):
+            older.append((self.points[i], self.points[i + 1]))
+        points = list(older)
+        if len(points) > split // 4 + 1:
+            # Not simplified enough; thin it, and use a coarser tolerance next time
+            points = points[:-1:2] + points[-1:]
+            self.coarse_tolerance *= 2
+        self.points = array("i", [value for point in points for value in point]) + self.points[split + 2:]
+
+    def flush(self):
+        if self.spill is not None:
+            self.spill_buffer.tofile(self.spill)
+            del self.spill_buffer[:]
+            self.spill.flush()
+
+    def close(self):
+        if self.spill is not None and not self.spill.closed:
+            self.flush()
+            self.spill.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_spill(path, chunk_points=SPILL_BUFFER):
+    # Every raw (x, y) point of a spill file, read a chunk at a time
+    with open(path, "rb") as f:
+        while True:
+            chunk = array("i")
+            chunk.frombytes(f.read(2 * chunk.itemsize * chunk_points))
+            if not chunk:
+                return
+            for i in range(0, len(chunk), 2):
+                yield chunk[i], chunk[i + 1]
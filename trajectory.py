@@ -0,0 +1,168 @@
+import os
+import struct
+
+import numpy as np
+
+import simulation
+
+# Compact binary trajectory files.
+#
+# A trajectory file is a fixed-size header, then one fixed-size record per
+# simulation step, then an index of the steps with collisions. Because every
+# record has the same size, step n is at a known offset and the reader can
+# memory-map the file and jump anywhere without loading the rest.
+#
+# Header: magic, version, record size, time step, record count, index offset
+# Record: step, x, y, heading, speed, left reading, right reading, collision flag
+# Index:  collision count, then one uint32 step per collision
+
+MAGIC = b"TRAJ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHdQQ")
+RECORD = struct.Struct("<I6fB3x")
+RECORD_DTYPE = np.dtype([
+    ("step", "<u4"),
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("heading", "<f4"),
+    ("speed", "<f4"),
+    ("left", "<f4"),
+    ("right", "<f4"),
+    ("collision", "u1"),
+    ("pad", "V3"),
+])
+
+class TrajectoryRecorder:
+    # Streams per-step state to a trajectory file. Records are buffered and
+    # written in chunks; close() writes the collision index and the header.
+
+    def __init__(self, path, time_step=simulation.TICK, buffer_steps=4096):
+        self.path = path
+        self.time_step = time_step
+        self.buffer_steps = buffer_steps
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, time_step, 0, 0))
+        self.buffer = bytearray()
+        self.buffered = 0
+        self.count = 0
+        self.collision_steps = []
+
+    def record(self, step, x, y, heading_angle, speed, left_reading, right_reading, collided=False):
+        self.buffer += RECORD.pack(step, x, y, heading_angle, speed, left_reading, right_reading, collided)
+        if collided:
+            self.collision_steps.append(step)
+        self.buffered += 1
+        self.count += 1
+        if self.buffered >= self.buffer_steps:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer.clear()
+        self.buffered = 0
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        index_offset = self.file.tell()
+        self.file.write(struct.pack("<Q", len(self.collision_steps)))
+        self.file.write(struct.pack(f"<{len(self.collision_steps)}I", *self.collision_steps))
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, self.time_step, self.count, index_offset))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Trajectory:
+    # Read-only, memory-mapped view of a trajectory file. Indexing and slicing
+    # return NumPy records; only the pages that are touched are read from disk.
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, record_size, self.time_step, count, index_offset = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or record_size != RECORD_DTYPE.itemsize:
+                raise ValueError(f"{path} is not a version {VERSION} trajectory file")
+
+            if index_offset:
+                f.seek(index_offset)
+                (collisions,) = struct.unpack("<Q", f.read(8))
+                self.collision_steps = np.frombuffer(f.read(4 * collisions), dtype="<u4")
+            else:
+                # Recorder was not closed; recover the records that made it to disk
+                count = (os.path.getsize(path) - HEADER.size) // record_size
+                self.collision_steps = None
+
+        if count:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        if self.collision_steps is None:
+            self.collision_steps = self.records["step"][self.records["collision"] != 0]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def positions(self, start=0, stop=None):
+        # (n, 2) array of x, y for records start..stop
+        records = self.records[start:stop]
+        return np.stack([records["x"], records["y"]], axis=1)
+
+    def index_of_step(self, step):
+        # Record index for a simulation step. Steps are usually consecutive, so
+        # the index is computed directly; otherwise binary search the step column.
+        if not len(self):
+            return 0
+        first, last = int(self.records[0]["step"]), int(self.records[-1]["step"])
+        if last - first == len(self) - 1:
+            return min(max(step - first, 0), len(self) - 1)
+        return int(np.searchsorted(self.records["step"], step))
+
+    def next_collision(self, index):
+        # Record index of the first collision after record index, or None
+        step = int(self.records["step"][index]) if len(self) else 0
+        later = self.collision_steps[self.collision_steps > step]
+        return self.index_of_step(later[0]) if len(later) else None
+
+    def previous_collision(self, index):
+        step = int(self.records["step"][index]) if len(self) else 0
+        earlier = self.collision_steps[self.collision_steps < step]
+        return self.index_of_step(earlier[-1]) if len(earlier) else None
+
+
+def main():
+    import argparse
+    from maze import load_maze
+
+    parser = argparse.ArgumentParser(description="Record a headless trial to a trajectory file.")
+    parser.add_argument("output", help="trajectory file to write")
+    parser.add_argument("--maze", help="maze file (default: the built-in maze)")
+    parser.add_argument("--max-speed", type=float, default=5)
+    parser.add_argument("--turn-rate", type=float, default=2)
+    parser.add_argument("--sensor-range", type=float, default=150)
+    parser.add_argument("--sensitivity", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=simulation.TIMEOUT, help="simulated seconds")
+    args = parser.parse_args()
+
+    params = load_maze(args.maze).simulation_params() if args.maze else {}
+    with TrajectoryRecorder(args.output) as recorder:
+        result = simulation.Simulation(
+            max_speed=args.max_speed, turn_rate=args.turn_rate, sensor_range=args.sensor_range,
+            sensitivity=args.sensitivity, seed=args.seed, recorder=recorder, **params
+        ).run(args.timeout)
+    print(f"Recorded {recorder.count} steps to '{args.output}': "
+          f"Time = {result['time']:.2f}s, Collisions = {result['collisions']}")
+
+
+if __name__ == "__main__":
+    main()